@@ -0,0 +1,87 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import BlogPost
+
+PostLike = BlogPost.likes.through
+
+
+def _adjust_likes_count(post_id, delta):
+    BlogPost.objects.filter(pk=post_id).update(likes_count=F('likes_count') + delta)
+
+
+def _insert_like(post_id, user_id):
+    try:
+        # Savepoint so a duplicate does not poison the outer transaction;
+        # the through table's unique (post, user) pair makes this race-free.
+        with transaction.atomic():
+            PostLike.objects.create(blogpost_id=post_id, user_id=user_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def _delete_like(post_id, user_id):
+    return PostLike.objects.filter(blogpost_id=post_id, user_id=user_id).delete()[0] > 0
+
+
+def set_post_like(post, user_id, liked):
+    """
+    Idempotently like or unlike ``post``: one INSERT or DELETE on the likes
+    table plus, only when it changed something, one counter UPDATE in the
+    same transaction. Returns ``(liked, likes_count)``.
+    """
+    with transaction.atomic():
+        changed = _insert_like(post.pk, user_id) if liked else _delete_like(post.pk, user_id)
+        if changed:
+            _adjust_likes_count(post.pk, 1 if liked else -1)
+    return liked, _expected_count(post, liked, changed)
+
+
+def toggle_post_like(post, user_id):
+    """Unlike if liked, otherwise like. Returns ``(liked, likes_count)``."""
+    with transaction.atomic():
+        if _delete_like(post.pk, user_id):
+            _adjust_likes_count(post.pk, -1)
+            return False, _expected_count(post, False, True)
+        changed = _insert_like(post.pk, user_id)
+        if changed:
+            _adjust_likes_count(post.pk, 1)
+    return True, _expected_count(post, True, changed)
+
+
+def _expected_count(post, liked, changed):
+    # Derived from the row as loaded rather than re-read; concurrent likes
+    # by other users may make it briefly stale, never wrong in the table.
+    count = post.likes_count + ((1 if liked else -1) if changed else 0)
+    return max(count, 0)
+
+
+def recount_likes(post_ids=None):
+    """
+    Reset ``likes_count`` from the likes table for ``post_ids`` (every post
+    when ``None``) in one UPDATE. Returns the number of posts written.
+    """
+    counts = (
+        PostLike.objects.filter(blogpost_id=OuterRef('pk'))
+        .order_by()
+        .values('blogpost_id')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    queryset = BlogPost.objects.all()
+    if post_ids is not None:
+        queryset = queryset.filter(pk__in=list(post_ids))
+    return queryset.update(likes_count=Coalesce(Subquery(counts), Value(0)))
+
+
+def find_likes_count_drift():
+    """``[(post_id, stored, actual)]`` for posts whose counter disagrees with the likes table."""
+    rows = (
+        BlogPost.objects.annotate(actual=Count('likes'))
+        .exclude(likes_count=F('actual'))
+        .order_by('pk')
+        .values_list('pk', 'likes_count', 'actual')
+    )
+    return list(rows)
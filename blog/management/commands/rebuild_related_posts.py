@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from blog.related import rebuild_related_posts
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the precomputed related-posts table from shared tags. "
+        "Saves and tag changes keep it current; run this after bulk edits "
+        "or tag deletions that bypass signals."
+    )
+
+    def handle(self, *args, **options):
+        edges = rebuild_related_posts()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt related posts: {edges} edge(s)."))
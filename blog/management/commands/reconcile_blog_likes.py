@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from blog.likes import find_likes_count_drift, recount_likes
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare BlogPost.likes_count with the likes table and reset any "
+        "counters that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drifted counters without fixing them.",
+        )
+
+    def handle(self, *args, **options):
+        drift = find_likes_count_drift()
+        for post_id, stored, actual in drift:
+            self.stdout.write(f"post={post_id} likes_count={stored} actual={actual}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("All blog like counters match."))
+            return
+        if options["dry_run"]:
+            self.stdout.write(f"Would fix {len(drift)} blog like counter(s).")
+            return
+
+        recount_likes(post_id for post_id, _stored, _actual in drift)
+        self.stdout.write(self.style.SUCCESS(f"Fixed {len(drift)} blog like counter(s)."))
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from blog.models import BlogPost
+from blog.sanitization import blog_sanitizer_version
+
+DEFAULT_BATCH_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the stored sanitized content/excerpt of blog posts written "
+        "under older sanitizer rules. Run after changing blog.sanitization "
+        "or BLOG_ALLOWED_IMAGE_HOSTS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Posts to rewrite per transaction. Defaults to {DEFAULT_BATCH_SIZE}.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Re-sanitize every post, not just those with a stale sanitizer version.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report how many posts would be re-sanitized without writing.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("Batch size must be at least 1.")
+
+        version = blog_sanitizer_version()
+        queryset = BlogPost.objects.all()
+        if not options["all"]:
+            queryset = queryset.exclude(sanitizer_version=version)
+
+        if options["dry_run"]:
+            self.stdout.write(
+                f"Would re-sanitize {queryset.count()} blog post(s) to sanitizer version {version}."
+            )
+            return
+
+        fields = ["content_sanitized", "excerpt_sanitized", "sanitizer_version"]
+        updated = 0
+        last_pk = 0
+        while True:
+            # Walk the primary key so rows rewritten by earlier batches (which
+            # no longer match the stale filter) cannot shift the window.
+            batch = list(
+                queryset.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("pk", "content", "excerpt")[:batch_size]
+            )
+            if not batch:
+                break
+            for post in batch:
+                post.refresh_sanitized_fields()
+            with transaction.atomic():
+                BlogPost.objects.bulk_update(batch, fields)
+            updated += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Re-sanitized {updated} blog post(s) to sanitizer version {version}."
+            )
+        )
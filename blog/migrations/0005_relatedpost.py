@@ -0,0 +1,69 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_related_posts(apps, schema_editor):
+    BlogPost = apps.get_model("blog", "BlogPost")
+    RelatedPost = apps.get_model("blog", "RelatedPost")
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    TaggedItem = apps.get_model("taggit", "TaggedItem")
+
+    content_type = ContentType.objects.filter(app_label="blog", model="blogpost").first()
+    if content_type is None:
+        return
+    published = set(BlogPost.objects.filter(status=1).values_list("pk", flat=True))
+    tags_by_post = {}
+    for object_id, tag_id in TaggedItem.objects.filter(content_type=content_type).values_list("object_id", "tag_id"):
+        if object_id in published:
+            tags_by_post.setdefault(object_id, set()).add(tag_id)
+
+    rows = []
+    for post_id, tags in tags_by_post.items():
+        for other_id, other_tags in tags_by_post.items():
+            score = len(tags & other_tags) if other_id != post_id else 0
+            if score:
+                rows.append(RelatedPost(post_id=post_id, related_id=other_id, score=score))
+    RelatedPost.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0004_blogpost_sanitized_fields"),
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("taggit", "0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedPost",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("score", models.PositiveIntegerField()),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_links",
+                        to="blog.blogpost",
+                    ),
+                ),
+                (
+                    "related",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="blog.blogpost",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [models.Index(fields=["post", "-score"], name="blog_related_score_idx")],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="relatedpost",
+            constraint=models.UniqueConstraint(fields=("post", "related"), name="uniq_blog_related_post"),
+        ),
+        migrations.RunPython(build_related_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_likes_count(apps, schema_editor):
+    BlogPost = apps.get_model("blog", "BlogPost")
+    PostLike = BlogPost.likes.through
+    counts = (
+        PostLike.objects.filter(blogpost_id=OuterRef("pk"))
+        .order_by()
+        .values("blogpost_id")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    BlogPost.objects.update(likes_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0005_relatedpost"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blogpost",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_likes_count, migrations.RunPython.noop),
+    ]
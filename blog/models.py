@@ -1,17 +1,23 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 from taggit.managers import TaggableManager
 
-from .sanitization import sanitize_blog_html, sanitize_blog_plain_text
+from openeire_api.model_mixins import ProtectedFieldsMixin
+from openeire_api.sitemap_cache import invalidate_sitemaps
 
+from .sanitization import blog_sanitizer_version, sanitize_blog_html, sanitize_blog_plain_text
 
-class BlogPost(models.Model):
+
+class BlogPost(ProtectedFieldsMixin, models.Model):
     """
     Stores a single blog post entry.
     """
 
     STATUS = ((0, 'Draft'), (1, 'Published'))
+    protected_fields = ('likes_count',)
 
     title = models.CharField(max_length=255, unique=True)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
@@ -19,6 +25,10 @@ class BlogPost(models.Model):
     featured_image = models.ImageField(upload_to='blog_images/', null=True, blank=True)
     content = models.TextField()
     excerpt = models.TextField(blank=True)
+    # Render-ready copies of content/excerpt, so API reads never parse HTML.
+    content_sanitized = models.TextField(blank=True, editable=False)
+    excerpt_sanitized = models.TextField(blank=True, editable=False)
+    sanitizer_version = models.CharField(max_length=32, blank=True, editable=False)
     meta_title = models.CharField(max_length=255, blank=True)
     meta_description = models.CharField(max_length=160, blank=True)
     canonical_url = models.URLField(blank=True)
@@ -27,6 +37,8 @@ class BlogPost(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     tags = TaggableManager()
     likes = models.ManyToManyField(User, related_name='blog_likes', blank=True)
+    # Denormalized count of ``likes``, kept in step by blog.likes.
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['-created_at']
@@ -36,16 +48,48 @@ class BlogPost(models.Model):
 
     def number_of_likes(self):
         """Helper to count likes"""
-        return self.likes.count()
+        return self.likes_count
+
+    def refresh_sanitized_fields(self):
+        """Rebuild the stored render-ready content/excerpt under the current rules."""
+        self.content_sanitized = sanitize_blog_html(self.content) or ''
+        self.excerpt_sanitized = sanitize_blog_plain_text(self.excerpt) or ''
+        self.sanitizer_version = blog_sanitizer_version()
+
+    def ensure_sanitized(self):
+        """
+        Make sure the stored sanitized fields match the current sanitizer
+        rules, rebuilding and persisting them only for rows written under
+        older rules (or before they existed).
+        """
+        if self.sanitizer_version == blog_sanitizer_version():
+            return False
+        self.refresh_sanitized_fields()
+        if self.pk is not None:
+            BlogPost.objects.filter(pk=self.pk).update(
+                content_sanitized=self.content_sanitized,
+                excerpt_sanitized=self.excerpt_sanitized,
+                sanitizer_version=self.sanitizer_version,
+            )
+        return True
 
     def save(self, *args, **kwargs):
         """
-        Generate a unique slug from the title if one is not provided.
+        Sanitize content/excerpt, store their render-ready copies and
+        generate a unique slug from the title if one is not provided.
         """
         if self.content is not None:
             self.content = sanitize_blog_html(self.content)
         if self.excerpt is not None:
             self.excerpt = sanitize_blog_plain_text(self.excerpt)
+        self.refresh_sanitized_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'content', 'excerpt'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {
+                'content_sanitized',
+                'excerpt_sanitized',
+                'sanitizer_version',
+            }
 
         if not self.slug:
             self.slug = slugify(self.title)
@@ -59,6 +103,28 @@ class BlogPost(models.Model):
         super().save(*args, **kwargs)
 
 
+class RelatedPost(models.Model):
+    """
+    Precomputed "related posts" edge between two published posts, scored
+    by the number of tags they share. Stored in both directions.
+    """
+
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='+')
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('post', 'related'), name='uniq_blog_related_post'),
+        ]
+        indexes = [
+            models.Index(fields=('post', '-score'), name='blog_related_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id} ({self.score})'
+
+
 class Comment(models.Model):
     """
     Stores a single comment entry related to a blog post.
@@ -80,3 +146,63 @@ class Comment(models.Model):
         if self.content is not None:
             self.content = sanitize_blog_plain_text(self.content)
         super().save(*args, **kwargs)
+
+
+@receiver(post_save, sender=BlogPost)
+def refresh_related_posts_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .related import refresh_related_posts
+
+    refresh_related_posts(instance)
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def invalidate_blog_sitemap(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_sitemaps('blog'))
+
+
+@receiver(m2m_changed, sender=BlogPost.tags.through)
+def refresh_related_posts_on_tag_change(sender, instance, action, **kwargs):
+    # The taggit through model is shared with any other tagged model.
+    if action not in {'post_add', 'post_remove', 'post_clear'} or not isinstance(instance, BlogPost):
+        return
+    from .related import refresh_related_posts
+
+    refresh_related_posts(instance)
+
+
+@receiver(m2m_changed, sender=BlogPost.likes.through)
+def recount_likes_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep ``likes_count`` right for ``post.likes``/``user.blog_likes`` edits
+    made through the ORM (admin, shell); the API like path updates the
+    counter itself without these signals.
+    """
+    from .likes import recount_likes
+
+    if not reverse:
+        if action in {'post_add', 'post_remove', 'post_clear'}:
+            recount_likes([instance.pk])
+        return
+    if action == 'pre_clear':
+        instance._cleared_blog_like_ids = list(instance.blog_likes.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        recount_likes(getattr(instance, '_cleared_blog_like_ids', []))
+    elif action in {'post_add', 'post_remove'} and pk_set:
+        recount_likes(pk_set)
+
+
+@receiver(pre_delete, sender=User)
+def remember_liked_posts_before_user_delete(sender, instance, **kwargs):
+    instance._deleted_blog_like_ids = list(instance.blog_likes.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=User)
+def recount_likes_after_user_delete(sender, instance, **kwargs):
+    post_ids = getattr(instance, '_deleted_blog_like_ids', None)
+    if post_ids:
+        from .likes import recount_likes
+
+        recount_likes(post_ids)
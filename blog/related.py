@@ -0,0 +1,86 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, Q
+from taggit.models import TaggedItem
+
+from .models import BlogPost, RelatedPost
+
+PUBLISHED = 1
+RELATED_POSTS_LIMIT = 3
+
+
+def _blog_tagged_items():
+    return TaggedItem.objects.filter(content_type=ContentType.objects.get_for_model(BlogPost))
+
+
+def compute_related_scores(post_id):
+    """Map each published post sharing a tag with ``post_id`` to the number of shared tags."""
+    items = _blog_tagged_items()
+    rows = (
+        items.filter(
+            tag_id__in=items.filter(object_id=post_id).values('tag_id'),
+            object_id__in=BlogPost.objects.filter(status=PUBLISHED).values('pk'),
+        )
+        .exclude(object_id=post_id)
+        .values('object_id')
+        .annotate(score=Count('tag_id', distinct=True))
+    )
+    return {row['object_id']: row['score'] for row in rows}
+
+
+def refresh_related_posts(post_or_id):
+    """
+    Recompute every related-post edge touching one post, in both directions.
+    Drafts (and deleted posts) end up with no edges at all.
+    Returns the number of posts it is now related to.
+    """
+    if isinstance(post_or_id, BlogPost):
+        post_id, published = post_or_id.pk, post_or_id.status == PUBLISHED
+    else:
+        post_id = post_or_id
+        published = BlogPost.objects.filter(pk=post_id, status=PUBLISHED).exists()
+
+    with transaction.atomic():
+        RelatedPost.objects.filter(Q(post_id=post_id) | Q(related_id=post_id)).delete()
+        if not published:
+            return 0
+        scores = compute_related_scores(post_id)
+        rows = []
+        for other_id, score in scores.items():
+            rows.append(RelatedPost(post_id=post_id, related_id=other_id, score=score))
+            rows.append(RelatedPost(post_id=other_id, related_id=post_id, score=score))
+        RelatedPost.objects.bulk_create(rows)
+    return len(scores)
+
+
+def rebuild_related_posts(*, batch_size=500):
+    """Rebuild the whole related-posts table. Returns the number of edges written."""
+    published_ids = list(
+        BlogPost.objects.filter(status=PUBLISHED).order_by('pk').values_list('pk', flat=True)
+    )
+    edges = 0
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        rows = []
+        for post_id in published_ids:
+            rows.extend(
+                RelatedPost(post_id=post_id, related_id=other_id, score=score)
+                for other_id, score in compute_related_scores(post_id).items()
+            )
+            if len(rows) >= batch_size:
+                RelatedPost.objects.bulk_create(rows)
+                edges += len(rows)
+                rows = []
+        RelatedPost.objects.bulk_create(rows)
+        edges += len(rows)
+    return edges
+
+
+def get_related_posts(post, limit=RELATED_POSTS_LIMIT):
+    """The top ``limit`` published posts related to ``post``, in one indexed query."""
+    links = (
+        RelatedPost.objects.filter(post_id=post.pk, related__status=PUBLISHED)
+        .select_related('related')
+        .order_by('-score', '-related__created_at')[:limit]
+    )
+    return [link.related for link in links]
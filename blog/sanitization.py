@@ -1,3 +1,4 @@
+import hashlib
 import html
 import re
 from urllib.parse import urlparse
@@ -10,6 +11,10 @@ from django.conf import settings
 SCRIPT_STYLE_BLOCK_RE = re.compile(r"(?is)<(script|style).*?>.*?</\1>")
 CONTROL_CHARS_RE = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]")
 
+# Bump whenever the allowlists or cleaning steps below change so stored
+# ``BlogPost.content_sanitized``/``excerpt_sanitized`` values are rebuilt.
+BLOG_SANITIZER_RULES_VERSION = 1
+
 BLOG_ALLOWED_TAGS = [
     "p",
     "div",
@@ -113,6 +118,17 @@ def _allowed_image_hosts():
     return hosts
 
 
+def blog_sanitizer_version():
+    """
+    Tag identifying the rules stored sanitized output was produced with: the
+    rules version plus a fingerprint of ``BLOG_ALLOWED_IMAGE_HOSTS``, so a
+    settings change invalidates stored output as well as a code change.
+    """
+    hosts = ",".join(sorted(_allowed_image_hosts()))
+    digest = hashlib.sha256(hosts.encode("utf-8")).hexdigest()[:12]
+    return f"{BLOG_SANITIZER_RULES_VERSION}:{digest}"
+
+
 def _is_allowed_image_src(value):
     src = str(value or "").strip()
     if not src:
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from .models import BlogPost, Comment
+from .related import get_related_posts
 from taggit.serializers import (TagListSerializerField, TaggitSerializer)
-from .sanitization import sanitize_blog_html, sanitize_blog_plain_text
+from .sanitization import sanitize_blog_plain_text
 
 class BlogPostListSerializer(TaggitSerializer, serializers.ModelSerializer):
     """
@@ -10,7 +11,8 @@ class BlogPostListSerializer(TaggitSerializer, serializers.ModelSerializer):
     """
     author = serializers.ReadOnlyField(source='author.username')
     tags = TagListSerializerField()
-    likes_count = serializers.IntegerField(source='number_of_likes', read_only=True)
+    likes_count = serializers.IntegerField(read_only=True)
+    has_liked = serializers.SerializerMethodField()
     excerpt = serializers.SerializerMethodField()
 
     class Meta:
@@ -28,11 +30,24 @@ class BlogPostListSerializer(TaggitSerializer, serializers.ModelSerializer):
             'created_at',
             'tags',
             'likes_count',
+            'has_liked',
         ]
 
+    def get_has_liked(self, obj):
+        has_liked = getattr(obj, 'has_liked', None)
+        if has_liked is not None:
+            return bool(has_liked)
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return obj.likes.filter(id=user.pk).exists()
+        return False
+
     def get_excerpt(self, obj):
-        # Defense in depth for legacy rows that predate server-side sanitization.
-        return sanitize_blog_plain_text(obj.excerpt)
+        # Stored at save time; only rows written under older sanitizer rules
+        # are re-sanitized here.
+        obj.ensure_sanitized()
+        return obj.excerpt_sanitized
 
 class BlogPostDetailSerializer(TaggitSerializer, serializers.ModelSerializer):
     """
@@ -41,7 +56,7 @@ class BlogPostDetailSerializer(TaggitSerializer, serializers.ModelSerializer):
     """
     author = serializers.ReadOnlyField(source='author.username')
     tags = TagListSerializerField()
-    likes_count = serializers.IntegerField(source='number_of_likes', read_only=True)
+    likes_count = serializers.IntegerField(read_only=True)
     has_liked = serializers.SerializerMethodField()
     related_posts = serializers.SerializerMethodField()
     content = serializers.SerializerMethodField()
@@ -69,11 +84,14 @@ class BlogPostDetailSerializer(TaggitSerializer, serializers.ModelSerializer):
         ]
 
     def get_content(self, obj):
-        # Defense in depth for legacy rows that predate server-side sanitization.
-        return sanitize_blog_html(obj.content)
+        # Stored at save time; only rows written under older sanitizer rules
+        # are re-sanitized here.
+        obj.ensure_sanitized()
+        return obj.content_sanitized
 
     def get_excerpt(self, obj):
-        return sanitize_blog_plain_text(obj.excerpt)
+        obj.ensure_sanitized()
+        return obj.excerpt_sanitized
 
     def get_has_liked(self, obj):
         user = self.context.get('request').user
@@ -82,21 +100,13 @@ class BlogPostDetailSerializer(TaggitSerializer, serializers.ModelSerializer):
         return False
 
     def get_related_posts(self, obj):
-        # 1. Ask taggit for similar objects (based on shared tags)
-        # This returns a list of similar BlogPost objects, excluding the current one automatically.
-        related = obj.tags.similar_objects()
-        
-        # 2. Take the top 3 matches
-        top_3 = related[:3]
-        
-        # 3. Manually serialize the essential data
-        # We do this manually to avoid circular import issues or unnecessary overhead
+        # Precomputed by tag overlap (see blog.related); one indexed query.
         return [{
             'title': post.title,
             'slug': post.slug,
             'featured_image': post.featured_image.url if post.featured_image else None,
             'created_at': post.created_at
-        } for post in top_3]
+        } for post in get_related_posts(obj)]
 
 class CommentSerializer(serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.username')
@@ -1,8 +1,16 @@
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 
-from .models import BlogPost, Comment
+from .models import BlogPost, Comment, RelatedPost
+from .related import get_related_posts
+from .sanitization import blog_sanitizer_version
 
 
 class BlogSanitizationTests(APITestCase):
@@ -180,7 +188,9 @@ class BlogSanitizationTests(APITestCase):
             content='<p>Initial</p>',
         )
         BlogPost.objects.filter(pk=post.pk).update(
-            content='<script>alert(1)</script><p>Visible</p>'
+            content='<script>alert(1)</script><p>Visible</p>',
+            # Legacy rows predate the stored sanitized copies.
+            sanitizer_version='',
         )
 
         response = self.client.get(reverse('blog_post_detail', args=[post.slug]))
@@ -194,7 +204,9 @@ class BlogSanitizationTests(APITestCase):
             content='<p>Initial</p>',
         )
         BlogPost.objects.filter(pk=post.pk).update(
-            content='&lt;p&gt;Visible&lt;/p&gt;&lt;h2&gt;Heading&lt;/h2&gt;'
+            content='&lt;p&gt;Visible&lt;/p&gt;&lt;h2&gt;Heading&lt;/h2&gt;',
+            # Legacy rows predate the stored sanitized copies.
+            sanitizer_version='',
         )
 
         response = self.client.get(reverse('blog_post_detail', args=[post.slug]))
@@ -209,7 +221,9 @@ class BlogSanitizationTests(APITestCase):
             excerpt='safe excerpt',
         )
         BlogPost.objects.filter(pk=post.pk).update(
-            excerpt='<img src=x onerror=alert(1)> teaser <script>boom()</script>'
+            excerpt='<img src=x onerror=alert(1)> teaser <script>boom()</script>',
+            # Legacy rows predate the stored sanitized copies.
+            sanitizer_version='',
         )
 
         response = self.client.get(reverse('blog_post_list'))
@@ -257,3 +271,347 @@ class BlogSanitizationTests(APITestCase):
         created = Comment.objects.get(post=post, user=self.author)
         self.assertEqual(created.content, 'Great')
         self.assertEqual(response.data['content'], 'Great')
+
+    def test_blog_post_save_stores_sanitized_copies_and_version(self):
+        post = self._create_post(
+            title='Stored Sanitized Post',
+            content='<p>Body</p><script>alert(1)</script>',
+            excerpt='<b>Short</b> excerpt',
+        )
+
+        post.refresh_from_db()
+        self.assertEqual(post.content_sanitized, '<p>Body</p>')
+        self.assertEqual(post.excerpt_sanitized, 'Short excerpt')
+        self.assertEqual(post.sanitizer_version, blog_sanitizer_version())
+
+    def test_blog_reads_do_not_parse_html_for_current_rows(self):
+        post = self._create_post(
+            title='Parse Free Post',
+            content='<p>Body</p>',
+            excerpt='Teaser',
+        )
+
+        with mock.patch('blog.models.sanitize_blog_html') as html_mock, \
+                mock.patch('blog.models.sanitize_blog_plain_text') as text_mock:
+            detail = self.client.get(reverse('blog_post_detail', args=[post.slug]))
+            listing = self.client.get(reverse('blog_post_list'))
+
+        self.assertEqual(detail.status_code, 200)
+        self.assertEqual(detail.data['content'], '<p>Body</p>')
+        self.assertEqual(self._list_results(listing)[0]['excerpt'], 'Teaser')
+        html_mock.assert_not_called()
+        text_mock.assert_not_called()
+
+    def test_blog_read_rebuilds_and_persists_stale_sanitizer_version(self):
+        post = self._create_post(
+            title='Stale Version Post',
+            content='<p>Body</p>',
+        )
+        BlogPost.objects.filter(pk=post.pk).update(
+            content_sanitized='<p>Old rules</p>',
+            sanitizer_version='0:stale',
+        )
+
+        response = self.client.get(reverse('blog_post_detail', args=[post.slug]))
+
+        self.assertEqual(response.data['content'], '<p>Body</p>')
+        post.refresh_from_db()
+        self.assertEqual(post.content_sanitized, '<p>Body</p>')
+        self.assertEqual(post.sanitizer_version, blog_sanitizer_version())
+
+    def test_image_host_setting_change_marks_stored_output_stale(self):
+        with self.settings(BLOG_ALLOWED_IMAGE_HOSTS=['images.example.com']):
+            post = self._create_post(
+                title='Host Change Post',
+                content='<p>Body</p>',
+            )
+            self.assertEqual(post.sanitizer_version, blog_sanitizer_version())
+
+        with self.settings(BLOG_ALLOWED_IMAGE_HOSTS=['cdn.example.org']):
+            self.assertNotEqual(post.sanitizer_version, blog_sanitizer_version())
+            self.assertTrue(post.ensure_sanitized())
+            self.assertFalse(post.ensure_sanitized())
+
+    def test_resanitize_command_rebuilds_only_stale_posts(self):
+        stale = self._create_post(title='Stale Post', content='<p>Stale</p>')
+        current = self._create_post(title='Current Post', content='<p>Current</p>')
+        BlogPost.objects.filter(pk=stale.pk).update(
+            content_sanitized='',
+            sanitizer_version='',
+        )
+        BlogPost.objects.filter(pk=current.pk).update(content_sanitized='<p>Kept</p>')
+
+        out = StringIO()
+        call_command('resanitize_blog_posts', '--dry-run', stdout=out)
+        self.assertIn('Would re-sanitize 1 blog post(s)', out.getvalue())
+        self.assertEqual(BlogPost.objects.get(pk=stale.pk).content_sanitized, '')
+
+        out = StringIO()
+        call_command('resanitize_blog_posts', '--batch-size', '1', stdout=out)
+
+        self.assertIn('Re-sanitized 1 blog post(s)', out.getvalue())
+        stale.refresh_from_db()
+        self.assertEqual(stale.content_sanitized, '<p>Stale</p>')
+        self.assertEqual(stale.sanitizer_version, blog_sanitizer_version())
+        self.assertEqual(BlogPost.objects.get(pk=current.pk).content_sanitized, '<p>Kept</p>')
+
+
+class BlogListQueryTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='listauthor',
+            email='listauthor@example.com',
+            password='StrongPass123!',
+        )
+        self.reader = User.objects.create_user(
+            username='listreader',
+            email='listreader@example.com',
+            password='StrongPass123!',
+        )
+        self.posts = []
+        for index in range(10):
+            post = BlogPost.objects.create(
+                title=f'List Post {index}',
+                author=self.author,
+                content='<p>Body</p>',
+                status=1,
+            )
+            post.tags.add('travel', f'tag-{index}')
+            post.likes.add(self.author)
+            self.posts.append(post)
+        self.posts[0].likes.add(self.reader)
+        self.posts[3].likes.add(self.reader)
+
+    def _results(self, response):
+        return {row['slug']: row for row in response.data['results']}
+
+    def test_blog_list_query_count_is_fixed_for_anonymous_users(self):
+        # count + page + tag prefetch, independent of page size.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('blog_post_list'))
+
+        self.assertEqual(response.status_code, 200)
+        rows = self._results(response)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[self.posts[0].slug]['likes_count'], 2)
+        self.assertEqual(rows[self.posts[1].slug]['likes_count'], 1)
+        self.assertEqual(sorted(rows[self.posts[1].slug]['tags']), ['tag-1', 'travel'])
+        self.assertFalse(any(row['has_liked'] for row in rows.values()))
+
+    def test_blog_list_resolves_has_liked_without_extra_queries(self):
+        self.client.force_authenticate(self.reader)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('blog_post_list'), {'tag': 'travel'})
+
+        rows = self._results(response)
+        liked = {slug for slug, row in rows.items() if row['has_liked']}
+        self.assertEqual(liked, {self.posts[0].slug, self.posts[3].slug})
+        self.assertEqual(rows[self.posts[3].slug]['likes_count'], 2)
+
+    def test_liked_posts_list_counts_all_likes_at_fixed_query_budget(self):
+        self.client.force_authenticate(self.reader)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('liked_posts'))
+
+        rows = self._results(response)
+        self.assertEqual(set(rows), {self.posts[0].slug, self.posts[3].slug})
+        self.assertEqual(rows[self.posts[0].slug]['likes_count'], 2)
+        self.assertTrue(all(row['has_liked'] for row in rows.values()))
+
+
+class RelatedPostTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='relatedauthor',
+            email='relatedauthor@example.com',
+            password='StrongPass123!',
+        )
+
+    def _create_post(self, title, *tags, status=1):
+        post = BlogPost.objects.create(
+            title=title,
+            author=self.author,
+            content='<p>Body</p>',
+            status=status,
+        )
+        post.tags.add(*tags)
+        return post
+
+    def _related_slugs(self, post):
+        response = self.client.get(reverse('blog_post_detail', args=[post.slug]))
+        self.assertEqual(response.status_code, 200)
+        return [row['slug'] for row in response.data['related_posts']]
+
+    def test_related_posts_are_ranked_by_shared_tags_and_exclude_drafts(self):
+        post = self._create_post('Main Post', 'ireland', 'coast', 'drone')
+        best = self._create_post('Best Match', 'ireland', 'coast', 'drone')
+        good = self._create_post('Good Match', 'ireland', 'coast')
+        self._create_post('Weak Match', 'ireland')
+        self._create_post('Draft Match', 'ireland', 'coast', 'drone', status=0)
+        self._create_post('Unrelated', 'food')
+        weaker = self._create_post('Weak Match Newer', 'drone')
+
+        self.assertEqual(self._related_slugs(post), [best.slug, good.slug, weaker.slug])
+        self.assertEqual(RelatedPost.objects.get(post=best, related=post).score, 3)
+
+    def test_related_posts_follow_tag_changes_and_publication(self):
+        post = self._create_post('Tagged Post', 'ireland')
+        other = self._create_post('Other Post', 'food')
+        self.assertEqual(self._related_slugs(post), [])
+
+        other.tags.add('ireland')
+        self.assertEqual(self._related_slugs(post), [other.slug])
+
+        other.status = 0
+        other.save()
+        self.assertEqual(self._related_slugs(post), [])
+        self.assertFalse(RelatedPost.objects.filter(related=other).exists())
+
+        other.status = 1
+        other.save()
+        other.tags.remove('ireland')
+        self.assertEqual(self._related_slugs(post), [])
+
+        other.tags.set(['ireland', 'food'])
+        post.tags.clear()
+        self.assertFalse(RelatedPost.objects.filter(post=other).exists())
+
+    def test_related_posts_read_is_a_single_query(self):
+        post = self._create_post('Query Post', 'ireland')
+        self._create_post('Query Match', 'ireland')
+
+        with self.assertNumQueries(1):
+            related = get_related_posts(post)
+
+        self.assertEqual([item.title for item in related], ['Query Match'])
+
+    def test_rebuild_related_posts_command_restores_table(self):
+        post = self._create_post('Rebuild Post', 'ireland', 'coast')
+        match = self._create_post('Rebuild Match', 'coast')
+        RelatedPost.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_related_posts', stdout=out)
+
+        self.assertIn('2 edge(s)', out.getvalue())
+        self.assertEqual(self._related_slugs(post), [match.slug])
+
+
+class BlogLikeTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='likeauthor',
+            email='likeauthor@example.com',
+            password='StrongPass123!',
+        )
+        self.reader = User.objects.create_user(
+            username='likereader',
+            email='likereader@example.com',
+            password='StrongPass123!',
+        )
+        self.post = BlogPost.objects.create(
+            title='Likeable Post',
+            author=self.author,
+            content='<p>Body</p>',
+            status=1,
+        )
+        self.url = reverse('blog_like', args=[self.post.slug])
+        self.client.force_authenticate(self.reader)
+
+    def _stored_count(self):
+        return BlogPost.objects.values_list('likes_count', flat=True).get(pk=self.post.pk)
+
+    def _write_statements(self, queries):
+        return [
+            query['sql'] for query in queries
+            if query['sql'].split(' ', 1)[0].upper() in {'INSERT', 'UPDATE', 'DELETE'}
+        ]
+
+    def test_toggle_like_maintains_counter(self):
+        response = self.client.post(self.url)
+        self.assertEqual(response.data, {'liked': True, 'likes_count': 1})
+        self.assertEqual(self._stored_count(), 1)
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.data, {'liked': False, 'likes_count': 0})
+        self.assertEqual(self._stored_count(), 0)
+        self.assertFalse(self.post.likes.exists())
+
+    def test_put_and_delete_are_idempotent(self):
+        for _ in range(2):
+            response = self.client.put(self.url)
+            self.assertEqual(response.data, {'liked': True, 'likes_count': 1})
+        self.assertEqual(self._stored_count(), 1)
+
+        for _ in range(2):
+            response = self.client.delete(self.url)
+            self.assertEqual(response.data, {'liked': False, 'likes_count': 0})
+        self.assertEqual(self._stored_count(), 0)
+
+    def test_like_path_writes_two_statements(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.put(self.url)
+        writes = self._write_statements(ctx.captured_queries)
+        self.assertEqual(len(writes), 2)
+        self.assertTrue(writes[0].startswith('INSERT'))
+        self.assertTrue(writes[1].startswith('UPDATE'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.put(self.url)
+        self.assertEqual(len(self._write_statements(ctx.captured_queries)), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.delete(self.url)
+        writes = self._write_statements(ctx.captured_queries)
+        self.assertEqual([sql.split(' ', 1)[0] for sql in writes], ['DELETE', 'UPDATE'])
+
+    def test_orm_like_changes_and_user_deletion_keep_counter(self):
+        self.post.likes.add(self.author, self.reader)
+        self.assertEqual(self._stored_count(), 2)
+
+        self.reader.blog_likes.remove(self.post)
+        self.assertEqual(self._stored_count(), 1)
+
+        self.reader.blog_likes.add(self.post)
+        self.reader.delete()
+        self.assertEqual(self._stored_count(), 1)
+
+        self.author.blog_likes.clear()
+        self.assertEqual(self._stored_count(), 0)
+
+    def test_stale_instance_save_does_not_overwrite_counter(self):
+        stale = BlogPost.objects.get(pk=self.post.pk)
+        self.client.put(self.url)
+
+        stale.title = 'Renamed Likeable Post'
+        stale.save()
+
+        self.assertEqual(self._stored_count(), 1)
+
+    def test_full_save_of_a_deleted_post_inserts_it_again(self):
+        stale = BlogPost.objects.get(pk=self.post.pk)
+        stale.likes_count = 3
+        BlogPost.objects.filter(pk=self.post.pk).delete()
+
+        stale.title = 'Restored Likeable Post'
+        stale.save()
+
+        restored = BlogPost.objects.get(pk=self.post.pk)
+        self.assertEqual(restored.title, 'Restored Likeable Post')
+        self.assertEqual(restored.likes_count, 3)
+
+    def test_reconcile_blog_likes_command_fixes_drift(self):
+        self.post.likes.add(self.reader)
+        BlogPost.objects.filter(pk=self.post.pk).update(likes_count=7)
+
+        out = StringIO()
+        call_command('reconcile_blog_likes', '--dry-run', stdout=out)
+        self.assertIn(f'post={self.post.pk} likes_count=7 actual=1', out.getvalue())
+        self.assertEqual(self._stored_count(), 7)
+
+        out = StringIO()
+        call_command('reconcile_blog_likes', stdout=out)
+        self.assertIn('Fixed 1 blog like counter(s).', out.getvalue())
+        self.assertEqual(self._stored_count(), 1)
@@ -2,12 +2,32 @@ from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.db.models import BooleanField, Exists, OuterRef, Value
 from django.shortcuts import get_object_or_404
+from .likes import set_post_like, toggle_post_like
 from .models import BlogPost, Comment
 from .serializers import BlogPostListSerializer, BlogPostDetailSerializer, CommentSerializer
 from products.views import CustomPagination
 from openeire_api.throttling import SharedScopedRateThrottle
 
+def annotate_blog_list(queryset, user):
+    """
+    Everything the list serializer reads, resolved with the page query plus
+    one tag prefetch: author, tags and whether ``user`` liked each post.
+    """
+    if user is not None and user.is_authenticated:
+        has_liked = Exists(
+            BlogPost.likes.through.objects.filter(blogpost_id=OuterRef('pk'), user_id=user.pk)
+        )
+    else:
+        has_liked = Value(False, output_field=BooleanField())
+    return (
+        queryset.select_related('author')
+        .prefetch_related('tags')
+        .annotate(has_liked=has_liked)
+    )
+
+
 class BlogPostListView(generics.ListAPIView):
     """
     API endpoint to list all published blog posts.
@@ -27,7 +47,7 @@ class BlogPostListView(generics.ListAPIView):
             # Filter by the tag slug (slug is usually the tag name in lowercase)
             queryset = queryset.filter(tags__slug__in=[tag_slug])
             
-        return queryset
+        return annotate_blog_list(queryset, self.request.user)
 
 class BlogPostDetailView(generics.RetrieveAPIView):
     queryset = BlogPost.objects.filter(status=1)
@@ -38,27 +58,32 @@ class BlogPostDetailView(generics.RetrieveAPIView):
 class BlogPostLikeView(APIView):
     """
     POST: Toggle like status for a specific blog post.
+    PUT: Like the post (idempotent).
+    DELETE: Unlike the post (idempotent).
     """
     permission_classes = [IsAuthenticated]
 
-    def post(self, request, slug):
-        post = get_object_or_404(BlogPost, slug=slug)
-        user = request.user
-
-        if post.likes.filter(id=user.id).exists():
-            # Already liked? Remove it (Unlike)
-            post.likes.remove(user)
-            liked = False
-        else:
-            # Not liked? Add it (Like)
-            post.likes.add(user)
-            liked = True
-        
+    def _get_post(self, slug):
+        return get_object_or_404(BlogPost.objects.only('pk', 'likes_count'), slug=slug)
+
+    def _respond(self, liked, likes_count):
         return Response({
-            'liked': liked, 
-            'likes_count': post.number_of_likes()
+            'liked': liked,
+            'likes_count': likes_count
         }, status=status.HTTP_200_OK)
 
+    def post(self, request, slug):
+        post = self._get_post(slug)
+        return self._respond(*toggle_post_like(post, request.user.pk))
+
+    def put(self, request, slug):
+        post = self._get_post(slug)
+        return self._respond(*set_post_like(post, request.user.pk, True))
+
+    def delete(self, request, slug):
+        post = self._get_post(slug)
+        return self._respond(*set_post_like(post, request.user.pk, False))
+
 class CommentListCreateView(generics.ListCreateAPIView):
     serializer_class = CommentSerializer
 
@@ -92,4 +117,7 @@ class LikedPostsView(generics.ListAPIView):
 
     def get_queryset(self):
         # Filter posts where the 'likes' field contains the current user
-        return BlogPost.objects.filter(likes=self.request.user).order_by('-created_at')
+        queryset = BlogPost.objects.filter(
+            pk__in=BlogPost.likes.through.objects.filter(user_id=self.request.user.pk).values('blogpost_id')
+        ).order_by('-created_at')
+        return annotate_blog_list(queryset, self.request.user)
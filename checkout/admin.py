@@ -38,6 +38,7 @@ class OrderAdmin(admin.ModelAdmin):
                        'prodigi_submission_started_at',
                        'fulfilment_hold_reason',
                        'prodigi_last_polled_at',
+                       'prodigi_next_poll_at',
                        'prodigi_shipments', 'tracking_email_sent_at',
                        'tracking_email_signature')
 
@@ -7,6 +7,7 @@ from django.core.mail import EmailMessage
 from django.urls import reverse
 from django.utils import timezone
 
+from openeire_api.mail_outbox import send_message
 from openeire_api.mail_utils import get_default_from_email
 
 
@@ -137,7 +138,7 @@ def send_fulfilment_failure_alert(order, error):
         to=recipients,
     )
     try:
-        email.send(fail_silently=False)
+        send_message(email)
     except Exception:
         if cache_available:
             try:
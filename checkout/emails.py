@@ -5,6 +5,7 @@ from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 from django.urls import reverse
 
+from openeire_api.mail_outbox import send_message
 from openeire_api.mail_utils import (
     get_contact_email_address,
     get_default_from_email,
@@ -74,4 +75,4 @@ def send_order_confirmation_email(order, request=None):
         from_email=get_default_from_email(),
         to=[cust_email],
     )
-    email.send(fail_silently=False)
+    send_message(email)
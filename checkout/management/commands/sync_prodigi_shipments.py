@@ -1,12 +1,19 @@
+import csv
+import json
 import logging
+import time
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from checkout.prodigi import get_prodigi_client
 from checkout.tracking import (
+    PRODIGI_SYNC_DEBUG_FIELDS,
     get_prodigi_sync_candidates,
     get_prodigi_sync_debug_rows,
-    refresh_order_from_prodigi,
+    refresh_orders_from_prodigi,
 )
+from openeire_api.mail_outbox import mail_outbox
 
 logger = logging.getLogger(__name__)
 
@@ -21,48 +28,52 @@ class Command(BaseCommand):
             default=90,
             help="Look back this many days for candidate Prodigi orders. Defaults to 90.",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help=(
+                "Number of concurrent Prodigi lookups. Defaults to "
+                "PRODIGI_SYNC_MAX_WORKERS; requests stay under PRODIGI_MAX_REQUESTS_PER_SECOND."
+            ),
+        )
         parser.add_argument(
             "--debug-candidates",
             action="store_true",
             help="Print recent order candidate/exclusion reasons and exit without syncing.",
         )
+        parser.add_argument(
+            "--format",
+            choices=("text", "csv", "jsonl"),
+            default="text",
+            help="Output format for --debug-candidates. Defaults to text.",
+        )
 
     def handle(self, *args, **options):
         lookback_days = max(int(options["days"] or 0), 1)
         debug_candidates = bool(options.get("debug_candidates"))
-        candidates = list(
-            get_prodigi_sync_candidates(lookback_days=lookback_days)
-        )
+        workers = options.get("workers")
+        if workers is None:
+            workers = getattr(settings, "PRODIGI_SYNC_MAX_WORKERS", 4)
+        workers = max(int(workers or 0), 1)
 
         if debug_candidates:
-            debug_rows = get_prodigi_sync_debug_rows(lookback_days=lookback_days)
-            self.stdout.write(
-                f"Candidate debug for recent orders in the last {lookback_days} day(s):"
+            self._write_debug_rows(
+                get_prodigi_sync_debug_rows(lookback_days=lookback_days),
+                lookback_days=lookback_days,
+                output_format=options.get("format") or "text",
             )
-            if not debug_rows:
-                self.stdout.write("  (no recent orders found)")
-            for row in debug_rows:
-                self.stdout.write(
-                    "  - order_number={order_number} prodigi_order_id={prodigi_order_id} "
-                    "status={prodigi_status} included={included} reasons={reasons} "
-                    "tracking_email_sent_at={tracking_email_sent_at} "
-                    "prodigi_last_polled_at={prodigi_last_polled_at}".format(
-                        order_number=row["order_number"],
-                        prodigi_order_id=row["prodigi_order_id"],
-                        prodigi_status=row["prodigi_status"],
-                        included=str(row["included"]).lower(),
-                        reasons=",".join(row["reasons"]),
-                        tracking_email_sent_at=row["tracking_email_sent_at"] or "n/a",
-                        prodigi_last_polled_at=row["prodigi_last_polled_at"] or "n/a",
-                    )
-                )
-            self.stdout.write("Debug mode only: no Prodigi sync was run.")
             return
 
+        candidates = list(
+            get_prodigi_sync_candidates(lookback_days=lookback_days)
+        )
+
         logger.info(
-            "Starting scheduled Prodigi shipment sync fallback. candidate_count=%s lookback_days=%s",
+            "Starting scheduled Prodigi shipment sync fallback. candidate_count=%s lookback_days=%s workers=%s",
             len(candidates),
             lookback_days,
+            workers,
         )
         self.stdout.write(
             f"Found {len(candidates)} candidate Prodigi order(s) in the last {lookback_days} day(s)."
@@ -71,10 +82,26 @@ class Command(BaseCommand):
         refreshed_count = 0
         emailed_count = 0
         failed_count = 0
+        started_at = time.monotonic()
+
+        # Tracking emails for the whole run share one SMTP connection.
+        with mail_outbox():
+            for order, sync_result, exc in refresh_orders_from_prodigi(candidates, max_workers=workers):
+                if exc is not None:
+                    failed_count += 1
+                    logger.error(
+                        "Prodigi shipment sync failed for order_number=%s prodigi_order_id=%s",
+                        order.order_number,
+                        order.prodigi_order_id,
+                        exc_info=(type(exc), exc, exc.__traceback__),
+                    )
+                    self.stderr.write(
+                        self.style.WARNING(
+                            f"Failed to sync order {order.order_number} ({order.prodigi_order_id}): {exc}"
+                        )
+                    )
+                    continue
 
-        for order in candidates:
-            try:
-                sync_result = refresh_order_from_prodigi(order, mark_polled=True)
                 refreshed_count += 1
                 if sync_result["email_sent"]:
                     emailed_count += 1
@@ -88,22 +115,65 @@ class Command(BaseCommand):
                     sync_result["email_sent"],
                     sync_result["email_skipped_reason"] or "",
                 )
-            except Exception as exc:
-                failed_count += 1
-                logger.exception(
-                    "Prodigi shipment sync failed for order_number=%s prodigi_order_id=%s",
-                    order.order_number,
-                    order.prodigi_order_id,
-                )
-                self.stderr.write(
-                    self.style.WARNING(
-                        f"Failed to sync order {order.order_number} ({order.prodigi_order_id}): {exc}"
-                    )
-                )
 
         summary = (
             f"Prodigi shipment sync complete. candidates={len(candidates)} "
-            f"refreshed={refreshed_count} emailed={emailed_count} failed={failed_count}"
+            f"refreshed={refreshed_count} emailed={emailed_count} failed={failed_count} "
+            f"elapsed_seconds={time.monotonic() - started_at:.1f}"
         )
         logger.info(summary)
+        logger.info("Prodigi request metrics: %s", get_prodigi_client().metrics.snapshot())
         self.stdout.write(self.style.SUCCESS(summary))
+
+    def _write_debug_rows(self, rows, *, lookback_days, output_format):
+        if output_format == "csv":
+            writer = csv.writer(self.stdout, lineterminator="\n")
+            writer.writerow((*PRODIGI_SYNC_DEBUG_FIELDS, "included", "reasons"))
+            for row in rows:
+                writer.writerow(
+                    (
+                        *(_debug_value(row[field]) for field in PRODIGI_SYNC_DEBUG_FIELDS),
+                        str(row["included"]).lower(),
+                        ",".join(row["reasons"]),
+                    )
+                )
+            return
+
+        if output_format == "jsonl":
+            for row in rows:
+                self.stdout.write(json.dumps(row, default=_debug_value, sort_keys=True))
+            return
+
+        self.stdout.write(
+            f"Candidate debug for recent orders in the last {lookback_days} day(s):"
+        )
+        row_count = 0
+        for row in rows:
+            row_count += 1
+            self.stdout.write(
+                "  - order_number={order_number} prodigi_order_id={prodigi_order_id} "
+                "status={prodigi_status} included={included} reasons={reasons} "
+                "tracking_email_sent_at={tracking_email_sent_at} "
+                "prodigi_last_polled_at={prodigi_last_polled_at} "
+                "prodigi_next_poll_at={prodigi_next_poll_at}".format(
+                    order_number=row["order_number"],
+                    prodigi_order_id=row["prodigi_order_id"],
+                    prodigi_status=row["prodigi_status"],
+                    included=str(row["included"]).lower(),
+                    reasons=",".join(row["reasons"]),
+                    tracking_email_sent_at=row["tracking_email_sent_at"] or "n/a",
+                    prodigi_last_polled_at=row["prodigi_last_polled_at"] or "n/a",
+                    prodigi_next_poll_at=row["prodigi_next_poll_at"] or "n/a",
+                )
+            )
+        if not row_count:
+            self.stdout.write("  (no recent orders found)")
+        self.stdout.write("Debug mode only: no Prodigi sync was run.")
+
+
+def _debug_value(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("checkout", "0012_alter_productshipping_country"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="prodigi_next_poll_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("checkout", "0013_order_prodigi_next_poll_at"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(
+                    ("prodigi_order_id__isnull", False),
+                    ("prodigi_status__isnull", False),
+                    _connector="OR",
+                ),
+                fields=["-date"],
+                name="order_prodigi_sync_date_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def backfill_normalized_email(apps, schema_editor):
+    Order = apps.get_model("checkout", "Order")
+    Order.objects.update(normalized_email=Lower(Trim("email")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("checkout", "0014_order_prodigi_sync_date_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="normalized_email",
+            field=models.CharField(blank=True, default="", editable=False, max_length=254),
+        ),
+        migrations.RunPython(backfill_normalized_email, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("user_profile__isnull", True)),
+                fields=["normalized_email"],
+                name="order_unclaimed_email_idx",
+            ),
+        ),
+    ]
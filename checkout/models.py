@@ -53,6 +53,10 @@ class CheckoutAttempt(models.Model):
         return str(self.checkout_key)
 
 
+def normalize_order_email(value):
+    return str(value or "").strip().lower()
+
+
 class Order(models.Model):
     CONFIRMATION_EMAIL_STATUS_CHOICES = [
         ("PENDING", "Pending"),
@@ -85,6 +89,7 @@ class Order(models.Model):
 
     first_name = models.CharField(max_length=150, null=True, blank=True)
     email = models.EmailField(max_length=254, null=False, blank=False)
+    normalized_email = models.CharField(max_length=254, blank=True, default="", editable=False)
     phone_number = models.CharField(max_length=20, null=True, blank=True)
     street_address1 = models.CharField(max_length=255, null=True, blank=True)
     street_address2 = models.CharField(max_length=255, null=True, blank=True)
@@ -120,6 +125,7 @@ class Order(models.Model):
     prodigi_shipments = models.JSONField(default=list, blank=True)
     prodigi_last_callback_at = models.DateTimeField(null=True, blank=True)
     prodigi_last_polled_at = models.DateTimeField(null=True, blank=True)
+    prodigi_next_poll_at = models.DateTimeField(null=True, blank=True, db_index=True)
     tracking_email_sent_at = models.DateTimeField(null=True, blank=True)
     tracking_email_signature = models.CharField(max_length=64, null=True, blank=True)
     confirmation_email_status = models.CharField(
@@ -139,6 +145,18 @@ class Order(models.Model):
                 name="uniq_order_nonempty_stripe_pid",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=("-date",),
+                condition=Q(prodigi_order_id__isnull=False) | Q(prodigi_status__isnull=False),
+                name="order_prodigi_sync_date_idx",
+            ),
+            models.Index(
+                fields=("normalized_email",),
+                condition=Q(user_profile__isnull=True),
+                name="order_unclaimed_email_idx",
+            ),
+        ]
 
     def _generate_order_number(self):
         return uuid.uuid4().hex.upper()
@@ -146,6 +164,10 @@ class Order(models.Model):
     def save(self, *args, **kwargs):
         if not self.order_number:
             self.order_number = self._generate_order_number()
+        self.normalized_email = normalize_order_email(self.email)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "email" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "normalized_email"}
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -1,21 +1,22 @@
-from django.db.models.functions import Lower, Trim
+import logging
 
-from .models import Order
+from django.contrib.auth import get_user_model
 
-UNCLAIMABLE_ORDER_EMAILS = {"guest@example.com"}
+from .models import Order, normalize_order_email
 
+logger = logging.getLogger(__name__)
 
-def _normalized_email(value):
-    return str(value or "").strip().lower()
+UNCLAIMABLE_ORDER_EMAILS = {"guest@example.com"}
 
 
 def claim_guest_orders_for_user(user):
     """
     Attach previously guest-owned orders to the authenticated user's profile
-    by matching the normalized order email to the user's normalized email.
+    by matching the stored normalized order email to the user's normalized
+    email. Served by the ``order_unclaimed_email_idx`` partial index.
     Safe to call repeatedly.
     """
-    normalized_email = _normalized_email(getattr(user, "email", ""))
+    normalized_email = normalize_order_email(getattr(user, "email", ""))
     if not normalized_email or normalized_email in UNCLAIMABLE_ORDER_EMAILS:
         return 0
 
@@ -23,10 +24,47 @@ def claim_guest_orders_for_user(user):
     if user_profile is None:
         return 0
 
-    return (
-        Order.objects.filter(user_profile__isnull=True)
-        .annotate(normalized_order_email=Lower(Trim("email")))
-        .exclude(normalized_order_email__in=UNCLAIMABLE_ORDER_EMAILS)
-        .filter(normalized_order_email=normalized_email)
-        .update(user_profile=user_profile)
+    return Order.objects.filter(
+        user_profile__isnull=True,
+        normalized_email=normalized_email,
+    ).update(user_profile=user_profile)
+
+
+def claim_guest_order_for_known_email(order):
+    """
+    Attach a freshly created guest order to the single verified account that
+    owns its email, so the buyer sees it without logging in again.
+    Returns the claiming user, or ``None`` when no unambiguous owner exists.
+    """
+    if order.user_profile_id is not None:
+        return None
+
+    normalized_email = order.normalized_email or normalize_order_email(order.email)
+    if not normalized_email or normalized_email in UNCLAIMABLE_ORDER_EMAILS:
+        return None
+
+    owners = list(
+        get_user_model().objects.filter(email__iexact=normalized_email, is_active=True)
+        .select_related("userprofile")[:2]
     )
+    if len(owners) != 1:
+        return None
+
+    owner = owners[0]
+    user_profile = getattr(owner, "userprofile", None)
+    if user_profile is None:
+        return None
+
+    claimed = Order.objects.filter(pk=order.pk, user_profile__isnull=True).update(
+        user_profile=user_profile
+    )
+    if not claimed:
+        return None
+    order.user_profile = user_profile
+    logger.info(
+        "Claimed new guest order for existing account. order_number=%s user_id=%s",
+        order.order_number,
+        owner.id,
+    )
+    return owner
+
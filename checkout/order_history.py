@@ -0,0 +1,63 @@
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+
+from products.models import Photo, ProductVariant, Video
+from products.personal_downloads import bulk_ensure_personal_download_tokens
+from products.personal_licence import bulk_ensure_personal_licence_tokens
+
+from .models import OrderItem
+
+DIGITAL_PRODUCT_MODELS = (Photo, Video)
+
+# Extra joins needed by the nested product serializers, keyed by model.
+PRODUCT_SELECT_RELATED = {
+    ProductVariant: ("photo",),
+}
+
+
+def prefetch_order_item_products(order_items):
+    """
+    Resolve the ``product`` GenericForeignKey for many items at once.
+
+    Items are grouped by content type so the cost is one query per product
+    model on the page rather than one per item.
+    """
+    ids_by_content_type = defaultdict(set)
+    for item in order_items:
+        ids_by_content_type[item.content_type_id].add(item.object_id)
+
+    products = {}
+    for content_type_id, object_ids in ids_by_content_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is None:
+            continue
+        queryset = model._base_manager.filter(pk__in=object_ids)
+        select_related = PRODUCT_SELECT_RELATED.get(model)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        for product in queryset:
+            products[(content_type_id, product.pk)] = product
+
+    product_field = OrderItem._meta.get_field("product")
+    for item in order_items:
+        product_field.set_cached_value(item, products.get((item.content_type_id, item.object_id)))
+
+
+def prepare_order_history_page(orders):
+    """
+    Load everything ``OrderHistoryListSerializer`` needs for a page of
+    orders (with ``items`` prefetched) and return it as serializer context.
+    """
+    order_items = [item for order in orders for item in order.items.all()]
+    prefetch_order_item_products(order_items)
+
+    digital_items = [
+        item for item in order_items if isinstance(item.product, DIGITAL_PRODUCT_MODELS)
+    ]
+    digital_orders = {item.order_id: item.order for item in digital_items}
+
+    return {
+        "download_tokens": bulk_ensure_personal_download_tokens(digital_items),
+        "licence_tokens": bulk_ensure_personal_licence_tokens(digital_orders.values()),
+    }
@@ -1,15 +1,25 @@
 import logging
 import os
 import ipaddress
+import threading
+import time
+from email.utils import parsedate_to_datetime
 from typing import Dict, List, Optional, Tuple
 from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
 
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.cache import caches
 from django.core.exceptions import ImproperlyConfigured
 from django.urls import reverse
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
+_client_lock = threading.Lock()
+_shared_client = None
+
+RETRYABLE_PRODIGI_STATUS_CODES = {429, 500, 502, 503, 504}
 
 
 class ProdigiFulfillmentError(RuntimeError):
@@ -22,6 +32,13 @@ class ProdigiFulfillmentError(RuntimeError):
         )
 
 
+class ProdigiUnavailableError(RuntimeError):
+    """Raised without calling Prodigi while the circuit breaker is open."""
+
+    def __init__(self, message="Prodigi is temporarily unavailable; retry later."):
+        super().__init__(message)
+
+
 def _is_non_public_prodigi_asset_url(url: str) -> bool:
     raw_url = str(url or "").strip()
     if not raw_url:
@@ -100,6 +117,317 @@ def _request_timeout() -> Tuple[float, float]:
     return (connect_timeout, read_timeout)
 
 
+class ProdigiRateLimiter:
+    """
+    Space outbound Prodigi requests so the whole process stays under a fixed
+    request rate, however many threads are polling at once.
+    """
+
+    def __init__(self, requests_per_second: float, *, clock=time.monotonic, sleep=time.sleep):
+        self.requests_per_second = max(float(requests_per_second or 0), 0.0)
+        self._interval = 1.0 / self.requests_per_second if self.requests_per_second else 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> float:
+        """Block until the caller may send a request; return the seconds waited."""
+        if not self._interval:
+            return 0.0
+
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+
+        delay = slot - now
+        if delay > 0:
+            self._sleep(delay)
+        return max(delay, 0.0)
+
+
+class ProdigiCircuitBreaker:
+    """
+    Shared circuit breaker for Prodigi, kept in the default cache so every
+    worker and instance stops calling Prodigi once it is clearly down.
+
+    After ``failure_threshold`` transport/5xx failures inside the failure
+    window the breaker opens for ``open_seconds``. The first failure after it
+    closes again re-opens it immediately; the first success resets it.
+    """
+
+    FAILURES_KEY = "prodigi-circuit:failures"
+    OPEN_KEY = "prodigi-circuit:open"
+    TRIPPED_KEY = "prodigi-circuit:tripped"
+
+    def __init__(
+        self,
+        *,
+        cache_alias: str = "default",
+        failure_threshold: Optional[int] = None,
+        failure_window_seconds: Optional[int] = None,
+        open_seconds: Optional[int] = None,
+    ):
+        self.cache_alias = cache_alias
+        self.failure_threshold = max(
+            int(
+                failure_threshold
+                if failure_threshold is not None
+                else getattr(settings, "PRODIGI_CIRCUIT_FAILURE_THRESHOLD", 5)
+            ),
+            1,
+        )
+        self.failure_window_seconds = max(
+            int(
+                failure_window_seconds
+                if failure_window_seconds is not None
+                else getattr(settings, "PRODIGI_CIRCUIT_FAILURE_WINDOW_SECONDS", 60)
+            ),
+            1,
+        )
+        self.open_seconds = max(
+            int(
+                open_seconds
+                if open_seconds is not None
+                else getattr(settings, "PRODIGI_CIRCUIT_OPEN_SECONDS", 60)
+            ),
+            1,
+        )
+
+    def _cache(self):
+        return caches[self.cache_alias]
+
+    def is_open(self) -> bool:
+        try:
+            return bool(self._cache().get(self.OPEN_KEY))
+        except Exception:
+            # A cache outage must not take Prodigi fulfilment down with it.
+            logger.warning("Prodigi circuit breaker state unavailable; allowing request.", exc_info=True)
+            return False
+
+    def record_success(self):
+        try:
+            self._cache().delete_many([self.FAILURES_KEY, self.TRIPPED_KEY])
+        except Exception:
+            logger.warning("Could not reset Prodigi circuit breaker state.", exc_info=True)
+
+    def record_failure(self):
+        try:
+            cache = self._cache()
+            if cache.get(self.TRIPPED_KEY):
+                self._open(cache, failures=None)
+                return
+            cache.add(self.FAILURES_KEY, 0, timeout=self.failure_window_seconds)
+            try:
+                failures = cache.incr(self.FAILURES_KEY)
+            except ValueError:
+                cache.set(self.FAILURES_KEY, 1, timeout=self.failure_window_seconds)
+                failures = 1
+            if failures >= self.failure_threshold:
+                self._open(cache, failures=failures)
+        except Exception:
+            logger.warning("Could not record Prodigi circuit breaker failure.", exc_info=True)
+
+    def _open(self, cache, *, failures):
+        cache.set(self.OPEN_KEY, "1", timeout=self.open_seconds)
+        cache.set(self.TRIPPED_KEY, "1", timeout=self.open_seconds * 10)
+        cache.delete(self.FAILURES_KEY)
+        logger.error(
+            "Prodigi circuit breaker opened; failing fast for %s second(s) (recent_failures=%s)",
+            self.open_seconds,
+            failures if failures is not None else "probe",
+        )
+
+    def reset(self):
+        self._cache().delete_many([self.FAILURES_KEY, self.OPEN_KEY, self.TRIPPED_KEY])
+
+
+class ProdigiRequestMetrics:
+    """In-process latency and outcome counters per Prodigi endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, dict] = {}
+
+    def record(self, endpoint: str, *, elapsed_seconds: float, outcome: str):
+        elapsed_ms = max(elapsed_seconds, 0.0) * 1000
+        with self._lock:
+            stats = self._endpoints.setdefault(
+                endpoint,
+                {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "outcomes": {}},
+            )
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["outcomes"][outcome] = stats["outcomes"].get(outcome, 0) + 1
+            if not outcome.startswith("2"):
+                stats["errors"] += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                endpoint: {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "avg_ms": round(stats["total_ms"] / stats["count"], 1) if stats["count"] else 0.0,
+                    "max_ms": round(stats["max_ms"], 1),
+                    "outcomes": dict(stats["outcomes"]),
+                }
+                for endpoint, stats in self._endpoints.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+def _retry_after_seconds(response) -> Optional[float]:
+    raw_value = str(response.headers.get("Retry-After") or "").strip()
+    if not raw_value:
+        return None
+    try:
+        return max(float(raw_value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(raw_value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        return None
+    return max((retry_at - timezone.now()).total_seconds(), 0.0)
+
+
+class ProdigiClient:
+    """
+    Pooled, retrying HTTP client for the Prodigi API.
+
+    Every call shares one keep-alive session, the process-wide rate limiter
+    and the shared circuit breaker. 429/5xx responses and connection errors
+    are retried with backoff (honouring ``Retry-After``); read timeouts are
+    not, so a slow Prodigi cannot hold a worker for several full timeouts.
+    Order creation is safe to retry because Prodigi deduplicates it on the
+    order number sent as ``idempotencyKey``.
+    """
+
+    def __init__(
+        self,
+        *,
+        base_url: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        rate_limiter: Optional[ProdigiRateLimiter] = None,
+        circuit_breaker: Optional[ProdigiCircuitBreaker] = None,
+        metrics: Optional[ProdigiRequestMetrics] = None,
+        max_retries: Optional[int] = None,
+        sleep=time.sleep,
+    ):
+        self.base_url = base_url
+        self.session = session or self._build_session()
+        self.rate_limiter = rate_limiter or ProdigiRateLimiter(
+            getattr(settings, "PRODIGI_MAX_REQUESTS_PER_SECOND", 5)
+        )
+        self.circuit_breaker = circuit_breaker or ProdigiCircuitBreaker()
+        self.metrics = metrics or ProdigiRequestMetrics()
+        self.max_retries = max(
+            int(
+                max_retries
+                if max_retries is not None
+                else getattr(settings, "PRODIGI_MAX_RETRIES", 2)
+            ),
+            0,
+        )
+        self._sleep = sleep
+
+    @staticmethod
+    def _build_session() -> requests.Session:
+        pool_size = max(int(getattr(settings, "PRODIGI_HTTP_POOL_MAXSIZE", 10)), 1)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        if response is not None:
+            retry_after = _retry_after_seconds(response)
+            if retry_after is not None:
+                return retry_after
+        backoff = float(getattr(settings, "PRODIGI_RETRY_BACKOFF_SECONDS", 0.5))
+        return backoff * (2 ** attempt)
+
+    def request(self, method: str, path: str, *, endpoint: str, headers: Dict[str, str], json=None):
+        if self.circuit_breaker.is_open():
+            self.metrics.record(endpoint, elapsed_seconds=0.0, outcome="circuit_open")
+            logger.warning("Prodigi circuit breaker is open; skipping request (endpoint=%s)", endpoint)
+            raise ProdigiUnavailableError()
+
+        url = f"{self.base_url or _prodigi_base_url()}{path}"
+        max_delay = float(getattr(settings, "PRODIGI_RETRY_MAX_DELAY_SECONDS", 5))
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            started_at = time.monotonic()
+            try:
+                response = self.session.request(
+                    method,
+                    url,
+                    json=json,
+                    headers=headers,
+                    timeout=_request_timeout(),
+                )
+            except requests.RequestException as exc:
+                elapsed = time.monotonic() - started_at
+                self.metrics.record(endpoint, elapsed_seconds=elapsed, outcome=exc.__class__.__name__)
+                retryable = isinstance(exc, requests.ConnectionError)
+                delay = self._retry_delay(attempt)
+                if retryable and attempt < self.max_retries and delay <= max_delay:
+                    attempt += 1
+                    self._sleep(delay)
+                    continue
+                self.circuit_breaker.record_failure()
+                raise
+
+            elapsed = time.monotonic() - started_at
+            self.metrics.record(endpoint, elapsed_seconds=elapsed, outcome=str(response.status_code))
+            logger.info(
+                "Prodigi request completed (endpoint=%s, status=%s, attempt=%s, elapsed_ms=%.0f)",
+                endpoint,
+                response.status_code,
+                attempt + 1,
+                elapsed * 1000,
+            )
+            if response.status_code in RETRYABLE_PRODIGI_STATUS_CODES and attempt < self.max_retries:
+                delay = self._retry_delay(attempt, response)
+                if delay <= max_delay:
+                    attempt += 1
+                    self._sleep(delay)
+                    continue
+
+            if response.status_code >= 500:
+                self.circuit_breaker.record_failure()
+            elif response.status_code < 400:
+                self.circuit_breaker.record_success()
+            return response
+
+    def get_order(self, prodigi_order_id: str, *, headers: Dict[str, str]):
+        return self.request("GET", f"orders/{prodigi_order_id}", endpoint="orders.get", headers=headers)
+
+    def create_order(self, payload: dict, *, headers: Dict[str, str]):
+        return self.request("POST", "orders", endpoint="orders.create", headers=headers, json=payload)
+
+
+def get_prodigi_client() -> ProdigiClient:
+    """Return the process-wide Prodigi client."""
+    global _shared_client
+
+    if _shared_client is None:
+        with _client_lock:
+            if _shared_client is None:
+                _shared_client = ProdigiClient()
+    return _shared_client
+
+
 def _parse_prodigi_error(response: requests.Response) -> Tuple[Optional[str], Optional[str], List[str]]:
     """Extract safe diagnostic fields from a Prodigi error response."""
     outcome = None
@@ -236,14 +564,15 @@ def fetch_prodigi_order(prodigi_order_id: str) -> dict:
     if not normalized_order_id:
         raise RuntimeError("Prodigi callback did not include an order id.")
 
-    url = f"{_prodigi_base_url()}orders/{normalized_order_id}"
-
+    headers = _prodigi_headers()
     try:
-        response = requests.get(
-            url,
-            headers=_prodigi_headers(),
-            timeout=_request_timeout(),
+        response = get_prodigi_client().get_order(normalized_order_id, headers=headers)
+    except ProdigiUnavailableError:
+        logger.warning(
+            "Prodigi order lookup skipped while circuit breaker is open (prodigi_order_id=%s)",
+            normalized_order_id,
         )
+        raise
     except requests.Timeout:
         logger.error("Prodigi order lookup timed out (prodigi_order_id=%s)", normalized_order_id)
         raise RuntimeError("Prodigi order lookup timed out.") from None
@@ -288,7 +617,8 @@ def create_prodigi_order(order):
     """
     Formats an OpenEire order and sends it to the Prodigi API.
     """
-    url = f"{_prodigi_base_url()}orders"
+    client = get_prodigi_client()
+    base_url = client.base_url or _prodigi_base_url()
     site_url = os.environ.get("SITE_URL", "http://127.0.0.1:8000")
     headers = _prodigi_headers(order.order_number)
 
@@ -394,7 +724,7 @@ def create_prodigi_order(order):
     }
 
     callback_url = _get_prodigi_callback_url()
-    prodigi_mode = "sandbox" if "sandbox" in url.lower() else "live"
+    prodigi_mode = "sandbox" if "sandbox" in base_url.lower() else "live"
     redacted_callback_url = _redact_callback_url(callback_url)
     if callback_url:
         payload["callbackUrl"] = callback_url
@@ -419,12 +749,13 @@ def create_prodigi_order(order):
         )
 
     try:
-        response = requests.post(
-            url,
-            json=payload,
-            headers=headers,
-            timeout=_request_timeout(),
+        response = client.create_order(payload, headers=headers)
+    except ProdigiUnavailableError:
+        logger.warning(
+            "Prodigi fulfillment deferred while circuit breaker is open (order=%s)",
+            order.order_number,
         )
+        raise
     except requests.Timeout:
         logger.error("Prodigi request timed out (order=%s)", order.order_number)
         raise RuntimeError("Prodigi fulfillment timed out.") from None
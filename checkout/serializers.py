@@ -305,7 +305,11 @@ class OrderHistoryItemSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if not request:
             return None
-        token_obj = ensure_personal_download_token(obj)
+        download_tokens = self.context.get('download_tokens')
+        if download_tokens is not None and obj.id in download_tokens:
+            token_obj = download_tokens[obj.id]
+        else:
+            token_obj = ensure_personal_download_token(obj)
         if not token_obj:
             return None
         path = reverse('personal-asset-download', args=[str(token_obj.token)])
@@ -330,6 +334,7 @@ class OrderHistoryItemSerializer(serializers.ModelSerializer):
             return build_personal_licence_download_url(
                 obj.order,
                 request=request,
+                token_obj=self.context.get('licence_tokens', {}).get(obj.order_id),
             )
         except RuntimeError:
             return None
@@ -0,0 +1,210 @@
+import os
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from django.test import SimpleTestCase, override_settings
+
+from checkout.prodigi import (
+    ProdigiCircuitBreaker,
+    ProdigiClient,
+    ProdigiFulfillmentError,
+    ProdigiRateLimiter,
+    ProdigiUnavailableError,
+    create_prodigi_order,
+    fetch_prodigi_order,
+)
+from checkout.test_utils import FakeProdigiServer
+
+
+class _ItemsManager:
+    def __init__(self, items):
+        self._items = items
+
+    def all(self):
+        return self._items
+
+
+def _physical_order(order_number="ORDER-CLIENT-1"):
+    product = SimpleNamespace(
+        prodigi_sku="ECO-CAN-12X18",
+        material="eco_canvas",
+        photo=SimpleNamespace(
+            high_res_file=SimpleNamespace(url="https://cdn.example.com/high-res.jpg")
+        ),
+    )
+    return SimpleNamespace(
+        order_number=order_number,
+        first_name="Test Buyer",
+        email="buyer@example.com",
+        street_address1="1 Test Street",
+        street_address2="",
+        town="Dublin",
+        county="Dublin",
+        postcode="D01 F5P2",
+        country="IE",
+        shipping_method="budget",
+        items=_ItemsManager([SimpleNamespace(product=product, quantity=1)]),
+    )
+
+
+@override_settings(
+    PRODIGI_CALLBACK_BASE_URL="https://api.example.com",
+    PRODIGI_CALLBACK_TOKEN="",
+    PRODIGI_RETRY_MAX_DELAY_SECONDS=5,
+)
+class ProdigiClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeProdigiServer().start()
+        self.addCleanup(self.server.stop)
+        self.breaker = ProdigiCircuitBreaker(
+            failure_threshold=2,
+            failure_window_seconds=60,
+            open_seconds=60,
+        )
+        self.breaker.reset()
+        self.addCleanup(self.breaker.reset)
+        self.sleep = Mock()
+        self.client = ProdigiClient(
+            base_url=self.server.base_url,
+            rate_limiter=ProdigiRateLimiter(0),
+            circuit_breaker=self.breaker,
+            max_retries=2,
+            sleep=self.sleep,
+        )
+        client_patcher = patch("checkout.prodigi.get_prodigi_client", return_value=self.client)
+        client_patcher.start()
+        self.addCleanup(client_patcher.stop)
+        env_patcher = patch.dict(os.environ, {"PRODIGI_API_KEY": "test_key"}, clear=False)
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+
+    def test_fetch_order_reuses_pooled_session_and_records_latency(self):
+        self.server.add_order("ord_fake_1", stage="InProgress")
+
+        first = fetch_prodigi_order("ord_fake_1")
+        second = fetch_prodigi_order("ord_fake_1")
+
+        self.assertEqual(first["id"], "ord_fake_1")
+        self.assertEqual(second["status"]["stage"], "InProgress")
+        metrics = self.client.metrics.snapshot()["orders.get"]
+        self.assertEqual(metrics["count"], 2)
+        self.assertEqual(metrics["errors"], 0)
+        self.assertEqual(metrics["outcomes"], {"200": 2})
+
+    def test_fetch_order_retries_5xx_honouring_retry_after(self):
+        self.server.add_order("ord_fake_retry")
+        self.server.enqueue(503, {"outcome": "ServiceUnavailable"}, {"Retry-After": "2"})
+
+        order = fetch_prodigi_order("ord_fake_retry")
+
+        self.assertEqual(order["id"], "ord_fake_retry")
+        self.sleep.assert_called_once_with(2.0)
+        self.assertEqual(
+            self.client.metrics.snapshot()["orders.get"]["outcomes"],
+            {"503": 1, "200": 1},
+        )
+        self.assertFalse(self.breaker.is_open())
+
+    def test_create_order_retry_reuses_idempotency_key_without_duplicates(self):
+        self.server.enqueue(502, {"outcome": "BadGateway"})
+
+        response = create_prodigi_order(_physical_order("ORDER-IDEMPOTENT"))
+
+        self.assertEqual(response["outcome"], "Created")
+        posts = [request for request in self.server.requests if request["method"] == "POST"]
+        self.assertEqual(len(posts), 2)
+        self.assertEqual(
+            {request["body"]["idempotencyKey"] for request in posts},
+            {"ORDER-IDEMPOTENT"},
+        )
+        self.assertEqual(len(self.server.orders), 1)
+
+    def test_retry_after_beyond_limit_is_not_waited_for(self):
+        self.server.enqueue(429, {"outcome": "TooManyRequests"}, {"Retry-After": "120"})
+
+        with self.assertLogs("checkout.prodigi", level="WARNING"):
+            with self.assertRaises(ProdigiFulfillmentError) as raised:
+                create_prodigi_order(_physical_order())
+
+        self.assertEqual(raised.exception.status_code, 429)
+        self.sleep.assert_not_called()
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_circuit_opens_after_repeated_failures_and_fails_fast(self):
+        for _ in range(6):
+            self.server.enqueue(500, {"outcome": "InternalServerError"})
+
+        with self.assertLogs("checkout.prodigi", level="WARNING"):
+            for _ in range(2):
+                with self.assertRaises(RuntimeError):
+                    fetch_prodigi_order("ord_down")
+        request_count = len(self.server.requests)
+
+        self.assertTrue(self.breaker.is_open())
+        with self.assertLogs("checkout.prodigi", level="WARNING"):
+            with self.assertRaises(ProdigiUnavailableError):
+                create_prodigi_order(_physical_order())
+        self.assertEqual(len(self.server.requests), request_count)
+        self.assertEqual(
+            self.client.metrics.snapshot()["orders.create"]["outcomes"],
+            {"circuit_open": 1},
+        )
+
+    def test_first_failure_after_circuit_reopens_and_success_resets(self):
+        self.server.add_order("ord_recovering")
+        with patch.object(self.client, "max_retries", 0):
+            for _ in range(2):
+                self.server.enqueue(500, {"outcome": "InternalServerError"})
+            with self.assertLogs("checkout.prodigi", level="WARNING"):
+                for _ in range(2):
+                    with self.assertRaises(RuntimeError):
+                        fetch_prodigi_order("ord_recovering")
+
+            self.breaker._cache().delete(ProdigiCircuitBreaker.OPEN_KEY)
+            self.server.enqueue(500, {"outcome": "InternalServerError"})
+            with self.assertLogs("checkout.prodigi", level="WARNING"):
+                with self.assertRaises(RuntimeError):
+                    fetch_prodigi_order("ord_recovering")
+            self.assertTrue(self.breaker.is_open())
+
+            self.breaker._cache().delete(ProdigiCircuitBreaker.OPEN_KEY)
+            self.assertEqual(fetch_prodigi_order("ord_recovering")["id"], "ord_recovering")
+
+        self.assertIsNone(self.breaker._cache().get(ProdigiCircuitBreaker.TRIPPED_KEY))
+
+    def test_breaker_allows_requests_when_cache_is_unavailable(self):
+        with patch.object(self.breaker, "_cache", side_effect=RuntimeError("cache down")):
+            with self.assertLogs("checkout.prodigi", level="WARNING"):
+                self.assertFalse(self.breaker.is_open())
+
+
+class ProdigiRateLimiterTests(SimpleTestCase):
+    def test_acquire_spaces_requests_at_configured_rate(self):
+        clock = {"now": 100.0}
+        sleeps = []
+
+        def fake_sleep(seconds):
+            sleeps.append(seconds)
+
+        limiter = ProdigiRateLimiter(4, clock=lambda: clock["now"], sleep=fake_sleep)
+
+        waits = [limiter.acquire() for _ in range(3)]
+
+        self.assertEqual(waits, [0.0, 0.25, 0.5])
+        self.assertEqual(sleeps, [0.25, 0.5])
+
+    def test_acquire_does_not_wait_after_idle_period(self):
+        clock = {"now": 10.0}
+        limiter = ProdigiRateLimiter(2, clock=lambda: clock["now"], sleep=Mock())
+
+        limiter.acquire()
+        clock["now"] = 20.0
+
+        self.assertEqual(limiter.acquire(), 0.0)
+
+    def test_zero_rate_disables_limiting(self):
+        sleep = Mock()
+        limiter = ProdigiRateLimiter(0, sleep=sleep)
+
+        self.assertEqual(limiter.acquire(), 0.0)
+        sleep.assert_not_called()
@@ -0,0 +1,127 @@
+import json
+import threading
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeProdigiServer:
+    """
+    Minimal local stand-in for the Prodigi v4 orders API.
+
+    ``POST /v4.0/orders`` creates (or, for a repeated ``idempotencyKey``,
+    returns) an order and ``GET /v4.0/orders/<id>`` looks one up. Tests can
+    queue raw responses with ``enqueue`` to simulate throttling or outages;
+    every request is recorded in ``requests``.
+    """
+
+    def __init__(self):
+        self.orders = {}
+        self.orders_by_idempotency_key = {}
+        self.requests = []
+        self._queued_responses = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._build_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v4.0/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def enqueue(self, status, body=None, headers=None):
+        with self._lock:
+            self._queued_responses.append((status, body, headers or {}))
+
+    def add_order(self, order_id, *, stage="InProgress", merchant_reference="", shipments=None):
+        order = {
+            "id": order_id,
+            "merchantReference": merchant_reference,
+            "status": {"stage": stage},
+            "shipments": shipments or [],
+        }
+        with self._lock:
+            self.orders[order_id] = order
+        return order
+
+    def _handle(self, method, path, body):
+        with self._lock:
+            self.requests.append({"method": method, "path": path, "body": body})
+            if self._queued_responses:
+                return self._queued_responses.popleft()
+
+            if method == "POST" and path == "/v4.0/orders":
+                idempotency_key = str((body or {}).get("idempotencyKey") or "")
+                order = self.orders_by_idempotency_key.get(idempotency_key)
+                if order is None:
+                    order_id = f"ord_{uuid.uuid4().hex[:12]}"
+                    order = {
+                        "id": order_id,
+                        "merchantReference": (body or {}).get("merchantReference", ""),
+                        "status": {"stage": "InProgress"},
+                        "shipments": [],
+                    }
+                    self.orders[order_id] = order
+                    if idempotency_key:
+                        self.orders_by_idempotency_key[idempotency_key] = order
+                return 200, {"outcome": "Created", "order": order}, {}
+
+            if method == "GET" and path.startswith("/v4.0/orders/"):
+                order = self.orders.get(path.rsplit("/", 1)[-1])
+                if order is None:
+                    return 404, {"outcome": "NotFound"}, {}
+                return 200, {"outcome": "Ok", "order": order}, {}
+
+        return 404, {"outcome": "NotFound"}, {}
+
+    def _build_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw_body = self.rfile.read(length) if length else b""
+                try:
+                    body = json.loads(raw_body) if raw_body else None
+                except ValueError:
+                    body = None
+                status, payload, headers = fake._handle(method, self.path, body)
+                encoded = json.dumps(payload if payload is not None else {}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def log_message(self, *args):
+                return
+
+        return Handler
@@ -1,3 +1,4 @@
+import csv
 import shutil
 import uuid
 import json
@@ -17,8 +18,10 @@ from django.core.exceptions import ImproperlyConfigured
 from django.core import mail
 from django.core.management import call_command
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
 from django.db.models.signals import post_save
 from django.test import TestCase, override_settings, SimpleTestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError as DRFValidationError
@@ -32,6 +35,7 @@ from products.models import (
     ProductVariant,
     StripeWebhookEvent,
     LicenceDocument,
+    Video,
     LicenseRequestAuditLog,
     PersonalDownloadToken,
     generate_variants_for_photo,
@@ -41,6 +45,7 @@ from realestate.models import RealEstatePayment
 from realestate.models import RealEstateTimelineEvent
 from realestate.finance import ensure_invoices_for_arrangement
 from .discounts import record_discount_redemption
+from .order_claiming import claim_guest_order_for_known_email, claim_guest_orders_for_user
 from .attempts import canonicalize_cart
 from .models import CheckoutAttempt, DiscountRedemption, Order, OrderItem, ProductShipping
 from .address_validation import validate_physical_shipping_address
@@ -50,7 +55,9 @@ from .prodigi import (
     _is_non_public_prodigi_asset_url,
     _prodigi_base_url,
     _redact_callback_url,
+    ProdigiUnavailableError,
     create_prodigi_order,
+    get_prodigi_client,
 )
 from .admin import OrderAdmin
 from . import views as checkout_views
@@ -58,6 +65,8 @@ from .serializers import OrderHistoryItemSerializer, OrderSerializer
 from .shipping import ShippingConfigurationError, calculate_physical_shipping_quote
 from .tracking import (
     build_tracking_signature,
+    get_prodigi_sync_candidates,
+    get_prodigi_sync_debug_rows,
     normalize_prodigi_shipments,
     refresh_order_from_prodigi,
 )
@@ -284,6 +293,10 @@ class ProdigiIntegrationSecurityTests(SimpleTestCase):
         def url(self):
             return self._fallback_url
 
+    def setUp(self):
+        get_prodigi_client().circuit_breaker.reset()
+        self.addCleanup(get_prodigi_client().circuit_breaker.reset)
+
     def _build_order(
         self,
         *,
@@ -355,7 +368,7 @@ class ProdigiIntegrationSecurityTests(SimpleTestCase):
         )
 
     @override_settings(PRODIGI_CONNECT_TIMEOUT_SECONDS=3, PRODIGI_READ_TIMEOUT_SECONDS=9)
-    @patch("checkout.prodigi.requests.post")
+    @patch("checkout.prodigi.requests.Session.request")
     def test_prodigi_uses_timeout_and_sanitizes_upstream_validation_error(self, mock_post):
         mock_response = Mock()
         mock_response.status_code = 400
@@ -396,7 +409,7 @@ class ProdigiIntegrationSecurityTests(SimpleTestCase):
         self.assertNotIn("pii@example.com", log_output)
         self.assertNotIn(mock_response.text, log_output)
 
-    @patch("checkout.prodigi.requests.post", side_effect=requests.Timeout("Read timed out"))
+    @patch("checkout.prodigi.requests.Session.request", side_effect=requests.Timeout("Read timed out"))
     def test_prodigi_timeout_raises_sanitized_error(self, mock_post):
         with patch.dict(os.environ, {"PRODIGI_API_KEY": "test_key", "PRODIGI_SANDBOX": "True"}, clear=False):
             with self.assertLogs("checkout.prodigi", level="ERROR") as captured_logs:
@@ -409,7 +422,7 @@ class ProdigiIntegrationSecurityTests(SimpleTestCase):
         self.assertEqual(mock_post.call_count, 1)
         self.assertIn("timed out", " ".join(captured_logs.output).lower())
 
-    @patch("checkout.prodigi.requests.post")
+    @patch("checkout.prodigi.requests.Session.request")
     def test_prodigi_non_json_success_response_is_sanitized(self, mock_post):
         mock_response = Mock()
         mock_response.status_code = 200
@@ -428,7 +441,7 @@ class ProdigiIntegrationSecurityTests(SimpleTestCase):
         self.assertIn("non-JSON success response", " ".join(captured_logs.output))
         self.assertNotIn("unexpected success body", " ".join(captured_logs.output))
 
-    @patch("checkout.prodigi.requests.post")
+    @patch("checkout.prodigi.requests.Session.request")
     def test_prodigi_asset_url_failure_logs_error_type_only(self, mock_post):
         with patch.dict(os.environ, {"PRODIGI_API_KEY": "test_key", "PRODIGI_SANDBOX": "True"}, clear=False):
             with self.assertLogs("checkout.prodigi", level="WARNING") as captured_logs:
@@ -446,7 +459,7 @@ class ProdigiIntegrationSecurityTests(SimpleTestCase):
         self.assertIn("error_type=RuntimeError", logs)
         self.assertNotIn("signed-url-token-should-not-leak", logs)
 
-    @patch("checkout.prodigi.requests.post")
+    @patch("checkout.prodigi.requests.Session.request")
     def test_prodigi_missing_sku_raises_fulfillment_error(self, mock_post):
         with patch.dict(os.environ, {"PRODIGI_API_KEY": "test_key", "PRODIGI_SANDBOX": "True"}, clear=False):
             with self.assertLogs("checkout.prodigi", level="WARNING") as captured_logs:
@@ -460,7 +473,7 @@ class ProdigiIntegrationSecurityTests(SimpleTestCase):
         self.assertEqual(mock_post.call_count, 0)
         self.assertIn("missing_sku=1", " ".join(captured_logs.output))
 
-    @patch("checkout.prodigi.requests.post")
+    @patch("checkout.prodigi.requests.Session.request")
     def test_prodigi_partial_physical_payload_is_rejected(self, mock_post):
         with patch.dict(os.environ, {"PRODIGI_API_KEY": "test_key", "PRODIGI_SANDBOX": "True"}, clear=False):
             with self.assertLogs("checkout.prodigi", level="WARNING") as captured_logs:
@@ -477,7 +490,7 @@ class ProdigiIntegrationSecurityTests(SimpleTestCase):
         self.assertIn("prepared_items=1", logs)
         self.assertIn("missing_sku=1", logs)
 
-    @patch("checkout.prodigi.requests.post")
+    @patch("checkout.prodigi.requests.Session.request")
     def test_prodigi_rejects_localhost_asset_urls_instead_of_using_placeholder(self, mock_post):
         localhost_order = self._build_order()
         localhost_order.items = self._ItemsManager(
@@ -584,7 +597,7 @@ class ProdigiIntegrationSecurityTests(SimpleTestCase):
         PRODIGI_CALLBACK_BASE_URL="https://api.example.com",
         PRODIGI_CALLBACK_TOKEN="",
     )
-    @patch("checkout.prodigi.requests.post")
+    @patch("checkout.prodigi.requests.Session.request")
     def test_create_prodigi_order_includes_callback_url_when_base_url_configured(self, mock_post):
         mock_response = Mock(status_code=201, headers={})
         mock_response.json.return_value = {"order": {"id": "ord_prodigi_123"}}
@@ -603,7 +616,7 @@ class ProdigiIntegrationSecurityTests(SimpleTestCase):
         PRODIGI_CALLBACK_BASE_URL="https://api.example.com",
         PRODIGI_CALLBACK_TOKEN="callback-secret",
     )
-    @patch("checkout.prodigi.requests.post")
+    @patch("checkout.prodigi.requests.Session.request")
     def test_create_prodigi_order_includes_callback_url_token_when_configured(self, mock_post):
         mock_response = Mock(status_code=201, headers={})
         mock_response.json.return_value = {"order": {"id": "ord_prodigi_123"}}
@@ -618,7 +631,7 @@ class ProdigiIntegrationSecurityTests(SimpleTestCase):
             "https://api.example.com/api/checkout/prodigi/callback/?token=callback-secret",
         )
 
-    @patch("checkout.prodigi.requests.post")
+    @patch("checkout.prodigi.requests.Session.request")
     def test_create_prodigi_order_uses_selected_destination_country(self, mock_post):
         mock_response = Mock(status_code=201, headers={})
         mock_response.json.return_value = {"order": {"id": "ord_prodigi_123"}}
@@ -639,7 +652,7 @@ class ProdigiIntegrationSecurityTests(SimpleTestCase):
         self.assertEqual(payload["recipient"]["address"]["townOrCity"], "Sydney")
 
     @override_settings(PRODIGI_CALLBACK_BASE_URL="", PRODIGI_CALLBACK_TOKEN="")
-    @patch("checkout.prodigi.requests.post")
+    @patch("checkout.prodigi.requests.Session.request")
     def test_create_prodigi_order_omits_callback_url_when_base_url_missing_and_logs_reason(self, mock_post):
         mock_response = Mock(status_code=201, headers={})
         mock_response.json.return_value = {"order": {"id": "ord_prodigi_123"}}
@@ -682,7 +695,7 @@ class ProdigiIntegrationSecurityTests(SimpleTestCase):
             with self.assertRaises(ImproperlyConfigured):
                 _prodigi_base_url()
 
-    @patch("checkout.prodigi.requests.post")
+    @patch("checkout.prodigi.requests.Session.request")
     def test_prodigi_error_parser_ignores_non_string_fields(self, mock_post):
         mock_response = Mock()
         mock_response.status_code = 400
@@ -2270,6 +2283,33 @@ class ConsumerDigitalOrderLicenceTests(TestCase):
         self.assertEqual(alerted_order.pk, order.pk)
         self.assertEqual(str(alerted_error), "prodigi offline")
 
+    @patch("checkout.views.send_fulfilment_failure_alert")
+    @patch("checkout.views.create_prodigi_order", side_effect=ProdigiUnavailableError())
+    @patch("checkout.views.stripe.Webhook.construct_event")
+    def test_webhook_defers_physical_fulfilment_while_prodigi_circuit_is_open(
+        self,
+        mock_construct,
+        _mock_create_prodigi_order,
+        mock_send_fulfilment_failure_alert,
+    ):
+        mock_construct.return_value = self._physical_payment_intent_event()
+
+        response = self.client.post(
+            self.url,
+            data="{}",
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE="sig",
+        )
+
+        self.assertEqual(response.status_code, 500)
+        order = Order.objects.get()
+        self.assertEqual(order.prodigi_status, "FULFILMENT_DEFERRED")
+        self.assertIsNone(order.prodigi_submission_started_at)
+        event = StripeWebhookEvent.objects.get(stripe_event_id="evt_physical_retry")
+        self.assertEqual(event.status, "FAILED")
+        self.assertIn("deferred", event.error_message)
+        mock_send_fulfilment_failure_alert.assert_not_called()
+
     @patch("checkout.views.create_prodigi_order")
     @patch("checkout.views.stripe.Webhook.construct_event")
     def test_webhook_retry_reuses_existing_order_after_prodigi_failure(
@@ -2748,6 +2788,27 @@ class ProdigiShipmentSyncCommandTests(TestCase):
         self.assertIn("Failed to sync order", stderr.getvalue())
         self.assertIn("failed=1", stdout.getvalue())
 
+    @patch("checkout.tracking.record_prodigi_poll_failure", side_effect=DatabaseError("write failed"))
+    @patch("checkout.tracking.fetch_prodigi_order")
+    def test_failure_to_record_a_failed_poll_does_not_stop_the_run(self, mock_fetch_prodigi_order, _record):
+        self._create_physical_order(prodigi_order_id="ord_prodigi_fail")
+        healthy_order = self._create_physical_order(prodigi_order_id="ord_prodigi_ok")
+
+        def fetch_side_effect(prodigi_order_id):
+            if prodigi_order_id == "ord_prodigi_fail":
+                raise RuntimeError("lookup failed")
+            return self._prodigi_payload(healthy_order, tracking_number="TRACK-OK")
+
+        mock_fetch_prodigi_order.side_effect = fetch_side_effect
+        stdout = StringIO()
+
+        with self.assertLogs("checkout.tracking", "WARNING"):
+            call_command("sync_prodigi_shipments", stdout=stdout, stderr=StringIO())
+
+        healthy_order.refresh_from_db()
+        self.assertEqual(healthy_order.prodigi_status, "Shipped")
+        self.assertIn("failed=1", stdout.getvalue())
+
     @patch("checkout.tracking.fetch_prodigi_order")
     def test_command_ignores_orders_without_prodigi_order_id(self, mock_fetch_prodigi_order):
         self._create_physical_order(prodigi_order_id=None)
@@ -2820,6 +2881,159 @@ class ProdigiShipmentSyncCommandTests(TestCase):
         self.assertIn("missing_prodigi_order_id", output)
         self.assertIn("Debug mode only: no Prodigi sync was run.", output)
 
+    @patch("checkout.tracking.fetch_prodigi_order")
+    def test_debug_candidates_streams_csv_and_json_lines(self, mock_fetch_prodigi_order):
+        eligible_order = self._create_physical_order(prodigi_order_id="ord_prodigi_csv")
+        polled_at = timezone.now()
+        not_due_order = self._create_physical_order(
+            prodigi_order_id="ord_prodigi_json",
+            prodigi_last_polled_at=polled_at,
+            prodigi_next_poll_at=polled_at + timedelta(hours=2),
+        )
+
+        csv_stdout = StringIO()
+        call_command("sync_prodigi_shipments", "--debug-candidates", "--format", "csv", stdout=csv_stdout)
+        jsonl_stdout = StringIO()
+        call_command("sync_prodigi_shipments", "--debug-candidates", "--format", "jsonl", stdout=jsonl_stdout)
+
+        mock_fetch_prodigi_order.assert_not_called()
+        csv_rows = list(csv.DictReader(StringIO(csv_stdout.getvalue())))
+        csv_by_order = {row["order_number"]: row for row in csv_rows}
+        self.assertEqual(csv_by_order[eligible_order.order_number]["included"], "true")
+        self.assertEqual(
+            csv_by_order[eligible_order.order_number]["reasons"],
+            "status_not_final,tracking_email_not_sent,never_polled",
+        )
+        self.assertEqual(csv_by_order[not_due_order.order_number]["reasons"], "next_poll_not_due")
+
+        json_rows = [json.loads(line) for line in jsonl_stdout.getvalue().splitlines()]
+        json_by_order = {row["order_number"]: row for row in json_rows}
+        self.assertFalse(json_by_order[not_due_order.order_number]["included"])
+        self.assertEqual(
+            json_by_order[not_due_order.order_number]["prodigi_last_polled_at"],
+            polled_at.isoformat(),
+        )
+        self.assertIsNone(json_by_order[eligible_order.order_number]["prodigi_next_poll_at"])
+
+    def test_debug_rows_agree_with_candidate_query(self):
+        now = timezone.now()
+        included = self._create_physical_order(prodigi_order_id="ord_prodigi_agree")
+        self._create_physical_order(
+            prodigi_order_id="ord_prodigi_cancelled_polled",
+            prodigi_status="Cancelled",
+            prodigi_last_polled_at=now,
+        )
+        self._create_physical_order(prodigi_order_id="   ")
+        self._create_physical_order(
+            prodigi_order_id="ord_prodigi_synced",
+            prodigi_status="Delivered",
+            tracking_email_sent_at=now,
+            prodigi_last_polled_at=now,
+        )
+        digital_only = Order.objects.create(
+            first_name="Buyer",
+            email="buyer@example.com",
+            stripe_pid=f"pi_{uuid.uuid4().hex}",
+        )
+
+        debug_rows = list(get_prodigi_sync_debug_rows(now=now, chunk_size=2))
+        candidate_numbers = {order.order_number for order in get_prodigi_sync_candidates(now=now)}
+
+        self.assertEqual(candidate_numbers, {included.order_number})
+        self.assertEqual(
+            {row["order_number"] for row in debug_rows if row["included"]},
+            candidate_numbers,
+        )
+        self.assertNotIn(digital_only.order_number, {row["order_number"] for row in debug_rows})
+        self.assertEqual(
+            sorted(reason for row in debug_rows for reason in row["reasons"] if not row["included"]),
+            ["already_synced", "missing_prodigi_order_id", "terminal_status_polled"],
+        )
+
+    @override_settings(PRODIGI_POLL_IN_PRODUCTION_MINUTES=30, PRODIGI_POLL_SHIPPED_MINUTES=1440)
+    @patch("checkout.tracking.fetch_prodigi_order")
+    def test_poll_schedule_backs_off_by_prodigi_stage(self, mock_fetch_prodigi_order):
+        in_production = self._create_physical_order(prodigi_order_id="ord_prodigi_in_production")
+        shipped = self._create_physical_order(prodigi_order_id="ord_prodigi_shipped")
+        cancelled = self._create_physical_order(prodigi_order_id="ord_prodigi_cancelled")
+        payloads = {
+            "ord_prodigi_in_production": {
+                "id": "ord_prodigi_in_production",
+                "status": {"stage": "InProgress"},
+                "shipments": [],
+            },
+            "ord_prodigi_shipped": self._prodigi_payload(shipped),
+            "ord_prodigi_cancelled": {
+                "id": "ord_prodigi_cancelled",
+                "status": {"stage": "Cancelled"},
+                "shipments": [],
+            },
+        }
+        mock_fetch_prodigi_order.side_effect = lambda prodigi_order_id: payloads[prodigi_order_id]
+
+        call_command("sync_prodigi_shipments", stdout=StringIO())
+
+        in_production.refresh_from_db()
+        shipped.refresh_from_db()
+        cancelled.refresh_from_db()
+        self.assertEqual(
+            in_production.prodigi_next_poll_at - in_production.prodigi_last_polled_at,
+            timedelta(minutes=30),
+        )
+        self.assertEqual(
+            shipped.prodigi_next_poll_at - shipped.prodigi_last_polled_at,
+            timedelta(minutes=1440),
+        )
+        self.assertIsNotNone(cancelled.prodigi_last_polled_at)
+        self.assertIsNone(cancelled.prodigi_next_poll_at)
+        self.assertEqual(list(get_prodigi_sync_candidates()), [])
+
+        later = timezone.now() + timedelta(minutes=31)
+        self.assertEqual(
+            [order.pk for order in get_prodigi_sync_candidates(now=later)],
+            [in_production.pk],
+        )
+
+    @patch("checkout.tracking.fetch_prodigi_order")
+    def test_command_skips_orders_whose_next_poll_is_not_due(self, mock_fetch_prodigi_order):
+        order = self._create_physical_order(
+            prodigi_order_id="ord_prodigi_not_due",
+            prodigi_last_polled_at=timezone.now(),
+            prodigi_next_poll_at=timezone.now() + timedelta(hours=2),
+        )
+        stdout = StringIO()
+
+        call_command("sync_prodigi_shipments", stdout=stdout)
+        call_command("sync_prodigi_shipments", "--debug-candidates", stdout=stdout)
+
+        mock_fetch_prodigi_order.assert_not_called()
+        self.assertIn("Found 0 candidate Prodigi order(s)", stdout.getvalue())
+        self.assertIn(order.order_number, stdout.getvalue())
+        self.assertIn("next_poll_not_due", stdout.getvalue())
+
+    @patch("checkout.tracking.fetch_prodigi_order")
+    def test_command_polls_orders_concurrently_and_applies_every_result(self, mock_fetch_prodigi_order):
+        orders = [
+            self._create_physical_order(prodigi_order_id=f"ord_prodigi_pool_{index}")
+            for index in range(6)
+        ]
+        payloads = {
+            order.prodigi_order_id: self._prodigi_payload(order, tracking_number=f"TRACK-POOL-{index}")
+            for index, order in enumerate(orders)
+        }
+        mock_fetch_prodigi_order.side_effect = lambda prodigi_order_id: payloads[prodigi_order_id]
+        stdout = StringIO()
+
+        call_command("sync_prodigi_shipments", "--workers", "3", stdout=stdout)
+
+        self.assertEqual(mock_fetch_prodigi_order.call_count, 6)
+        self.assertEqual(
+            Order.objects.filter(prodigi_status="Shipped", tracking_email_sent_at__isnull=False).count(),
+            6,
+        )
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertIn("refreshed=6 emailed=6 failed=0", stdout.getvalue())
+
 
 @override_settings(
     STRIPE_SECRET_KEY="sk_test_123",
@@ -4065,7 +4279,7 @@ class OrderHistoryClaimingTests(TestCase):
         )
         self.order_history_url = reverse("order_history")
 
-    def test_order_history_claims_matching_guest_orders(self):
+    def test_order_history_is_read_only_for_unclaimed_guest_orders(self):
         guest_order = Order.objects.create(
             email=" History@Example.com ",
             stripe_pid="pi_history_claim",
@@ -4076,41 +4290,59 @@ class OrderHistoryClaimingTests(TestCase):
 
         self.assertEqual(response.status_code, 200)
         guest_order.refresh_from_db()
-        self.assertIsNotNone(guest_order.user_profile)
+        self.assertIsNone(guest_order.user_profile)
+        self.assertEqual(response.data["results"], [])
+
+    def test_claim_guest_orders_matches_stored_normalized_email(self):
+        guest_order = Order.objects.create(
+            email=" History@Example.com ",
+            stripe_pid="pi_history_claim",
+        )
+        self.assertEqual(guest_order.normalized_email, "history@example.com")
+
+        claimed_count = claim_guest_orders_for_user(self.user)
+
+        self.assertEqual(claimed_count, 1)
+        guest_order.refresh_from_db()
         self.assertEqual(guest_order.user_profile.user_id, self.user.id)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["order_number"], guest_order.order_number)
 
-    def test_order_history_does_not_claim_placeholder_guest_email(self):
+    def test_claim_guest_orders_skips_placeholder_guest_email(self):
         self.user.email = "guest@example.com"
         self.user.save(update_fields=["email"])
         placeholder_order = Order.objects.create(
             email="guest@example.com",
             stripe_pid="pi_placeholder_guest",
         )
-        self.client.force_authenticate(user=self.user)
 
-        response = self.client.get(self.order_history_url)
+        self.assertEqual(claim_guest_orders_for_user(self.user), 0)
 
-        self.assertEqual(response.status_code, 200)
         placeholder_order.refresh_from_db()
         self.assertIsNone(placeholder_order.user_profile)
-        self.assertEqual(response.data, [])
 
-    @patch.object(checkout_views, "claim_guest_orders_for_user", side_effect=RuntimeError("claim failure"))
-    def test_order_history_survives_claiming_failure(self, _mock_claim):
-        claimed_order = Order.objects.create(
+    def test_new_guest_order_is_claimed_by_single_active_account(self):
+        guest_order = Order.objects.create(
+            email="HISTORY@example.com",
+            stripe_pid="pi_history_new_guest",
+        )
+
+        owner = claim_guest_order_for_known_email(guest_order)
+
+        self.assertEqual(owner, self.user)
+        guest_order.refresh_from_db()
+        self.assertEqual(guest_order.user_profile.user_id, self.user.id)
+
+    def test_new_guest_order_is_not_claimed_by_inactive_account(self):
+        self.user.is_active = False
+        self.user.save(update_fields=["is_active"])
+        guest_order = Order.objects.create(
             email=self.user.email,
-            user_profile=self.user.userprofile,
-            stripe_pid="pi_claimed_order",
+            stripe_pid="pi_history_unverified_guest",
         )
-        self.client.force_authenticate(user=self.user)
 
-        response = self.client.get(self.order_history_url)
+        self.assertIsNone(claim_guest_order_for_known_email(guest_order))
 
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["order_number"], claimed_order.order_number)
+        guest_order.refresh_from_db()
+        self.assertIsNone(guest_order.user_profile)
 
     def test_order_history_exposes_personal_download_token_url_for_digital_items(self):
         photo = Photo.objects.create(
@@ -4141,8 +4373,8 @@ class OrderHistoryClaimingTests(TestCase):
         response = self.client.get(self.order_history_url)
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
-        download_url = response.data[0]["items"][0]["download_url"]
+        self.assertEqual(len(response.data["results"]), 1)
+        download_url = response.data["results"][0]["items"][0]["download_url"]
         token = PersonalDownloadToken.objects.get(order_item=order_item)
         self.assertTrue(download_url.endswith(f"/api/personal-download/{token.token}/"))
 
@@ -4180,7 +4412,7 @@ class OrderHistoryClaimingTests(TestCase):
         response = self.client.get(self.order_history_url)
 
         self.assertEqual(response.status_code, 200)
-        self.assertIsNone(response.data[0]["items"][0]["download_url"])
+        self.assertIsNone(response.data["results"][0]["items"][0]["download_url"])
         self.assertEqual(PersonalDownloadToken.objects.filter(order_item=order_item).count(), 1)
 
     @override_settings(PERSONAL_DOWNLOAD_BASE_URL=None)
@@ -4215,6 +4447,109 @@ class OrderHistoryClaimingTests(TestCase):
         self.assertEqual(PersonalLicenceToken.objects.filter(order=order).count(), 0)
 
 
+@override_settings(PERSONAL_DOWNLOAD_BASE_URL=None)
+class OrderHistoryPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            username="pagedbuyer",
+            email="paged@example.com",
+            password="StrongPass123!",
+        )
+        self.photo = Photo.objects.create(
+            title="Paged Photo",
+            description="Digital asset",
+            collection="Test Collection",
+            preview_image=SimpleUploadedFile("preview.jpg", b"preview", content_type="image/jpeg"),
+            high_res_file=SimpleUploadedFile("high_res.jpg", b"highres", content_type="image/jpeg"),
+            price=Decimal("10.00"),
+            is_active=True,
+            is_printable=True,
+        )
+        self.video = Video.objects.create(
+            title="Paged Video",
+            description="Digital asset",
+            collection="Test Collection",
+            thumbnail_image=SimpleUploadedFile("thumb.jpg", b"thumb", content_type="image/jpeg"),
+            video_file=SimpleUploadedFile("video.mp4", b"video", content_type="video/mp4"),
+            price=Decimal("24.00"),
+            is_active=True,
+        )
+        self.variant = ProductVariant.objects.create(
+            photo=self.photo,
+            material="eco_canvas",
+            size="12x18",
+            price=Decimal("99.00"),
+        )
+        self.order_history_url = reverse("order_history")
+        self.client.force_authenticate(user=self.user)
+
+    def _create_orders(self, count):
+        orders = []
+        for _ in range(count):
+            order = Order.objects.create(
+                email=self.user.email,
+                user_profile=self.user.userprofile,
+                stripe_pid=f"pi_{uuid.uuid4().hex}",
+            )
+            for product in (self.photo, self.video, self.variant):
+                OrderItem.objects.create(
+                    order=order,
+                    quantity=1,
+                    item_total=product.price,
+                    content_type=ContentType.objects.get_for_model(product),
+                    object_id=product.id,
+                    details={},
+                )
+            orders.append(order)
+        return orders
+
+    def _count_page_queries(self, page_size):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.order_history_url, {"page_size": page_size})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), page_size)
+        return len(queries)
+
+    def test_order_history_is_cursor_paginated_newest_first(self):
+        orders = self._create_orders(3)
+
+        first_page = self.client.get(self.order_history_url, {"page_size": 2})
+        second_page = self.client.get(first_page.data["next"])
+
+        self.assertEqual(
+            [order["order_number"] for order in first_page.data["results"]],
+            [orders[2].order_number, orders[1].order_number],
+        )
+        self.assertEqual(
+            [order["order_number"] for order in second_page.data["results"]],
+            [orders[0].order_number],
+        )
+        self.assertIsNone(second_page.data["next"])
+        items = first_page.data["results"][0]["items"]
+        self.assertEqual(items[0]["product"]["product_type"], "photo")
+        self.assertEqual(items[1]["product"]["product_type"], "video")
+        self.assertEqual(items[2]["product"]["title"], self.photo.title)
+        self.assertIsNotNone(items[0]["download_url"])
+        self.assertIsNotNone(items[1]["personal_terms_url"])
+        self.assertIsNone(items[2]["download_url"])
+
+    def test_order_history_page_has_a_fixed_query_budget(self):
+        self._create_orders(8)
+
+        # First visits mint download and licence tokens in one bulk insert each.
+        first_small_page = self._count_page_queries(2)
+        first_large_page = self._count_page_queries(8)
+        self.assertEqual(first_small_page, first_large_page)
+
+        small_page = self._count_page_queries(2)
+        large_page = self._count_page_queries(8)
+        self.assertEqual(small_page, large_page)
+        self.assertLessEqual(large_page, 10)
+        self.assertEqual(PersonalDownloadToken.objects.count(), 16)
+        self.assertEqual(PersonalLicenceToken.objects.count(), 8)
+
+
 @override_settings(
     FREE_SHIPPING_ENABLED=True,
     FREE_SHIPPING_THRESHOLD="150.00",
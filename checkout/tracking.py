@@ -1,17 +1,19 @@
 import hashlib
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import timedelta
-from typing import Iterable, List, Optional, Tuple
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 from django.conf import settings
 from django.core.mail import EmailMessage
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import BooleanField, Case, Q, Value, When
 from django.db.models.functions import Trim
 from django.template.loader import render_to_string
 from django.utils import timezone
 
+from openeire_api.mail_outbox import send_message
 from openeire_api.mail_utils import get_contact_email_address, get_default_from_email
 
 from .models import Order
@@ -34,6 +36,17 @@ FINAL_PRODIGI_SYNC_STATES = {
     "Completed",
     "Cancelled",
 }
+# Once a poll has observed one of these stages Prodigi has nothing further to
+# report, so the order drops out of the polling schedule for good.
+TERMINAL_PRODIGI_SYNC_STATES = {
+    "Delivered",
+    "Complete",
+    "Completed",
+    "Cancelled",
+}
+# Cron runs are not perfectly periodic; treat orders due within this window as
+# due now so a 30 minute schedule does not slip to every other run.
+PRODIGI_POLL_DUE_SLACK = timedelta(minutes=5)
 
 
 def _normalize_prodigi_state(value: object) -> str:
@@ -239,6 +252,45 @@ def sync_order_shipping_from_prodigi(order, prodigi_order_payload: dict, *, mark
     return result
 
 
+def get_prodigi_next_poll_at(prodigi_status: object, *, polled_at):
+    """
+    Return when an order should next be polled given its latest Prodigi stage.
+
+    Orders still in production are polled frequently, shipped orders only
+    occasionally (to pick up late tracking), and terminal orders never.
+    """
+    normalized_status = str(prodigi_status or "").strip()
+    if normalized_status in TERMINAL_PRODIGI_SYNC_STATES:
+        return None
+    if normalized_status in FINAL_PRODIGI_SYNC_STATES:
+        interval_minutes = getattr(settings, "PRODIGI_POLL_SHIPPED_MINUTES", 1440)
+    else:
+        interval_minutes = getattr(settings, "PRODIGI_POLL_IN_PRODUCTION_MINUTES", 30)
+    return polled_at + timedelta(minutes=max(int(interval_minutes), 1))
+
+
+def record_prodigi_poll_failure(order, *, polled_at):
+    Order.objects.filter(pk=order.pk).update(
+        prodigi_last_polled_at=polled_at,
+        prodigi_next_poll_at=get_prodigi_next_poll_at(order.prodigi_status, polled_at=polled_at),
+    )
+
+
+def apply_prodigi_order_refresh(order, prodigi_order: dict, *, polled_at, mark_polled: bool = False):
+    with transaction.atomic():
+        locked_order = Order.objects.select_for_update().get(pk=order.pk)
+        sync_result = sync_order_shipping_from_prodigi(locked_order, prodigi_order)
+        if mark_polled:
+            locked_order.prodigi_last_polled_at = polled_at
+            locked_order.prodigi_next_poll_at = get_prodigi_next_poll_at(
+                locked_order.prodigi_status,
+                polled_at=polled_at,
+            )
+            locked_order.save(update_fields=["prodigi_last_polled_at", "prodigi_next_poll_at"])
+
+    return sync_result
+
+
 def refresh_order_from_prodigi(order, *, mark_polled: bool = False):
     if not str(order.prodigi_order_id or "").strip():
         raise ValueError("Order does not have a Prodigi order id.")
@@ -248,25 +300,77 @@ def refresh_order_from_prodigi(order, *, mark_polled: bool = False):
         prodigi_order = fetch_prodigi_order(order.prodigi_order_id)
     except Exception:
         if mark_polled:
-            Order.objects.filter(pk=order.pk).update(prodigi_last_polled_at=polled_at)
+            record_prodigi_poll_failure(order, polled_at=polled_at)
         raise
 
-    with transaction.atomic():
-        locked_order = Order.objects.select_for_update().get(pk=order.pk)
-        sync_result = sync_order_shipping_from_prodigi(locked_order, prodigi_order)
-        if mark_polled:
-            locked_order.prodigi_last_polled_at = polled_at
-            locked_order.save(update_fields=["prodigi_last_polled_at"])
+    return apply_prodigi_order_refresh(
+        order,
+        prodigi_order,
+        polled_at=polled_at,
+        mark_polled=mark_polled,
+    )
 
-    return sync_result
+
+def refresh_orders_from_prodigi(
+    orders,
+    *,
+    max_workers: Optional[int] = None,
+) -> Iterator[Tuple[object, Optional[dict], Optional[Exception]]]:
+    """
+    Poll Prodigi for many orders at once and apply the results as they arrive.
+
+    Only the HTTP lookups run on the bounded worker pool; database writes and
+    tracking emails stay on the calling thread, so worker threads never hold
+    their own database connections. Yields ``(order, sync_result, error)``.
+    """
+    if max_workers is None:
+        max_workers = getattr(settings, "PRODIGI_SYNC_MAX_WORKERS", 4)
+    max_workers = max(int(max_workers or 0), 1)
+
+    def _fetch(order):
+        polled_at = timezone.now()
+        try:
+            return polled_at, fetch_prodigi_order(order.prodigi_order_id), None
+        except Exception as exc:
+            return polled_at, None, exc
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prodigi-sync") as executor:
+        futures = {executor.submit(_fetch, order): order for order in orders}
+        for future in as_completed(futures):
+            order = futures[future]
+            polled_at, prodigi_order, fetch_error = future.result()
+            if fetch_error is not None:
+                try:
+                    record_prodigi_poll_failure(order, polled_at=polled_at)
+                except Exception:
+                    # The lookup error is still reported for this order; the
+                    # rest of the run goes on.
+                    logger.warning(
+                        "Could not record failed Prodigi poll for order %s.", order.pk, exc_info=True
+                    )
+                yield order, None, fetch_error
+                continue
+
+            try:
+                sync_result = apply_prodigi_order_refresh(
+                    order,
+                    prodigi_order,
+                    polled_at=polled_at,
+                    mark_polled=True,
+                )
+            except Exception as exc:
+                yield order, None, exc
+                continue
+            yield order, sync_result, None
 
 
 def _has_prodigi_order_id(order) -> bool:
     return bool(str(order.prodigi_order_id or "").strip())
 
 
-def get_prodigi_sync_candidate_status(order) -> Tuple[bool, List[str]]:
+def get_prodigi_sync_candidate_status(order, *, now=None) -> Tuple[bool, List[str]]:
     reasons: List[str] = []
+    now = now or timezone.now()
 
     if not _has_prodigi_order_id(order):
         return False, ["missing_prodigi_order_id"]
@@ -278,53 +382,146 @@ def get_prodigi_sync_candidate_status(order) -> Tuple[bool, List[str]]:
     if order.prodigi_last_polled_at is None:
         reasons.append("never_polled")
 
-    if reasons:
-        return True, reasons
-    return False, ["already_synced"]
+    if not reasons:
+        return False, ["already_synced"]
+    if order.prodigi_last_polled_at is not None and order.prodigi_status in TERMINAL_PRODIGI_SYNC_STATES:
+        return False, ["terminal_status_polled"]
+    if order.prodigi_next_poll_at is not None and order.prodigi_next_poll_at > now + PRODIGI_POLL_DUE_SLACK:
+        return False, ["next_poll_not_due"]
+    return True, reasons
+
 
+def prodigi_sync_scope_q() -> Q:
+    """
+    Orders that have ever touched the Prodigi submission flow.
 
-def get_prodigi_sync_candidates(*, lookback_days: int = 90):
+    Must stay in step with the ``order_prodigi_sync_date_idx`` partial index
+    condition on ``Order`` so both the candidate query and the debug query
+    are served by that index.
+    """
+    return Q(prodigi_order_id__isnull=False) | Q(prodigi_status__isnull=False)
+
+
+def _prodigi_sync_needed_q() -> Q:
+    return (
+        Q(prodigi_status__isnull=True)
+        | Q(prodigi_status="")
+        | ~Q(prodigi_status__in=FINAL_PRODIGI_SYNC_STATES)
+        | Q(tracking_email_sent_at__isnull=True)
+        | Q(prodigi_last_polled_at__isnull=True)
+    )
+
+
+def _prodigi_sync_window_queryset(*, lookback_days: int, now):
     lookback_days = max(int(lookback_days or 0), 1)
-    cutoff = timezone.now() - timedelta(days=lookback_days)
+    cutoff = now - timedelta(days=lookback_days)
+    return Order.objects.filter(prodigi_sync_scope_q(), date__gte=cutoff)
+
+
+def get_prodigi_sync_candidates(*, lookback_days: int = 90, now=None):
+    now = now or timezone.now()
 
     return (
-        Order.objects.filter(
-            date__gte=cutoff,
-            prodigi_order_id__isnull=False,
-        )
+        _prodigi_sync_window_queryset(lookback_days=lookback_days, now=now)
+        .filter(prodigi_order_id__isnull=False)
         .annotate(prodigi_order_id_trimmed=Trim("prodigi_order_id"))
         .exclude(prodigi_order_id_trimmed="")
+        .filter(_prodigi_sync_needed_q())
+        .exclude(
+            prodigi_status__in=TERMINAL_PRODIGI_SYNC_STATES,
+            prodigi_last_polled_at__isnull=False,
+        )
         .filter(
-            Q(prodigi_status__isnull=True)
-            | Q(prodigi_status="")
-            | ~Q(prodigi_status__in=FINAL_PRODIGI_SYNC_STATES)
-            | Q(tracking_email_sent_at__isnull=True)
-            | Q(prodigi_last_polled_at__isnull=True)
+            Q(prodigi_next_poll_at__isnull=True)
+            | Q(prodigi_next_poll_at__lte=now + PRODIGI_POLL_DUE_SLACK)
         )
         .order_by("-date")
     )
 
 
-def get_prodigi_sync_debug_rows(*, lookback_days: int = 90):
-    lookback_days = max(int(lookback_days or 0), 1)
-    cutoff = timezone.now() - timedelta(days=lookback_days)
-    rows = []
+def _flag(condition: Q) -> Case:
+    return Case(When(condition, then=Value(True)), default=Value(False), output_field=BooleanField())
 
-    for order in Order.objects.filter(date__gte=cutoff).order_by("-date"):
-        included, reasons = get_prodigi_sync_candidate_status(order)
-        rows.append(
-            {
-                "order_number": order.order_number,
-                "prodigi_order_id": str(order.prodigi_order_id or "").strip() or "n/a",
-                "prodigi_status": str(order.prodigi_status or "").strip() or "n/a",
-                "tracking_email_sent_at": order.tracking_email_sent_at,
-                "prodigi_last_polled_at": order.prodigi_last_polled_at,
-                "included": included,
-                "reasons": reasons,
-            }
+
+PRODIGI_SYNC_DEBUG_FIELDS = (
+    "order_number",
+    "prodigi_order_id",
+    "prodigi_status",
+    "tracking_email_sent_at",
+    "prodigi_last_polled_at",
+    "prodigi_next_poll_at",
+)
+
+
+def _prodigi_sync_debug_reasons(row) -> Tuple[bool, List[str]]:
+    # Mirrors get_prodigi_sync_candidate_status, but reads the flags the
+    # database already computed instead of re-deriving them per order.
+    if row["missing_prodigi_order_id"]:
+        return False, ["missing_prodigi_order_id"]
+
+    reasons = [
+        reason
+        for reason in ("status_not_final", "tracking_email_not_sent", "never_polled")
+        if row[reason]
+    ]
+    if not reasons:
+        return False, ["already_synced"]
+    if row["terminal_status_polled"]:
+        return False, ["terminal_status_polled"]
+    if row["next_poll_not_due"]:
+        return False, ["next_poll_not_due"]
+    return True, reasons
+
+
+def get_prodigi_sync_debug_rows(*, lookback_days: int = 90, now=None, chunk_size: int = 2000):
+    """
+    Stream candidate/exclusion diagnostics for recent Prodigi-backed orders.
+
+    The inclusion flags are evaluated in SQL and rows are fetched in chunks,
+    so memory stays flat however long the lookback window is.
+    """
+    now = now or timezone.now()
+    queryset = (
+        _prodigi_sync_window_queryset(lookback_days=lookback_days, now=now)
+        .annotate(prodigi_order_id_trimmed=Trim("prodigi_order_id"))
+        .annotate(
+            missing_prodigi_order_id=_flag(
+                Q(prodigi_order_id__isnull=True) | Q(prodigi_order_id_trimmed="")
+            ),
+            status_not_final=_flag(
+                Q(prodigi_status__isnull=True) | ~Q(prodigi_status__in=FINAL_PRODIGI_SYNC_STATES)
+            ),
+            tracking_email_not_sent=_flag(Q(tracking_email_sent_at__isnull=True)),
+            never_polled=_flag(Q(prodigi_last_polled_at__isnull=True)),
+            terminal_status_polled=_flag(
+                Q(prodigi_status__in=TERMINAL_PRODIGI_SYNC_STATES, prodigi_last_polled_at__isnull=False)
+            ),
+            next_poll_not_due=_flag(Q(prodigi_next_poll_at__gt=now + PRODIGI_POLL_DUE_SLACK)),
         )
+        .order_by("-date")
+        .values(
+            *PRODIGI_SYNC_DEBUG_FIELDS,
+            "missing_prodigi_order_id",
+            "status_not_final",
+            "tracking_email_not_sent",
+            "never_polled",
+            "terminal_status_polled",
+            "next_poll_not_due",
+        )
+    )
 
-    return rows
+    for row in queryset.iterator(chunk_size=chunk_size):
+        included, reasons = _prodigi_sync_debug_reasons(row)
+        yield {
+            "order_number": row["order_number"],
+            "prodigi_order_id": str(row["prodigi_order_id"] or "").strip() or "n/a",
+            "prodigi_status": str(row["prodigi_status"] or "").strip() or "n/a",
+            "tracking_email_sent_at": row["tracking_email_sent_at"],
+            "prodigi_last_polled_at": row["prodigi_last_polled_at"],
+            "prodigi_next_poll_at": row["prodigi_next_poll_at"],
+            "included": included,
+            "reasons": reasons,
+        }
 
 
 def send_tracking_email(order, shipments: Iterable[dict], *, order_stage: object = ""):
@@ -360,5 +557,5 @@ def send_tracking_email(order, shipments: Iterable[dict], *, order_stage: object
         from_email=get_default_from_email(),
         to=[order.email],
     )
-    email.send(fail_silently=False)
+    send_message(email)
     return True
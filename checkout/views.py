@@ -8,7 +8,7 @@ from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist, ValidationError as DjangoValidationError
 from django.core.validators import validate_email
 from django.db import IntegrityError, transaction
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.urls import reverse
 from urllib.parse import urljoin
 from django.utils import timezone
@@ -16,6 +16,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.pagination import CursorPagination
 from rest_framework.parsers import JSONParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
@@ -46,7 +47,7 @@ from .attempts import (
     canonicalize_shipping_details,
     normalize_checkout_key,
 )
-from .models import CheckoutAttempt, Order
+from .models import CheckoutAttempt, Order, OrderItem
 from .serializers import OrderSerializer, OrderHistoryListSerializer
 from .discounts import (
     DiscountRedemptionConflict,
@@ -55,9 +56,10 @@ from .discounts import (
     record_discount_redemption,
 )
 from .address_validation import validate_physical_shipping_address
-from .prodigi import create_prodigi_order, fetch_prodigi_order
+from .prodigi import ProdigiUnavailableError, create_prodigi_order, fetch_prodigi_order
 from .alerts import send_fulfilment_failure_alert
-from .order_claiming import claim_guest_orders_for_user
+from .order_claiming import claim_guest_order_for_known_email
+from .order_history import prepare_order_history_page
 from .emails import send_order_confirmation_email
 from .shipping import (
     ShippingConfigurationError,
@@ -487,7 +489,7 @@ class CreatePaymentIntentView(APIView):
 
         profile = None
         if request.user.is_authenticated:
-            profile = UserProfile.objects.filter(user=request.user).first()
+            profile = UserProfile.objects.filter(user_id=request.user.pk).first()
         now = timezone.now()
         fingerprint_payload = {
             "cart": cart,
@@ -1467,6 +1469,15 @@ class StripeWebhookView(APIView):
                             if order is None:
                                 raise
                         logger.info("Order created successfully. order_number=%s", order.order_number)
+                        if order.user_profile_id is None:
+                            try:
+                                with transaction.atomic():
+                                    claim_guest_order_for_known_email(order)
+                            except Exception:
+                                logger.exception(
+                                    "Guest order claiming failed after order creation. order_number=%s",
+                                    order.order_number,
+                                )
                     else:
                         error_fields = self._summarize_validation_errors(serializer.errors)
                         logger.error("Error creating order. Validation fields: %s", error_fields)
@@ -1641,6 +1652,32 @@ class StripeWebhookView(APIView):
                                 "Digital-only order detected; skipping Prodigi fulfillment. order_number=%s",
                                 order.order_number,
                             )
+                    except ProdigiUnavailableError as exc:
+                        # Prodigi is known to be down, so nothing was sent. Park the
+                        # order in a claimable state and let Stripe's webhook retry
+                        # resubmit it once the circuit breaker closes.
+                        order.prodigi_status = "FULFILMENT_DEFERRED"
+                        order.prodigi_submission_started_at = None
+                        try:
+                            order.save(
+                                update_fields=[
+                                    "prodigi_status",
+                                    "prodigi_submission_started_at",
+                                ]
+                            )
+                        except Exception:
+                            logger.exception(
+                                "Failed to persist deferred fulfilment state. order_number=%s",
+                                order.order_number,
+                            )
+                        processing_error = (
+                            f"Physical fulfilment deferred for order {order.order_number}: {exc}"
+                        )
+                        retryable_processing_error = True
+                        logger.warning(
+                            "Deferred Prodigi fulfilment while Prodigi is unavailable. order_number=%s",
+                            order.order_number,
+                        )
                     except Exception as exc:
                         prodigi_order_id = str(order.prodigi_order_id or "").strip()
                         if prodigi_order_id:
@@ -1736,26 +1773,41 @@ class StripeWebhookView(APIView):
 
         return Response(status=status.HTTP_200_OK)
 
+class OrderHistoryPagination(CursorPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    ordering = ('-date', '-id')
+
+
 class OrderHistoryView(generics.ListAPIView):
     """
-    API endpoint to list all orders for the currently authenticated user.
+    API endpoint to list the orders for the currently authenticated user,
+    newest first, one cursor page at a time.
     """
     serializer_class = OrderHistoryListSerializer
     permission_classes = [IsAuthenticated] # Only logged-in users can see this
+    pagination_class = OrderHistoryPagination
 
     def get_queryset(self):
         """
         This view should return a list of all the orders
-        for the currently authenticated user.
+        for the currently authenticated user. Guest orders are claimed at
+        login/verification time, so this stays a read-only query.
         """
-        try:
-            claim_guest_orders_for_user(self.request.user)
-        except Exception:
-            logger.exception(
-                "Guest order claiming failed during order history fetch. user_id=%s",
-                self.request.user.id,
-            )
-        return Order.objects.filter(user_profile=self.request.user.userprofile).order_by('-date')
+        return (
+            Order.objects.filter(user_profile__user_id=self.request.user.pk)
+            .prefetch_related(Prefetch('items', queryset=OrderItem.objects.order_by('id')))
+        )
+
+    def list(self, request, *args, **kwargs):
+        # Products, download tokens and licence tokens are loaded for the
+        # whole page up front, so the query count does not grow with it.
+        orders = list(self.paginate_queryset(self.filter_queryset(self.get_queryset())))
+        context = self.get_serializer_context()
+        context.update(prepare_order_history_page(orders))
+        serializer = self.get_serializer_class()(orders, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
 
 
 class CloudEventJSONParser(JSONParser):
@@ -0,0 +1,113 @@
+import io
+import time
+
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.mail.backends.console import EmailBackend as ConsoleBackend
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.core.management.base import BaseCommand, CommandError
+
+from openeire_api.mail_outbox import SENT, MailOutbox, get_batch_size
+
+BACKENDS = {"locmem": LocmemBackend, "console": ConsoleBackend}
+
+
+def _counting_backend(base, connect_latency):
+    """``base`` with a simulated connection handshake, counting connections."""
+
+    class Backend(base):
+        opened = 0
+        connected = False
+
+        def open(self):
+            # The console backend also calls open() per send; only a new
+            # connection pays the handshake.
+            if not self.connected:
+                self.connected = True
+                type(self).opened += 1
+                if connect_latency:
+                    time.sleep(connect_latency)
+            return super().open()
+
+        def close(self):
+            self.connected = False
+            return super().close()
+
+    return Backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare one connection per message (what EmailMessage.send does) with "
+        "the mail outbox's reused connection, on the locmem or console backend. "
+        "--connect-latency-ms stands in for the SMTP+TLS handshake."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=200, help="Messages to send. Defaults to 200.")
+        parser.add_argument("--backend", choices=sorted(BACKENDS), default="locmem")
+        parser.add_argument(
+            "--connect-latency-ms",
+            type=float,
+            default=0,
+            help="Simulated cost of opening a connection. Defaults to 0.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Messages per outbox connection. Defaults to EMAIL_OUTBOX_BATCH_SIZE.",
+        )
+
+    def handle(self, *args, **options):
+        count = options["messages"]
+        if count < 1:
+            raise CommandError("--messages must be at least 1.")
+        batch_size = options["batch_size"] or get_batch_size()
+        latency = max(options["connect_latency_ms"], 0) / 1000
+        base = BACKENDS[options["backend"]]
+        backend_kwargs = {"stream": io.StringIO()} if base is ConsoleBackend else {}
+        previous_outbox = getattr(mail, "outbox", None)
+        mail.outbox = []
+        try:
+            per_message = _counting_backend(base, latency)
+            started = time.perf_counter()
+            for message in self._messages(count):
+                connection = per_message(**backend_kwargs)
+                connection.open()
+                connection.send_messages([message])
+                connection.close()
+            self._report("per-message", count, time.perf_counter() - started, per_message.opened)
+
+            reused = _counting_backend(base, latency)
+            started = time.perf_counter()
+            with MailOutbox(
+                connection=reused(**backend_kwargs), batch_size=batch_size, rate_per_second=0
+            ) as outbox:
+                for message in self._messages(count):
+                    outbox.queue(message)
+            elapsed = time.perf_counter() - started
+            sent = sum(entry.status == SENT for entry in outbox.entries)
+            if sent != count:
+                raise CommandError(f"The outbox sent {sent} of {count} messages.")
+            self._report(f"outbox(batch={batch_size})", count, elapsed, reused.opened)
+        finally:
+            if previous_outbox is None:
+                del mail.outbox
+            else:
+                mail.outbox = previous_outbox
+
+    def _messages(self, count):
+        for number in range(count):
+            yield EmailMessage(
+                subject=f"Benchmark message {number}",
+                body="Benchmark body.\n",
+                from_email="benchmark@example.com",
+                to=[f"recipient-{number}@example.com"],
+            )
+
+    def _report(self, label, count, elapsed, connections):
+        self.stdout.write(
+            f"{label}: messages={count} connections={connections} "
+            f"messages_per_second={count / elapsed:.0f} elapsed_ms={elapsed * 1000:.1f}"
+        )
@@ -0,0 +1,137 @@
+import pickle
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.throttling import SimpleRateThrottle
+
+from openeire_api.throttling import LocalLeaseAdmission, get_rate_limiter
+
+
+class _HistoryListThrottle(SimpleRateThrottle):
+    """DRF's stock request-log algorithm, pinned to one key for benchmarking."""
+
+    def __init__(self, *, cache, rate, key):
+        self.cache = cache
+        self.rate = rate
+        self.num_requests, self.duration = self.parse_rate(rate)
+        self._key = key
+
+    def get_cache_key(self, request, view):
+        return self._key
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's history-list throttle with the configured limiter engine "
+        "on the throttle cache (latency per check and bytes stored per key)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=2000,
+            help="Throttle checks to run against each backend. Defaults to 2000.",
+        )
+        parser.add_argument(
+            "--rate",
+            default="300/minute",
+            help="Rate to benchmark, in DRF syntax. Defaults to 300/minute.",
+        )
+        parser.add_argument(
+            "--lease-size",
+            type=int,
+            default=0,
+            help="Also benchmark the local lease tier with this lease size (0 skips it).",
+        )
+        parser.add_argument(
+            "--cache-alias",
+            default=None,
+            help="Cache alias to use. Defaults to THROTTLE_CACHE_ALIAS.",
+        )
+
+    def handle(self, *args, **options):
+        request_count = max(int(options["requests"] or 0), 1)
+        rate = options["rate"]
+        cache_alias = options["cache_alias"] or getattr(settings, "THROTTLE_CACHE_ALIAS", "throttle")
+        cache = caches[cache_alias]
+        try:
+            num_requests, duration = SimpleRateThrottle.parse_rate(None, rate)
+        except (ValueError, KeyError, IndexError):
+            raise CommandError(f"Invalid rate {rate!r}; expected e.g. 300/minute.")
+
+        run_id = uuid.uuid4().hex[:12]
+        history_key = f"throttle_benchmark_history_{run_id}"
+        limiter_key = f"throttle_benchmark_limiter_{run_id}"
+        lease_key = f"throttle_benchmark_lease_{run_id}"
+        lease_size = max(int(options["lease_size"] or 0), 0)
+        lease_timings = None
+        history_throttle = _HistoryListThrottle(cache=cache, rate=rate, key=history_key)
+        limiter = get_rate_limiter(cache)
+
+        self.stdout.write(
+            f"Benchmarking {request_count} checks at {rate} on cache alias {cache_alias!r} "
+            f"({type(cache).__name__})."
+        )
+        try:
+            history_timings = self._time(
+                request_count, lambda: history_throttle.allow_request(None, None)
+            )
+            history_bytes = self._stored_bytes(cache, history_key)
+
+            limiter_timings = self._time(
+                request_count,
+                lambda: limiter.hit(limiter_key, limit=num_requests, window_seconds=duration),
+            )
+            limiter_bytes = self._stored_bytes(cache, limiter_key)
+
+            if lease_size:
+                lease_tier = LocalLeaseAdmission()
+                lease_timings = self._time(
+                    request_count,
+                    lambda: lease_tier.admit(
+                        lease_key,
+                        limit=num_requests,
+                        window_seconds=duration,
+                        lease_size=lease_size,
+                        lease_seconds=float(getattr(settings, "THROTTLE_LOCAL_LEASE_SECONDS", 1.0)),
+                        limiter=limiter,
+                    ),
+                )
+        finally:
+            cache.delete_many([history_key, limiter_key, lease_key])
+
+        self._report("drf-history-list", history_timings, history_bytes)
+        self._report(f"{type(limiter).__name__}", limiter_timings, limiter_bytes)
+        if lease_timings is not None:
+            self._report(f"local-lease(size={lease_size})", lease_timings, None)
+
+    def _stored_bytes(self, cache, key):
+        if isinstance(cache, RedisCache):
+            redis_key = cache.make_and_validate_key(key)
+            return cache._cache.get_client(redis_key).memory_usage(redis_key)
+        value = cache.get(key)
+        return len(pickle.dumps(value)) if value is not None else None
+
+    def _time(self, request_count, check):
+        timings = []
+        for _ in range(request_count):
+            started_at = time.perf_counter()
+            check()
+            timings.append(time.perf_counter() - started_at)
+        return timings
+
+    def _report(self, label, timings, stored_bytes):
+        ordered = sorted(timings)
+        p99 = ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)]
+        total = sum(timings)
+        self.stdout.write(
+            f"{label}: checks_per_second={len(timings) / total:.0f} "
+            f"mean_ms={statistics.mean(timings) * 1000:.3f} p99_ms={p99 * 1000:.3f} "
+            f"stored_bytes={stored_bytes if stored_bytes is not None else 'n/a'}"
+        )
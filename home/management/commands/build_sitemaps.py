@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from openeire_api.sitemap_cache import build_sitemaps
+from openeire_api.sitemaps import sitemaps
+
+
+class Command(BaseCommand):
+    help = (
+        "Render sitemap sections to the cache so crawler requests are served "
+        "without querying the catalogue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--section",
+            action="append",
+            choices=sorted(sitemaps),
+            help="Only rebuild this section (repeatable). Defaults to all sections.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            built = build_sitemaps(options["section"])
+        except Exception as exc:
+            raise CommandError(f"Sitemap build failed: {exc}") from exc
+        for section, pages in built.items():
+            self.stdout.write(f"{section}: {pages} page(s)")
+        self.stdout.write(self.style.SUCCESS(f"Built {len(built)} sitemap section(s)."))
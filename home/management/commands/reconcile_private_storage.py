@@ -0,0 +1,106 @@
+import json
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from openeire_api.storage_inventory import (
+    LIST_PAGE_SIZE,
+    InventoryError,
+    PrefixReport,
+    default_prefixes,
+    is_deletable_orphan,
+    reconcile_prefix,
+)
+from products.models import VideoUploadSession
+from products.uploads import get_bucket_name_for_purpose, get_r2_client_for_purpose
+from realestate.delivery_storage import DELETE_OBJECTS_BATCH_SIZE, delete_validated_objects
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the private R2 bucket with the keys the database references. "
+        "Writes one JSON line per orphaned object or missing key and a summary "
+        "line per prefix."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prefix",
+            action="append",
+            help="Only reconcile this key prefix (repeatable). Defaults to every private prefix.",
+        )
+        parser.add_argument(
+            "--delete-orphans",
+            action="store_true",
+            help=(
+                "Delete orphaned delivery objects through the validated delivery "
+                "deletion path. Other orphans are only reported."
+            ),
+        )
+        parser.add_argument(
+            "--min-age-hours",
+            type=float,
+            default=24,
+            help="Never delete orphans modified more recently than this (default 24).",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=LIST_PAGE_SIZE,
+            help=f"Keys requested per ListObjectsV2 page (default and maximum {LIST_PAGE_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        if not 1 <= page_size <= LIST_PAGE_SIZE:
+            raise CommandError(f"--page-size must be between 1 and {LIST_PAGE_SIZE}.")
+        if options["min_age_hours"] < 0:
+            raise CommandError("--min-age-hours cannot be negative.")
+        self.delete = options["delete_orphans"]
+        self.min_age = timedelta(hours=options["min_age_hours"])
+        self.now = timezone.now()
+        try:
+            client = get_r2_client_for_purpose(VideoUploadSession.PURPOSE_MASTER)
+            bucket = get_bucket_name_for_purpose(VideoUploadSession.PURPOSE_MASTER)
+            prefixes = options["prefix"] or default_prefixes()
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc)) from exc
+
+        delete_failures = 0
+        for prefix in prefixes:
+            report = PrefixReport(prefix)
+            try:
+                self._reconcile(client, bucket, prefix, report, page_size)
+            except InventoryError as exc:
+                raise CommandError(f"Reconciliation of {prefix!r} stopped: {exc}") from exc
+            self._emit(report.as_dict())
+            delete_failures += report.delete_failures
+        if delete_failures:
+            raise CommandError(f"{delete_failures} orphaned object(s) could not be deleted.")
+
+    def _emit(self, record):
+        self.stdout.write(json.dumps(record, sort_keys=True))
+
+    def _reconcile(self, client, bucket, prefix, report, page_size):
+        pending = []
+        for finding in reconcile_prefix(client, bucket, prefix, report, page_size=page_size):
+            record = finding.as_dict()
+            if finding.kind == "orphan":
+                record["deletable"] = is_deletable_orphan(finding, self.now, self.min_age)
+                if self.delete and record["deletable"]:
+                    pending.append(finding.key)
+            self._emit(record)
+            if len(pending) >= DELETE_OBJECTS_BATCH_SIZE:
+                self._delete(pending, report)
+                pending = []
+        if pending:
+            self._delete(pending, report)
+
+    def _delete(self, keys, report):
+        deleted, failures = delete_validated_objects(keys)
+        report.deleted += len(deleted)
+        report.delete_failures += len(failures)
+        for key, error in failures.items():
+            self._emit({"type": "delete_failed", "key": key, "error": error})
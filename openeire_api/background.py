@@ -0,0 +1,75 @@
+import atexit
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def count_setting(name, default=0):
+    """An integer setting clamped at 0; unset or empty values read as ``default``."""
+    return max(int(getattr(settings, name, default) or 0), 0)
+
+
+class AfterCommitExecutor:
+    """
+    Runs work on a small thread pool once the caller's transaction commits.
+
+    The pool is started on first use and sized by the ``workers_setting``
+    setting; with 0 workers tasks run inline in the committing thread.
+    Failures are logged rather than raised either way. Background tasks get
+    their own database connection, which is closed when the task finishes.
+    Callers keep the work durable (a pending row, a lazy fallback), since a
+    task submitted while the interpreter shuts down is dropped.
+    """
+
+    def __init__(self, name, workers_setting, default_workers=1):
+        self.name = name
+        self.workers_setting = workers_setting
+        self.default_workers = default_workers
+        self._executor = None
+        self._lock = Lock()
+
+    def workers(self):
+        return count_setting(self.workers_setting, self.default_workers)
+
+    def on_commit(self, func, *args):
+        transaction.on_commit(partial(self.submit, func, *args))
+
+    def submit(self, func, *args):
+        if self.workers() <= 0:
+            # The caller's transaction has committed; a failure here must not
+            # turn its response into an error.
+            self._call(func, args)
+            return
+        try:
+            self._get_executor().submit(self._run, func, args)
+        except RuntimeError:
+            # The interpreter is shutting down.
+            logger.warning("%s task %s%r dropped at shutdown.", self.name, func.__name__, args)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers(), thread_name_prefix=self.name
+                )
+                atexit.register(self._executor.shutdown, wait=True)
+            return self._executor
+
+    def _call(self, func, args):
+        try:
+            func(*args)
+        except Exception:
+            logger.exception("Background %s task %s%r failed.", self.name, func.__name__, args)
+
+    def _run(self, func, args):
+        try:
+            self._call(func, args)
+        finally:
+            # Worker threads open their own connection.
+            connection.close()
@@ -0,0 +1,212 @@
+import contextvars
+import logging
+import smtplib
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_RECONNECT_ATTEMPTS = 1
+
+QUEUED = "queued"
+SENT = "sent"
+FAILED = "failed"
+# No recipients: nothing to hand to the relay, as EmailMessage.send() returns 0.
+SKIPPED = "skipped"
+
+# Failures that happen before the relay has the message, so a retry on a new
+# connection cannot deliver it twice.
+RETRYABLE_SEND_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+
+def get_batch_size():
+    """Messages sent over one connection before it is closed and reopened."""
+    return max(int(getattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", DEFAULT_BATCH_SIZE) or 0), 1)
+
+
+def get_rate_per_second():
+    """Upper bound on messages per second; 0 means no limit."""
+    return max(float(getattr(settings, "EMAIL_OUTBOX_RATE_PER_SECOND", 0) or 0), 0.0)
+
+
+def get_reconnect_attempts():
+    return max(int(getattr(settings, "EMAIL_OUTBOX_RECONNECT_ATTEMPTS", DEFAULT_RECONNECT_ATTEMPTS) or 0), 0)
+
+
+@dataclass
+class OutboxEntry:
+    message: object
+    status: str = QUEUED
+    attempts: int = 0
+    error: Exception | None = None
+
+
+class MailOutbox:
+    """
+    Sends rendered email messages over one reused backend connection.
+
+    Queued messages go out ``batch_size`` per connection (relays cap the
+    messages per session, so the connection is recycled between batches)
+    and no faster than ``rate_per_second``. When opening the connection
+    fails, or it drops before the message is handed over, the message is
+    retried on a fresh connection up to ``reconnect_attempts`` times; any
+    other error fails it at once, since the relay may already have accepted
+    it. One failed message never stops the rest of the queue. ``entries``
+    keeps the status of every message handed to the outbox.
+    """
+
+    def __init__(self, *, connection=None, batch_size=None, rate_per_second=None, reconnect_attempts=None):
+        self.connection = connection or get_connection(fail_silently=False)
+        self.batch_size = batch_size or get_batch_size()
+        self.rate_per_second = get_rate_per_second() if rate_per_second is None else rate_per_second
+        self.reconnect_attempts = (
+            get_reconnect_attempts() if reconnect_attempts is None else reconnect_attempts
+        )
+        self.entries = []
+        self.connections_opened = 0
+        self._pending = []
+        self._open = False
+        self._sent_on_connection = 0
+        self._last_send = None
+
+    def queue(self, message):
+        entry = OutboxEntry(message)
+        self.entries.append(entry)
+        self._pending.append(entry)
+        return entry
+
+    def drain(self):
+        """Send every queued message. Returns their entries."""
+        pending, self._pending = self._pending, []
+        for entry in pending:
+            self._send_entry(entry)
+        return pending
+
+    def send(self, message):
+        """
+        Send one message now, like ``message.send(fail_silently=False)``:
+        returns 1, 0 for a message without recipients, or raises the last
+        error if every attempt failed.
+        """
+        entry = self.queue(message)
+        self.drain()
+        if entry.status == FAILED:
+            raise entry.error
+        return 0 if entry.status == SKIPPED else 1
+
+    def close(self):
+        if not self._open:
+            return
+        self._open = False
+        try:
+            self.connection.close()
+        except Exception:
+            logger.warning("Closing the email connection failed.", exc_info=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            self.drain()
+        finally:
+            self.close()
+
+    def _wait_for_rate(self):
+        if not self.rate_per_second or self._last_send is None:
+            return
+        delay = 1 / self.rate_per_second - (time.monotonic() - self._last_send)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _ensure_open(self):
+        if self._open and self._sent_on_connection >= self.batch_size:
+            self.close()
+        if not self._open:
+            self.connection.open()
+            self._open = True
+            self._sent_on_connection = 0
+            self.connections_opened += 1
+
+    def _drop_connection(self, entry, exc):
+        entry.error = exc
+        # The connection may be half-closed; the next send opens a new one.
+        self.close()
+
+    def _send_entry(self, entry):
+        if not entry.message.recipients():
+            entry.status = SKIPPED
+            return entry
+        for _attempt in range(self.reconnect_attempts + 1):
+            self._wait_for_rate()
+            entry.attempts += 1
+            try:
+                self._ensure_open()
+            except Exception as exc:
+                # Nothing reached the relay; retry on a new connection.
+                self._drop_connection(entry, exc)
+                continue
+            try:
+                accepted = self.connection.send_messages([entry.message])
+            except RETRYABLE_SEND_ERRORS as exc:
+                self._drop_connection(entry, exc)
+                continue
+            except Exception as exc:
+                self._drop_connection(entry, exc)
+                break
+            finally:
+                self._last_send = time.monotonic()
+            if not accepted:
+                entry.error = RuntimeError("Email backend did not accept the message.")
+                break
+            self._sent_on_connection += 1
+            entry.status = SENT
+            entry.error = None
+            return entry
+        entry.status = FAILED
+        logger.warning(
+            "Email %r could not be sent after %s attempt(s).",
+            getattr(entry.message, "subject", ""),
+            entry.attempts,
+            exc_info=entry.error,
+        )
+        return entry
+
+
+_active_outbox = contextvars.ContextVar("mail_outbox", default=None)
+
+
+@contextmanager
+def mail_outbox(**options):
+    """
+    Route every ``send_message`` call in the block through one
+    ``MailOutbox``, so bulk sends share a connection instead of paying a TLS
+    handshake per message. A nested block reuses the outer outbox.
+    """
+    current = _active_outbox.get()
+    if current is not None:
+        yield current
+        return
+    outbox = MailOutbox(**options)
+    token = _active_outbox.set(outbox)
+    try:
+        with outbox:
+            yield outbox
+    finally:
+        _active_outbox.reset(token)
+
+
+def send_message(message):
+    """
+    Send a rendered message like ``message.send(fail_silently=False)``,
+    over the active outbox's connection inside a ``mail_outbox()`` block.
+    """
+    outbox = _active_outbox.get()
+    if outbox is None:
+        return message.send(fail_silently=False)
+    return outbox.send(message)
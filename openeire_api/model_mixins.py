@@ -0,0 +1,43 @@
+from django.db import DatabaseError, router, transaction
+
+
+class ProtectedFieldsMixin:
+    """
+    Leaves ``protected_fields`` out of a full ``save()`` of an existing row.
+
+    Those fields (counters, revocation versions, cached totals) are only
+    written by dedicated queryset updates, so a stale in-memory instance must
+    not write an older value back. A full save becomes a save of every other
+    loaded field; when the row is gone it is inserted in full, as a plain
+    ``save()`` would. Saves with ``update_fields`` write exactly what they name.
+    """
+
+    protected_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            args
+            or self._state.adding
+            or kwargs.get("update_fields") is not None
+            or kwargs.get("force_insert")
+        ):
+            return super().save(*args, **kwargs)
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        deferred = self.get_deferred_fields()
+        update_fields = [
+            field.name
+            for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.name not in self.protected_fields
+            and field.attname not in deferred
+        ]
+        try:
+            with transaction.atomic(using=using):
+                return super().save(update_fields=update_fields, **kwargs)
+        except DatabaseError:
+            # "Save with update_fields did not affect any rows": the row was
+            # deleted under us. Anything else is a real error.
+            if type(self)._base_manager.using(using).filter(pk=self.pk).exists():
+                raise
+        kwargs.pop("force_update", None)
+        return super().save(force_insert=True, **kwargs)
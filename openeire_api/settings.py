@@ -112,6 +112,29 @@ REAL_ESTATE_DELIVERY_GRACE_DAYS = _safe_int_env(
 REAL_ESTATE_DELIVERY_SESSION_SECONDS = _safe_int_env(
     "REAL_ESTATE_DELIVERY_SESSION_SECONDS", 12 * 60 * 60
 )
+# Portal access events are buffered per worker and written in batches of this
+# size, or after REAL_ESTATE_ACCESS_EVENT_FLUSH_SECONDS; 0 writes each event
+# synchronously.
+REAL_ESTATE_ACCESS_EVENT_BUFFER_SIZE = _safe_int_env(
+    "REAL_ESTATE_ACCESS_EVENT_BUFFER_SIZE", 50
+)
+REAL_ESTATE_ACCESS_EVENT_FLUSH_SECONDS = float(
+    os.getenv("REAL_ESTATE_ACCESS_EVENT_FLUSH_SECONDS", "5")
+)
+# Background threads per worker that pre-render issued invoice and cash
+# receipt PDFs into private storage; 0 renders them on first download.
+REAL_ESTATE_DOCUMENT_RENDER_WORKERS = _safe_int_env(
+    "REAL_ESTATE_DOCUMENT_RENDER_WORKERS", 1
+)
+# Background threads per worker that send new-enquiry emails after commit;
+# 0 sends them in the request once it commits. Failed sends are retried by
+# send_realestate_enquiry_emails up to the attempt limit.
+REAL_ESTATE_ENQUIRY_EMAIL_WORKERS = _safe_int_env(
+    "REAL_ESTATE_ENQUIRY_EMAIL_WORKERS", 1
+)
+REAL_ESTATE_ENQUIRY_EMAIL_MAX_ATTEMPTS = _safe_int_env(
+    "REAL_ESTATE_ENQUIRY_EMAIL_MAX_ATTEMPTS", 5
+)
 REAL_ESTATE_DELIVERY_R2_PREFIX = os.getenv(
     "REAL_ESTATE_DELIVERY_R2_PREFIX", "real-estate-deliveries"
 )
@@ -188,6 +211,7 @@ INSTALLED_APPS = [
     'dj_rest_auth.registration',
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'storages',
     'django_countries',
@@ -219,6 +243,34 @@ THROTTLE_FAIL_OPEN = env_bool(
     os.getenv("THROTTLE_FAIL_OPEN"),
     default=DEBUG,
 )
+# "auto" picks the atomic Redis Lua limiter for Redis caches and the
+# in-process cache limiter otherwise; "redis" or "cache" force one engine.
+THROTTLE_LIMITER_BACKEND = os.getenv("THROTTLE_LIMITER_BACKEND", "auto")
+# Optional per-worker pre-admission: lease this many units of a key's budget
+# per limiter call (capped at a tenth of the scope limit; 0 disables) and keep
+# each lease for at most THROTTLE_LOCAL_LEASE_SECONDS.
+THROTTLE_LOCAL_LEASE_SIZE = int(os.getenv("THROTTLE_LOCAL_LEASE_SIZE", "0"))
+THROTTLE_LOCAL_LEASE_SECONDS = float(os.getenv("THROTTLE_LOCAL_LEASE_SECONDS", "1.0"))
+# Digital gallery entitlements are cached per user on the default cache for
+# at most this long (and never past the grant's expiry).
+GALLERY_ENTITLEMENT_CACHE_SECONDS = int(os.getenv("GALLERY_ENTITLEMENT_CACHE_SECONDS", "300"))
+# JWT requests are authenticated from token claims plus a cached per-user
+# auth state (token version, active/staff flags); entries live this long.
+JWT_USER_STATE_CACHE_SECONDS = int(os.getenv("JWT_USER_STATE_CACHE_SECONDS", "300"))
+# Refresh-token blacklist checks cache a blacklisted JTI until the token
+# expires, but a not-blacklisted answer only this long. Caching is skipped on
+# a per-process (LocMem) cache unless JWT_TOKEN_STATE_CACHE_SHARED is set.
+JWT_TOKEN_STATE_OUTSTANDING_CACHE_SECONDS = int(
+    os.getenv("JWT_TOKEN_STATE_OUTSTANDING_CACHE_SECONDS", "30")
+)
+# Rendered sitemap sections are cached this long; catalogue and blog changes
+# drop them sooner (see openeire_api.sitemap_cache).
+SITEMAP_CACHE_SECONDS = int(os.getenv("SITEMAP_CACHE_SECONDS", "86400"))
+# Newest preview clips listed as video entries on /footage (capped at 1000).
+SITEMAP_FOOTAGE_VIDEO_LIMIT = int(os.getenv("SITEMAP_FOOTAGE_VIDEO_LIMIT", "500"))
+# Real-estate delivery release decisions are cached per enquiry under a
+# finance version that invoice, payment and override changes bump.
+REAL_ESTATE_RELEASE_CACHE_SECONDS = int(os.getenv("REAL_ESTATE_RELEASE_CACHE_SECONDS", "300"))
 JWT_USE_HTTPONLY_COOKIES = env_bool(
     os.getenv("JWT_USE_HTTPONLY_COOKIES"),
     default=False,
@@ -255,7 +307,7 @@ CACHES = build_cache_settings(
 # Simple JWT Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'userprofiles.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -318,6 +370,7 @@ REST_AUTH = {
     'JWT_AUTH_COOKIE': JWT_ACCESS_COOKIE_NAME if JWT_USE_HTTPONLY_COOKIES else None,
     'JWT_AUTH_REFRESH_COOKIE': JWT_REFRESH_COOKIE_NAME if JWT_USE_HTTPONLY_COOKIES else None,
     'JWT_AUTH_HTTPONLY': JWT_USE_HTTPONLY_COOKIES,
+    'JWT_TOKEN_CLAIMS_SERIALIZER': 'userprofiles.serializers.MyTokenObtainPairSerializer',
 }
 
 AUTHENTICATION_BACKENDS = [
@@ -579,6 +632,13 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
+# Bulk sends (admin email actions, tracking-email syncs, enquiry email
+# retries) go through openeire_api.mail_outbox over one SMTP connection,
+# recycled after this many messages, optionally rate limited (0 = no limit),
+# with this many reconnect-and-retry attempts per failed message.
+EMAIL_OUTBOX_BATCH_SIZE = _safe_int_env("EMAIL_OUTBOX_BATCH_SIZE", 50)
+EMAIL_OUTBOX_RATE_PER_SECOND = float(os.getenv("EMAIL_OUTBOX_RATE_PER_SECOND", "0"))
+EMAIL_OUTBOX_RECONNECT_ATTEMPTS = _safe_int_env("EMAIL_OUTBOX_RECONNECT_ATTEMPTS", 1)
 DEFAULT_FROM_EMAIL = format_branded_sender(
     os.getenv('DEFAULT_FROM_EMAIL') or BUSINESS_EMAIL or DEFAULT_STUDIO_EMAIL
 )
@@ -652,6 +712,17 @@ STRIPE_TIMEOUT_SECONDS = int(os.getenv('STRIPE_TIMEOUT_SECONDS', '10'))
 STRIPE_MAX_NETWORK_RETRIES = int(os.getenv('STRIPE_MAX_NETWORK_RETRIES', '2'))
 PRODIGI_CONNECT_TIMEOUT_SECONDS = float(os.getenv('PRODIGI_CONNECT_TIMEOUT_SECONDS', '5'))
 PRODIGI_READ_TIMEOUT_SECONDS = float(os.getenv('PRODIGI_READ_TIMEOUT_SECONDS', '20'))
+PRODIGI_MAX_REQUESTS_PER_SECOND = float(os.getenv('PRODIGI_MAX_REQUESTS_PER_SECOND', '5'))
+PRODIGI_HTTP_POOL_MAXSIZE = int(os.getenv('PRODIGI_HTTP_POOL_MAXSIZE', '10'))
+PRODIGI_SYNC_MAX_WORKERS = int(os.getenv('PRODIGI_SYNC_MAX_WORKERS', '4'))
+PRODIGI_MAX_RETRIES = int(os.getenv('PRODIGI_MAX_RETRIES', '2'))
+PRODIGI_RETRY_BACKOFF_SECONDS = float(os.getenv('PRODIGI_RETRY_BACKOFF_SECONDS', '0.5'))
+PRODIGI_RETRY_MAX_DELAY_SECONDS = float(os.getenv('PRODIGI_RETRY_MAX_DELAY_SECONDS', '5'))
+PRODIGI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('PRODIGI_CIRCUIT_FAILURE_THRESHOLD', '5'))
+PRODIGI_CIRCUIT_FAILURE_WINDOW_SECONDS = int(os.getenv('PRODIGI_CIRCUIT_FAILURE_WINDOW_SECONDS', '60'))
+PRODIGI_CIRCUIT_OPEN_SECONDS = int(os.getenv('PRODIGI_CIRCUIT_OPEN_SECONDS', '60'))
+PRODIGI_POLL_IN_PRODUCTION_MINUTES = int(os.getenv('PRODIGI_POLL_IN_PRODUCTION_MINUTES', '30'))
+PRODIGI_POLL_SHIPPED_MINUTES = int(os.getenv('PRODIGI_POLL_SHIPPED_MINUTES', '1440'))
 PRODIGI_CALLBACK_BASE_URL = os.getenv("PRODIGI_CALLBACK_BASE_URL")
 PRODIGI_CALLBACK_TOKEN = os.getenv("PRODIGI_CALLBACK_TOKEN", "")
 PRODIGI_CALLBACK_BASE_URL = require_env_in_production(
@@ -20,6 +20,8 @@ CACHES = {
         "TIMEOUT": None,
     },
 }
+# One process, so the LocMem cache is as good as shared for token state.
+JWT_TOKEN_STATE_CACHE_SHARED = True
 
 SECURE_SSL_REDIRECT = False
 SESSION_COOKIE_SECURE = False
@@ -28,3 +30,9 @@ SECURE_HSTS_SECONDS = 0
 SECURE_HSTS_INCLUDE_SUBDOMAINS = False
 SECURE_HSTS_PRELOAD = False
 JWT_COOKIE_SECURE = False
+
+# Tests read access events straight after the request that recorded them.
+REAL_ESTATE_ACCESS_EVENT_BUFFER_SIZE = 0
+# Rendered on demand; background threads cannot see test transactions.
+REAL_ESTATE_DOCUMENT_RENDER_WORKERS = 0
+REAL_ESTATE_ENQUIRY_EMAIL_WORKERS = 0
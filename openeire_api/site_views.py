@@ -1,6 +1,19 @@
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 
 from .site_paths import get_admin_path
+from .sitemap_cache import (
+    SitemapDocument,
+    get_sitemap_page,
+    get_sitemap_section,
+    http_timestamp,
+    render_sitemap_index,
+)
+from .sitemaps import sitemaps
+
+SITEMAP_HTTP_MAX_AGE = 60 * 60
 
 
 def robots_txt(request):
@@ -22,3 +35,39 @@ def robots_txt(request):
         ]
     )
     return HttpResponse(content, content_type="text/plain; charset=utf-8")
+
+
+def _sitemap_response(request, document):
+    etag = quote_etag(document.etag)
+    last_modified = http_timestamp(document.last_modified)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(document.body, content_type="application/xml")
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=SITEMAP_HTTP_MAX_AGE)
+    return response
+
+
+def sitemap_index(request):
+    entries = []
+    last_modified = None
+    for name in sitemaps:
+        section = get_sitemap_section(name)
+        location = request.build_absolute_uri(reverse("sitemap_section", args=[name]))
+        for page in range(1, section.pages + 1):
+            entries.append((location if page == 1 else f"{location}?p={page}", section.last_modified))
+        last_modified = max(filter(None, [last_modified, section.last_modified]))
+    document = SitemapDocument.from_body(render_sitemap_index(entries), last_modified)
+    return _sitemap_response(request, document)
+
+
+def sitemap_section(request, section):
+    try:
+        page = int(request.GET.get("p", 1))
+    except (TypeError, ValueError):
+        raise Http404("No sitemap page found.")
+    document = get_sitemap_page(section, page)
+    if document is None:
+        raise Http404("No sitemap page found.")
+    return _sitemap_response(request, document)
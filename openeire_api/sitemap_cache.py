@@ -0,0 +1,228 @@
+import hashlib
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_SECTION_CACHE_KEY = "sitemap:v1:{section}"
+SITEMAP_PAGE_CACHE_KEY = "sitemap:v1:{section}:{generation}:{page}"
+DEFAULT_SITEMAP_CACHE_SECONDS = 60 * 60 * 24
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+IMAGE_NS = "http://www.google.com/schemas/sitemap-image/1.1"
+VIDEO_NS = "http://www.google.com/schemas/sitemap-video/1.1"
+# Longest video duration the video sitemap schema accepts, in seconds.
+MAX_VIDEO_DURATION = 28800
+
+
+@dataclass(frozen=True)
+class SitemapDocument:
+    """A rendered sitemap XML document and its HTTP validators."""
+
+    body: bytes
+    etag: str
+    last_modified: datetime
+
+    @classmethod
+    def from_body(cls, body, last_modified):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        return cls(data, hashlib.sha256(data).hexdigest()[:32], last_modified)
+
+
+@dataclass(frozen=True)
+class SitemapSection:
+    """Cached summary of one sitemap section: its page count and build time."""
+
+    name: str
+    pages: int
+    last_modified: datetime
+    generation: str
+
+
+def _cache_timeout():
+    return int(getattr(settings, "SITEMAP_CACHE_SECONDS", DEFAULT_SITEMAP_CACHE_SECONDS))
+
+
+def _registry():
+    from .sitemaps import sitemaps
+
+    return sitemaps
+
+
+def _section_key(section):
+    return SITEMAP_SECTION_CACHE_KEY.format(section=section)
+
+
+def _page_key(section, generation, page):
+    return SITEMAP_PAGE_CACHE_KEY.format(section=section, generation=generation, page=page)
+
+
+def _now():
+    # HTTP dates have one-second resolution.
+    return timezone.now().replace(microsecond=0)
+
+
+def _element(name, value):
+    return f"<{name}>{escape(str(value))}</{name}>"
+
+
+def _render_url(url):
+    parts = ["<url>", _element("loc", url["location"])]
+    lastmod = url.get("lastmod")
+    if lastmod:
+        parts.append(_element("lastmod", lastmod.strftime("%Y-%m-%d")))
+    if url.get("changefreq"):
+        parts.append(_element("changefreq", url["changefreq"]))
+    if url.get("priority") is not None:
+        parts.append(_element("priority", url["priority"]))
+    for image in url.get("images") or ():
+        parts.append("<image:image>")
+        parts.append(_element("image:loc", image["loc"]))
+        if image.get("title"):
+            parts.append(_element("image:title", image["title"]))
+        parts.append("</image:image>")
+    for video in url.get("videos") or ():
+        parts.append("<video:video>")
+        parts.append(_element("video:thumbnail_loc", video["thumbnail_loc"]))
+        parts.append(_element("video:title", video["title"]))
+        parts.append(_element("video:description", video.get("description") or video["title"]))
+        parts.append(_element("video:content_loc", video["content_loc"]))
+        duration = video.get("duration")
+        if duration and 0 < int(duration) <= MAX_VIDEO_DURATION:
+            parts.append(_element("video:duration", int(duration)))
+        parts.append("</video:video>")
+    parts.append("</url>")
+    return "".join(parts)
+
+
+def render_urlset(urls):
+    body = "".join(_render_url(url) for url in urls)
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f"<urlset xmlns={quoteattr(SITEMAP_NS)} xmlns:image={quoteattr(IMAGE_NS)} "
+        f"xmlns:video={quoteattr(VIDEO_NS)}>{body}</urlset>\n"
+    )
+
+
+def render_sitemap_index(entries):
+    """``entries`` is an iterable of ``(location, lastmod)`` pairs."""
+    body = "".join(
+        "<sitemap>"
+        + _element("loc", location)
+        + (_element("lastmod", lastmod.strftime("%Y-%m-%d")) if lastmod else "")
+        + "</sitemap>"
+        for location, lastmod in entries
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f"<sitemapindex xmlns={quoteattr(SITEMAP_NS)}>{body}</sitemapindex>\n"
+    )
+
+
+def _render_section_pages(section):
+    site_map = _registry()[section]()
+    now = _now()
+    return [
+        SitemapDocument.from_body(render_urlset(site_map.get_urls(page=page)), now)
+        for page in site_map.paginator.page_range
+    ]
+
+
+def build_sitemap_section(section):
+    """
+    Render every page of ``section`` and cache it under a fresh generation,
+    so readers never mix pages from two builds. Returns the ``SitemapSection``.
+    """
+    documents = _render_section_pages(section)
+    summary = SitemapSection(
+        name=section,
+        pages=len(documents),
+        last_modified=documents[0].last_modified,
+        generation=uuid.uuid4().hex[:12],
+    )
+    timeout = _cache_timeout()
+    try:
+        cache.set_many(
+            {
+                _page_key(section, summary.generation, page): (doc.body, doc.etag, doc.last_modified)
+                for page, doc in enumerate(documents, start=1)
+            },
+            timeout,
+        )
+        # The summary goes last: once it is visible every page it names is.
+        cache.set(
+            _section_key(section),
+            (summary.pages, summary.last_modified, summary.generation),
+            timeout,
+        )
+    except Exception:
+        logger.warning("Could not cache sitemap section %s.", section, exc_info=True)
+    return summary, documents
+
+
+def build_sitemaps(sections=None):
+    """Rebuild the given (default: all) sections. Returns ``{section: pages}``."""
+    names = list(sections or _registry())
+    return {name: build_sitemap_section(name)[0].pages for name in names}
+
+
+def _cached_section(section):
+    try:
+        cached = cache.get(_section_key(section))
+    except Exception:
+        logger.warning("Sitemap cache unavailable; rendering section %s.", section, exc_info=True)
+        return None
+    if cached is None:
+        return None
+    pages, last_modified, generation = cached
+    return SitemapSection(section, pages, last_modified, generation)
+
+
+def get_sitemap_section(section):
+    """The cached ``SitemapSection`` for ``section``, building it on a miss."""
+    if section not in _registry():
+        return None
+    return _cached_section(section) or build_sitemap_section(section)[0]
+
+
+def get_sitemap_page(section, page):
+    """
+    The cached ``SitemapDocument`` for one page of a section, or ``None`` for
+    an unknown section or page. Misses rebuild the whole section once.
+    """
+    if section not in _registry() or page < 1:
+        return None
+    summary = _cached_section(section)
+    if summary is not None:
+        if page > summary.pages:
+            return None
+        try:
+            cached = cache.get(_page_key(section, summary.generation, page))
+        except Exception:
+            logger.warning("Sitemap cache unavailable; rendering section %s.", section, exc_info=True)
+            cached = None
+        if cached is not None:
+            return SitemapDocument(*cached)
+
+    summary, documents = build_sitemap_section(section)
+    return documents[page - 1] if page <= len(documents) else None
+
+
+def invalidate_sitemaps(*sections):
+    """Drop cached sections (default: all) so the next request rebuilds them."""
+    names = sections or tuple(_registry())
+    try:
+        cache.delete_many([_section_key(name) for name in names])
+    except Exception:
+        logger.warning("Could not invalidate sitemap cache.", exc_info=True)
+
+
+def http_timestamp(value):
+    return int(value.astimezone(dt_timezone.utc).timestamp())
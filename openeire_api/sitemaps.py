@@ -1,11 +1,17 @@
-from urllib.parse import urljoin
+from urllib.parse import quote, urljoin, urlsplit
 
 from django.conf import settings
 from django.contrib.sitemaps import Sitemap
 from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Exists, OuterRef
 
 from blog.models import BlogPost
-from products.models import Photo
+from products.models import Photo, ProductVariant, Video
+
+# Sitemap protocol caps: URLs per document, and images per URL (Google).
+SITEMAP_URL_LIMIT = 50000
+SITEMAP_MEDIA_PER_URL_LIMIT = 1000
+DEFAULT_FOOTAGE_VIDEO_LIMIT = 500
 
 
 def _frontend_base_url():
@@ -21,8 +27,52 @@ def _frontend_url(path):
     return urljoin(_frontend_base_url(), path.lstrip("/"))
 
 
+def _public_media_url(name):
+    """
+    Unsigned public URL for a media key, built from ``MEDIA_URL`` rather
+    than the storage backend: sitemaps are cached for a day, and a
+    pre-signed storage URL would expire while still being served. Returns
+    ``""`` when there is no key, ``MEDIA_URL`` is relative (local dev media
+    crawlers cannot reach), or the URL carries a query string.
+    """
+    name = (name or "").strip()
+    if not name:
+        return ""
+    if not name.startswith(("http://", "https://")):
+        media_url = getattr(settings, "MEDIA_URL", "") or ""
+        name = urljoin(f"{media_url.rstrip('/')}/", quote(name.lstrip("/")))
+    parts = urlsplit(name)
+    if parts.scheme not in ("http", "https") or not parts.netloc or parts.query:
+        return ""
+    return name
+
+
+def footage_video_limit():
+    """Preview clips listed on ``/footage``, newest first."""
+    limit = int(getattr(settings, "SITEMAP_FOOTAGE_VIDEO_LIMIT", DEFAULT_FOOTAGE_VIDEO_LIMIT) or 0)
+    return min(max(limit, 0), SITEMAP_MEDIA_PER_URL_LIMIT)
+
+
+def _absolute_media_url(field_file):
+    if not field_file:
+        return ""
+    return _public_media_url(field_file.name)
+
+
 class FrontendAbsoluteUrlSitemap(Sitemap):
     protocol = "https"
+    limit = SITEMAP_URL_LIMIT
+
+    def images(self, item):
+        """``[{"loc", "title"}]`` image entries for a URL."""
+        return []
+
+    def videos(self, item):
+        """
+        ``[{"thumbnail_loc", "title", "description", "content_loc", "duration"}]``
+        video entries for a URL.
+        """
+        return []
 
     def get_urls(self, page=1, site=None, protocol=None):
         urls = []
@@ -36,6 +86,8 @@ class FrontendAbsoluteUrlSitemap(Sitemap):
                     "changefreq": self._get("changefreq", item),
                     "priority": self._get("priority", item),
                     "alternates": [],
+                    "images": self.images(item)[:SITEMAP_MEDIA_PER_URL_LIMIT],
+                    "videos": self.videos(item)[:SITEMAP_MEDIA_PER_URL_LIMIT],
                 }
             )
         return urls
@@ -80,13 +132,45 @@ class StaticPageSitemap(FrontendAbsoluteUrlSitemap):
     def priority(self, item):
         return item["priority"]
 
+    def videos(self, item):
+        # Footage has no indexable per-video pages, so preview clips are
+        # listed on the footage landing page.
+        if item["path"] != "/footage":
+            return []
+        entries = []
+        videos = (
+            Video.objects.filter(is_active=True)
+            .exclude(preview_video_key="")
+            .only("title", "description", "thumbnail_image", "preview_video_key", "duration")
+            .order_by("-created_at", "-pk")[: footage_video_limit()]
+        )
+        for video in videos:
+            thumbnail = _absolute_media_url(video.thumbnail_image)
+            content = _public_media_url(video.preview_video_key)
+            if not thumbnail or not content:
+                continue
+            entries.append(
+                {
+                    "thumbnail_loc": thumbnail,
+                    "title": video.title,
+                    "description": video.description,
+                    "content_loc": content,
+                    "duration": video.duration,
+                }
+            )
+        return entries
+
 
 class BlogPostSitemap(FrontendAbsoluteUrlSitemap):
     changefreq = "weekly"
     priority = 0.8
 
     def items(self):
-        return BlogPost.objects.filter(status=1).order_by("-updated_at")
+        return (
+            BlogPost.objects.filter(status=1)
+            .only("slug", "title", "featured_image", "updated_at")
+            .order_by("-updated_at")
+        )
 
     def lastmod(self, obj):
         return obj.updated_at
@@ -94,19 +178,21 @@ class BlogPostSitemap(FrontendAbsoluteUrlSitemap):
     def location(self, obj):
         return _frontend_url(f"/blog/{obj.slug}")
 
+    def images(self, obj):
+        loc = _absolute_media_url(obj.featured_image)
+        return [{"loc": loc, "title": obj.title}] if loc else []
+
 
 class PhysicalPhotoSitemap(FrontendAbsoluteUrlSitemap):
     changefreq = "weekly"
     priority = 0.8
 
     def items(self):
+        has_variants = ProductVariant.objects.filter(photo_id=OuterRef("pk"))
         return (
-            Photo.objects.filter(
-                is_active=True,
-                is_printable=True,
-                variants__isnull=False,
-            )
-            .distinct()
+            Photo.objects.filter(is_active=True, is_printable=True)
+            .filter(Exists(has_variants))
+            .only("title", "preview_image", "created_at")
             .order_by("-created_at")
         )
 
@@ -116,6 +202,10 @@ class PhysicalPhotoSitemap(FrontendAbsoluteUrlSitemap):
     def location(self, obj):
         return _frontend_url(f"/gallery/physical/{obj.id}")
 
+    def images(self, obj):
+        loc = _absolute_media_url(obj.preview_image)
+        return [{"loc": loc, "title": obj.title}] if loc else []
+
 
 sitemaps = {
     "static": StaticPageSitemap,
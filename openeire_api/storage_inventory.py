@@ -0,0 +1,256 @@
+import heapq
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import BigIntegerField, BooleanField, Case, F, Q, Value, When
+from django.db.models.functions import Collate
+from django.utils import timezone
+
+from products.models import LicenceDocument, Photo, Video, VideoUploadSession
+from products.uploads import get_object_prefix
+from realestate.delivery_storage import get_delivery_prefix, validate_deletable_key
+from realestate.models import RealEstateDeliverable, RealEstateDeliveryUploadSession
+
+# ListObjectsV2 returns at most 1000 keys per page.
+LIST_PAGE_SIZE = 1000
+DB_CHUNK_SIZE = 2000
+DEFAULT_ORPHAN_MIN_AGE = timedelta(hours=24)
+
+
+class InventoryError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class KeySource:
+    """
+    One database column holding private-bucket keys. Every row of
+    ``queryset`` references its key (so the object is not an orphan); rows
+    matching ``expected`` (default: all of them) must also have their object
+    in the bucket.
+    """
+
+    label: str
+    queryset: object
+    field: str
+    size_field: str = ""
+    expected: Q | None = None
+
+
+@dataclass(frozen=True)
+class Finding:
+    kind: str
+    key: str
+    size: int | None
+    last_modified: object = None
+    sources: tuple = ()
+
+    def as_dict(self):
+        data = {"type": self.kind, "key": self.key, "size": self.size}
+        if self.last_modified is not None:
+            data["last_modified"] = self.last_modified.isoformat()
+        if self.sources:
+            data["sources"] = list(self.sources)
+        return data
+
+
+@dataclass
+class PrefixReport:
+    prefix: str
+    listed: int = 0
+    listed_bytes: int = 0
+    referenced: int = 0
+    orphans: int = 0
+    orphan_bytes: int = 0
+    missing: int = 0
+    deleted: int = 0
+    delete_failures: int = 0
+
+    def as_dict(self):
+        return {"type": "summary", **self.__dict__}
+
+
+def key_sources():
+    return (
+        KeySource("photo.high_res_file", Photo.objects.all(), "high_res_file"),
+        KeySource("video.video_file", Video.objects.all(), "video_file"),
+        KeySource("video.video_file_key", Video.objects.all(), "video_file_key"),
+        KeySource("licencedocument.file", LicenceDocument.objects.all(), "file"),
+        KeySource(
+            "videouploadsession.object_key",
+            VideoUploadSession.objects.filter(
+                purpose=VideoUploadSession.PURPOSE_MASTER,
+            ).exclude(status=VideoUploadSession.STATUS_ABORTED),
+            "object_key",
+            size_field="file_size",
+            expected=Q(status=VideoUploadSession.STATUS_COMPLETED),
+        ),
+        KeySource(
+            "realestatedeliverable.object_key",
+            RealEstateDeliverable.objects.filter(deleted_at__isnull=True),
+            "object_key",
+            size_field="file_size",
+        ),
+        KeySource(
+            "realestatedeliveryuploadsession.object_key",
+            RealEstateDeliveryUploadSession.objects.exclude(
+                status=RealEstateDeliveryUploadSession.Status.ABORTED,
+            ).exclude(error_code="cleanup_orphan_removed"),
+            "object_key",
+            size_field="expected_size",
+            expected=Q(status=RealEstateDeliveryUploadSession.Status.COMPLETED),
+        ),
+    )
+
+
+def default_prefixes():
+    """
+    The private-bucket prefixes the app writes to, with nested prefixes
+    folded into their parent so no object is listed twice.
+    """
+    candidates = sorted(
+        {
+            Photo._meta.get_field("high_res_file").upload_to,
+            Video._meta.get_field("video_file").upload_to,
+            LicenceDocument._meta.get_field("file").upload_to,
+            get_object_prefix(VideoUploadSession.PURPOSE_MASTER),
+            get_delivery_prefix(),
+        }
+    )
+    prefixes = []
+    for candidate in (f"{value.strip('/')}/" for value in candidates):
+        if not any(candidate.startswith(prefix) for prefix in prefixes):
+            prefixes.append(candidate)
+    return prefixes
+
+
+def _byte_ordered(field_name):
+    # The merge needs keys in the bucket's (UTF-8 byte) order. SQLite's
+    # default BINARY collation already sorts that way; PostgreSQL needs "C".
+    if connection.vendor == "postgresql":
+        return Collate(F(field_name), "C").asc()
+    return F(field_name).asc()
+
+
+def _source_rows(source, prefix):
+    """Yield ``(key, size, expected, label)`` for ``source`` in byte order."""
+    expected = Value(True, output_field=BooleanField())
+    if source.expected is not None:
+        expected = Case(
+            When(source.expected, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+    size = F(source.size_field) if source.size_field else Value(None, output_field=BigIntegerField())
+    rows = (
+        source.queryset.filter(**{f"{source.field}__startswith": prefix})
+        .annotate(_size=size, _expected=expected)
+        .order_by(_byte_ordered(source.field))
+        .values_list(source.field, "_size", "_expected")
+        .iterator(chunk_size=DB_CHUNK_SIZE)
+    )
+    for key, size, expected in rows:
+        yield key, size, expected, source.label
+
+
+def _ordered(rows, what):
+    previous = None
+    for row in rows:
+        if previous is not None and row[0] < previous:
+            raise InventoryError(
+                f"{what} returned keys out of byte order ({previous!r} before {row[0]!r})."
+            )
+        previous = row[0]
+        yield row
+
+
+def referenced_keys(prefix, sources=None):
+    """
+    Yield ``(key, expected_size, expected, labels)`` for every key under
+    ``prefix`` that the database references, in byte order and once per key.
+    Each source is streamed from the database, so memory stays flat.
+    """
+    streams = [
+        _ordered(_source_rows(source, prefix), source.label)
+        for source in (sources or key_sources())
+    ]
+    current = None
+    for key, size, expected, label in heapq.merge(*streams, key=lambda row: row[0]):
+        if current is not None and current[0] == key:
+            current[1] = current[1] if current[1] is not None else size
+            current[2] = current[2] or expected
+            if label not in current[3]:
+                current[3].append(label)
+            continue
+        if current is not None:
+            yield tuple(current[:3]) + (tuple(current[3]),)
+        current = [key, size, expected, [label]]
+    if current is not None:
+        yield tuple(current[:3]) + (tuple(current[3]),)
+
+
+def listed_objects(client, bucket, prefix, page_size=LIST_PAGE_SIZE):
+    """Yield ``(key, size, last_modified)`` for each object under ``prefix``."""
+    params = {"Bucket": bucket, "Prefix": prefix, "MaxKeys": page_size}
+    while True:
+        response = client.list_objects_v2(**params)
+        for item in response.get("Contents", ()):
+            yield item["Key"], int(item.get("Size", 0)), item.get("LastModified")
+        token = response.get("NextContinuationToken")
+        if not response.get("IsTruncated") or not token:
+            return
+        params["ContinuationToken"] = token
+
+
+def reconcile_prefix(client, bucket, prefix, report, *, page_size=LIST_PAGE_SIZE, sources=None):
+    """
+    Sorted merge of the bucket listing and the referenced keys under
+    ``prefix``. Yields a ``Finding`` for every orphan (listed, unreferenced)
+    and every missing key (expected by a row, not listed), updating
+    ``report`` as it goes.
+    """
+    listing = _ordered(listed_objects(client, bucket, prefix, page_size), "The bucket listing")
+    references = referenced_keys(prefix, sources)
+    obj = next(listing, None)
+    ref = next(references, None)
+    while obj is not None or ref is not None:
+        if ref is None or (obj is not None and obj[0] < ref[0]):
+            key, size, last_modified = obj
+            report.listed += 1
+            report.listed_bytes += size
+            report.orphans += 1
+            report.orphan_bytes += size
+            yield Finding("orphan", key, size, last_modified)
+            obj = next(listing, None)
+        elif obj is None or ref[0] < obj[0]:
+            key, size, expected, labels = ref
+            report.referenced += 1
+            if expected:
+                report.missing += 1
+                yield Finding("missing", key, size, sources=labels)
+            ref = next(references, None)
+        else:
+            report.listed += 1
+            report.listed_bytes += obj[1]
+            report.referenced += 1
+            obj = next(listing, None)
+            ref = next(references, None)
+
+
+def is_deletable_orphan(finding, now=None, min_age=DEFAULT_ORPHAN_MIN_AGE):
+    """
+    Only delivery objects that pass ``validate_deletable_key`` and are older
+    than ``min_age`` (so an upload whose row has not committed yet is left
+    alone) go to the deletion path.
+    """
+    if finding.kind != "orphan":
+        return False
+    try:
+        validate_deletable_key(finding.key)
+    except Exception:
+        return False
+    if finding.last_modified is None:
+        return False
+    return finding.last_modified <= (now or timezone.now()) - min_age
+
@@ -3,3 +3,39 @@ from email.header import decode_header, make_header
 
 def decode_sender_header(value):
     return str(make_header(decode_header(value)))
+
+
+class FakeS3Client:
+    """
+    In-memory stand-in for the parts of an S3/R2 client the storage
+    reconciliation uses: paginated ``list_objects_v2`` and ``delete_objects``.
+    ``objects`` maps keys to ``(size, last_modified)``.
+    """
+
+    def __init__(self, objects=None):
+        self.objects = dict(objects or {})
+        self.list_calls = []
+        self.deleted = []
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, ContinuationToken=None):
+        self.list_calls.append({"Prefix": Prefix, "MaxKeys": MaxKeys, "ContinuationToken": ContinuationToken})
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        if ContinuationToken:
+            keys = [key for key in keys if key > ContinuationToken]
+        page = keys[:MaxKeys]
+        response = {
+            "Contents": [
+                {"Key": key, "Size": self.objects[key][0], "LastModified": self.objects[key][1]}
+                for key in page
+            ],
+            "IsTruncated": len(keys) > MaxKeys,
+        }
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = page[-1]
+        return response
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete["Objects"]:
+            self.objects.pop(item["Key"], None)
+            self.deleted.append(item["Key"])
+        return {}
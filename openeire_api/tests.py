@@ -1,19 +1,41 @@
+import json
 import os
+import smtplib
+import threading
+from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.core.management import call_command
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
 from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
 from blog.models import BlogPost
-from products.models import Photo, PrintTemplate
+from products.models import Photo, PrintTemplate, Video, VideoUploadSession
+from realestate.models import RealEstateDeliverable, RealEstateDelivery, RealEstateEnquiry
+from .background import AfterCommitExecutor, count_setting
+from .mail_outbox import FAILED, SENT, SKIPPED, MailOutbox, mail_outbox, send_message
 from .site_paths import get_admin_path
+from .sitemaps import BlogPostSitemap
+from .storage_inventory import default_prefixes
+from .test_utils import FakeS3Client
 
 
 @override_settings(FRONTEND_URL="https://openeire.ie", SECURE_SSL_REDIRECT=False)
 class SiteMetadataTests(TestCase):
+    def setUp(self):
+        # Sitemap documents are cached across requests (and tests).
+        cache.clear()
+
     def test_robots_txt_disallows_public_utility_routes(self):
         response = self.client.get(reverse("robots_txt"))
         admin_path = get_admin_path()
@@ -115,3 +137,504 @@ class SiteMetadataTests(TestCase):
         physical_response = self.client.get(reverse("sitemap_section", args=["physical"]))
 
         self.assertIn(f"https://openeire.ie/gallery/physical/{photo.id}", physical_response.content.decode())
+
+
+@override_settings(
+    FRONTEND_URL="https://openeire.ie",
+    SECURE_SSL_REDIRECT=False,
+    MEDIA_URL="https://media.openeire.ie/",
+)
+class SitemapCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = get_user_model().objects.create_user(
+            username="sitemapauthor",
+            email="sitemapauthor@example.com",
+            password="StrongPass123!",
+        )
+
+    def _create_post(self, title):
+        return BlogPost.objects.create(
+            title=title,
+            author=self.author,
+            content="<p>Published content</p>",
+            status=1,
+        )
+
+    def test_section_is_served_from_cache_with_validators(self):
+        self._create_post("Cached Sitemap Post")
+        url = reverse("sitemap_section", args=["blog"])
+
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+
+        self.assertEqual(first.content, second.content)
+        self.assertTrue(first["ETag"])
+        self.assertTrue(first["Last-Modified"])
+        self.assertIn("public", first["Cache-Control"])
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        not_modified = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_blog_change_invalidates_cached_section(self):
+        self._create_post("First Sitemap Post")
+        url = reverse("sitemap_section", args=["blog"])
+        self.assertNotIn("second-sitemap-post", self.client.get(url).content.decode())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_post("Second Sitemap Post")
+
+        self.assertIn(
+            "https://openeire.ie/blog/second-sitemap-post",
+            self.client.get(url).content.decode(),
+        )
+
+    def test_sections_paginate_at_the_url_limit(self):
+        self._create_post("Paged Post One")
+        self._create_post("Paged Post Two")
+        url = reverse("sitemap_section", args=["blog"])
+
+        with patch.object(BlogPostSitemap, "limit", 1):
+            index = self.client.get(reverse("sitemap_index")).content.decode()
+            page_two = self.client.get(url, {"p": 2})
+            page_three = self.client.get(url, {"p": 3})
+
+        self.assertIn("sitemap-blog.xml</loc>", index)
+        self.assertIn("sitemap-blog.xml?p=2</loc>", index)
+        self.assertEqual(page_two.status_code, 200)
+        self.assertEqual(page_two.content.decode().count("<url>"), 1)
+        self.assertEqual(page_three.status_code, 404)
+        self.assertEqual(self.client.get(reverse("sitemap_section", args=["missing"])).status_code, 404)
+
+    def test_sitemaps_include_image_and_video_entries(self):
+        PrintTemplate.objects.create(
+            material="eco_canvas",
+            size="12x18",
+            production_cost=Decimal("40.00"),
+            sku_suffix="CAN-12x18",
+        )
+        Photo.objects.create(
+            title="Cliffs & Sea",
+            description="Photo description",
+            collection="Coast",
+            preview_image=SimpleUploadedFile("cliffs.jpg", b"preview", content_type="image/jpeg"),
+            high_res_file=SimpleUploadedFile("cliffs_hi.jpg", b"high_res", content_type="image/jpeg"),
+            price=Decimal("20.00"),
+            is_active=True,
+            is_printable=True,
+        )
+        Video.objects.create(
+            title="Coastline Flyover",
+            description="Drone footage of the coast",
+            collection="Coast",
+            thumbnail_image=SimpleUploadedFile("coast.jpg", b"thumb", content_type="image/jpeg"),
+            video_file_key="digital_products/videos/coast.mp4",
+            preview_video_key="previews/videos/coast-preview.mp4",
+            price=Decimal("50.00"),
+            duration=95,
+        )
+
+        physical = self.client.get(reverse("sitemap_section", args=["physical"])).content.decode()
+        static = self.client.get(reverse("sitemap_section", args=["static"])).content.decode()
+
+        self.assertIn('xmlns:image="http://www.google.com/schemas/sitemap-image/1.1"', physical)
+        self.assertIn("<image:loc>https://media.openeire.ie/previews/photos/cliffs", physical)
+        self.assertIn("<image:title>Cliffs &amp; Sea</image:title>", physical)
+        self.assertIn(
+            "<video:content_loc>https://media.openeire.ie/previews/videos/coast-preview.mp4</video:content_loc>",
+            static,
+        )
+        self.assertIn("<video:thumbnail_loc>https://media.openeire.ie/previews/videos/coast", static)
+        self.assertIn("<video:duration>95</video:duration>", static)
+
+    @override_settings(SITEMAP_FOOTAGE_VIDEO_LIMIT=2)
+    def test_footage_lists_only_the_newest_preview_clips(self):
+        for number in range(3):
+            Video.objects.create(
+                title=f"Clip {number}",
+                description="Drone footage",
+                collection="Coast",
+                thumbnail_image=SimpleUploadedFile(f"clip{number}.jpg", b"thumb", content_type="image/jpeg"),
+                video_file_key=f"digital_products/videos/clip{number}.mp4",
+                preview_video_key=f"previews/videos/clip{number}.mp4",
+                price=Decimal("50.00"),
+                duration=30,
+            )
+
+        static = self.client.get(reverse("sitemap_section", args=["static"])).content.decode()
+
+        self.assertEqual(static.count("<video:video>"), 2)
+        self.assertNotIn("Clip 0", static)
+
+    def test_sitemaps_never_emit_signed_media_urls(self):
+        Video.objects.create(
+            title="Signed Preview",
+            description="Preview stored as a pre-signed URL",
+            collection="Coast",
+            thumbnail_image=SimpleUploadedFile("signed.jpg", b"thumb", content_type="image/jpeg"),
+            video_file_key="digital_products/videos/signed.mp4",
+            preview_video_key=(
+                "https://bucket.r2.example.com/previews/videos/signed.mp4"
+                "?X-Amz-Expires=3600&X-Amz-Signature=abc123"
+            ),
+            price=Decimal("50.00"),
+            duration=30,
+        )
+        post = self._create_post("Signed Image Post")
+        post.featured_image = SimpleUploadedFile("signed.jpg", b"image", content_type="image/jpeg")
+        post.save()
+        signed = "https://bucket.r2.example.com/media/signed.jpg?X-Amz-Signature=abc123"
+
+        with patch("django.core.files.storage.FileSystemStorage.url", return_value=signed):
+            static = self.client.get(reverse("sitemap_section", args=["static"])).content.decode()
+            blog = self.client.get(reverse("sitemap_section", args=["blog"])).content.decode()
+
+        self.assertNotIn("X-Amz-Signature", static + blog)
+        self.assertNotIn("Signed Preview", static)
+        self.assertIn("<image:loc>https://media.openeire.ie/blog_images/signed", blog)
+
+    def test_build_sitemaps_command_warms_every_section(self):
+        self._create_post("Warm Sitemap Post")
+        out = StringIO()
+
+        call_command("build_sitemaps", stdout=out)
+
+        self.assertIn("blog: 1 page(s)", out.getvalue())
+        self.assertIn("Built 3 sitemap section(s).", out.getvalue())
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("sitemap_section", args=["blog"]))
+        self.assertIn("warm-sitemap-post", response.content.decode())
+
+
+@override_settings(R2_PRIVATE_BUCKET_NAME="private-test")
+class PrivateStorageReconciliationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="storage-admin", password="not-a-real-password", is_staff=True
+        )
+        self.old = timezone.now() - timedelta(days=3)
+        Photo.objects.create(
+            title="Cliffs",
+            description="Cliffs",
+            collection="Coast",
+            preview_image="previews/photos/cliffs.jpg",
+            high_res_file="digital_products/photos/cliffs.jpg",
+            price=Decimal("10.00"),
+        )
+        Video.objects.create(
+            title="Coast",
+            description="Coast",
+            collection="Coast",
+            thumbnail_image="previews/videos/coast.jpg",
+            video_file_key="digital_products/videos/coast.mp4",
+            price=Decimal("20.00"),
+        )
+        VideoUploadSession.objects.create(
+            created_by=self.user,
+            original_filename="lost.mp4",
+            object_key="digital_products/videos/lost.mp4",
+            upload_id="upload-lost",
+            purpose=VideoUploadSession.PURPOSE_MASTER,
+            status=VideoUploadSession.STATUS_COMPLETED,
+            file_size=4096,
+            content_type="video/mp4",
+            part_size=10 * 1024 * 1024,
+        )
+        VideoUploadSession.objects.create(
+            created_by=self.user,
+            original_filename="pending.mp4",
+            object_key="digital_products/videos/pending.mp4",
+            upload_id="upload-pending",
+            purpose=VideoUploadSession.PURPOSE_MASTER,
+            file_size=4096,
+            content_type="video/mp4",
+            part_size=10 * 1024 * 1024,
+        )
+        enquiry = RealEstateEnquiry.objects.create(
+            name="Fictional Client",
+            email="client@example.test",
+            phone="+353 00 000 0000",
+            client_type=RealEstateEnquiry.ClientType.ESTATE_AGENT,
+            property_address="Example property",
+            county="Test County",
+            property_type="house",
+            preferred_package=RealEstateEnquiry.PreferredPackage.ESSENTIAL,
+            consent_to_contact=True,
+        )
+        self.delivery = RealEstateDelivery.objects.create(
+            enquiry=enquiry, public_title="Fictional media", created_by=self.user
+        )
+        self.kept_key = f"real-estate-deliveries/{self.delivery.pk}/{'a' * 32}.zip"
+        self.orphan_key = f"real-estate-deliveries/{self.delivery.pk}/{'b' * 32}.zip"
+        self.recent_key = f"real-estate-deliveries/{self.delivery.pk}/{'c' * 32}.zip"
+        RealEstateDeliverable.objects.create(
+            delivery=self.delivery,
+            category=RealEstateDeliverable.Category.ARCHIVE,
+            display_name="Archive",
+            original_filename="archive.zip",
+            object_key=self.kept_key,
+            file_size=2048,
+            mime_type="application/zip",
+            uploaded_by=self.user,
+        )
+        self.s3 = FakeS3Client(
+            {
+                "digital_products/photos/cliffs.jpg": (100, self.old),
+                "digital_products/photos/unused.jpg": (150, self.old),
+                "digital_products/videos/coast.mp4": (300, self.old),
+                "digital_products/videos/pending.mp4": (50, self.old),
+                "licences/documents/stray.pdf": (70, self.old),
+                self.kept_key: (2048, self.old),
+                self.orphan_key: (512, self.old),
+                self.recent_key: (256, timezone.now()),
+            }
+        )
+
+    def _run(self, *args):
+        out = StringIO()
+        command = "home.management.commands.reconcile_private_storage"
+        with patch(f"{command}.get_r2_client_for_purpose", return_value=self.s3), patch(
+            f"{command}.get_bucket_name_for_purpose", return_value="private-test"
+        ), patch("realestate.delivery_storage._client", return_value=self.s3):
+            call_command("reconcile_private_storage", *args, stdout=out)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_default_prefixes_cover_every_private_location(self):
+        self.assertEqual(
+            default_prefixes(),
+            [
+                "digital_products/photos/",
+                "digital_products/videos/",
+                "licences/documents/",
+                "real-estate-deliveries/",
+            ],
+        )
+
+    def test_reports_orphans_and_missing_keys_with_sizes(self):
+        records = self._run("--page-size", "1")
+
+        orphans = {record["key"]: record for record in records if record["type"] == "orphan"}
+        missing = [record for record in records if record["type"] == "missing"]
+        self.assertEqual(
+            set(orphans),
+            {
+                "digital_products/photos/unused.jpg",
+                "licences/documents/stray.pdf",
+                self.orphan_key,
+                self.recent_key,
+            },
+        )
+        self.assertEqual(orphans["digital_products/photos/unused.jpg"]["size"], 150)
+        self.assertFalse(orphans["digital_products/photos/unused.jpg"]["deletable"])
+        self.assertTrue(orphans[self.orphan_key]["deletable"])
+        self.assertFalse(orphans[self.recent_key]["deletable"])
+        self.assertEqual(
+            missing,
+            [
+                {
+                    "type": "missing",
+                    "key": "digital_products/videos/lost.mp4",
+                    "size": 4096,
+                    "sources": ["videouploadsession.object_key"],
+                }
+            ],
+        )
+        summaries = {record["prefix"]: record for record in records if record["type"] == "summary"}
+        self.assertEqual(summaries["real-estate-deliveries/"]["listed"], 3)
+        self.assertEqual(summaries["real-estate-deliveries/"]["orphan_bytes"], 768)
+        self.assertEqual(summaries["digital_products/videos/"]["referenced"], 3)
+        self.assertEqual(self.s3.deleted, [])
+        # One key per page: every object needed its own ListObjectsV2 call.
+        self.assertGreaterEqual(len(self.s3.list_calls), 8)
+
+    def test_delete_orphans_only_removes_old_delivery_objects(self):
+        records = self._run("--delete-orphans")
+
+        self.assertEqual(self.s3.deleted, [self.orphan_key])
+        self.assertIn("digital_products/photos/unused.jpg", self.s3.objects)
+        self.assertIn(self.recent_key, self.s3.objects)
+        self.assertIn(self.kept_key, self.s3.objects)
+        summary = next(
+            record
+            for record in records
+            if record["type"] == "summary" and record["prefix"] == "real-estate-deliveries/"
+        )
+        self.assertEqual(summary["deleted"], 1)
+        self.assertEqual(summary["delete_failures"], 0)
+
+
+class _FlakyBackend(LocmemBackend):
+    """Locmem backend that counts connections and fails chosen sends."""
+
+    def __init__(self, *args, fail_subjects=(), error=None, fail_opens=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_subjects = list(fail_subjects)
+        self.error = error or ConnectionResetError("connection dropped")
+        self.fail_opens = fail_opens
+        self.opened = 0
+        self.closed = 0
+
+    def open(self):
+        self.opened += 1
+        if self.fail_opens:
+            self.fail_opens -= 1
+            raise smtplib.SMTPConnectError(421, "Service not available")
+
+    def close(self):
+        self.closed += 1
+
+    def send_messages(self, messages):
+        if messages[0].subject in self.fail_subjects:
+            self.fail_subjects.remove(messages[0].subject)
+            raise self.error
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class MailOutboxTests(TestCase):
+    def _message(self, subject):
+        return EmailMessage(subject=subject, body="Body", from_email="a@example.com", to=["b@example.com"])
+
+    def test_outbox_reuses_one_connection_per_batch(self):
+        backend = _FlakyBackend()
+        with MailOutbox(connection=backend, batch_size=2, rate_per_second=0) as outbox:
+            for number in range(5):
+                outbox.queue(self._message(f"Message {number}"))
+
+        self.assertEqual([entry.status for entry in outbox.entries], [SENT] * 5)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual((backend.opened, backend.closed), (3, 3))
+
+    def test_failed_send_reconnects_and_does_not_stop_the_queue(self):
+        backend = _FlakyBackend(fail_subjects=["Retried", "Lost", "Lost"])
+        outbox = MailOutbox(connection=backend, rate_per_second=0, reconnect_attempts=1)
+        retried = outbox.queue(self._message("Retried"))
+        lost = outbox.queue(self._message("Lost"))
+        after = outbox.queue(self._message("After"))
+        with self.assertLogs("openeire_api.mail_outbox", "WARNING"):
+            outbox.drain()
+        outbox.close()
+
+        self.assertEqual((retried.status, retried.attempts), (SENT, 2))
+        self.assertEqual((lost.status, lost.attempts), (FAILED, 2))
+        self.assertIsInstance(lost.error, ConnectionResetError)
+        self.assertEqual(after.status, SENT)
+        self.assertEqual([message.subject for message in mail.outbox], ["Retried", "After"])
+        self.assertEqual(backend.opened, 4)
+
+    def test_errors_after_handover_are_not_retried(self):
+        backend = _FlakyBackend(
+            fail_subjects=["Rejected"], error=smtplib.SMTPDataError(451, "Try again later"), fail_opens=1
+        )
+        outbox = MailOutbox(connection=backend, rate_per_second=0, reconnect_attempts=2)
+        reopened = outbox.queue(self._message("Reopened"))
+        rejected = outbox.queue(self._message("Rejected"))
+        with self.assertLogs("openeire_api.mail_outbox", "WARNING"):
+            outbox.drain()
+        outbox.close()
+
+        self.assertEqual((reopened.status, reopened.attempts), (SENT, 2))
+        self.assertEqual((rejected.status, rejected.attempts), (FAILED, 1))
+        self.assertIsInstance(rejected.error, smtplib.SMTPDataError)
+
+    def test_message_without_recipients_is_skipped_like_send(self):
+        message = EmailMessage(subject="Nobody", body="Body", from_email="a@example.com")
+        backend = _FlakyBackend()
+
+        self.assertEqual(message.send(fail_silently=False), 0)
+        with mail_outbox(connection=backend, rate_per_second=0) as outbox:
+            self.assertEqual(send_message(message), 0)
+
+        self.assertEqual(outbox.entries[0].status, SKIPPED)
+        self.assertEqual(backend.opened, 0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_rate_limit_spaces_out_sends(self):
+        outbox = MailOutbox(connection=_FlakyBackend(), rate_per_second=10)
+        with patch("openeire_api.mail_outbox.time.sleep") as sleep:
+            for number in range(3):
+                outbox.send(self._message(f"Message {number}"))
+
+        self.assertEqual(sleep.call_count, 2)
+        self.assertLessEqual(max(call.args[0] for call in sleep.call_args_list), 0.1)
+
+    def test_send_message_uses_the_active_outbox(self):
+        send_message(self._message("Direct"))
+        with mail_outbox(rate_per_second=0) as outbox:
+            send_message(self._message("First"))
+            with mail_outbox() as nested:
+                self.assertIs(nested, outbox)
+                send_message(self._message("Second"))
+        self.assertEqual([entry.status for entry in outbox.entries], [SENT, SENT])
+        self.assertEqual(outbox.connections_opened, 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+        backend = _FlakyBackend(fail_subjects=["Broken", "Broken"])
+        with mail_outbox(connection=backend, rate_per_second=0, reconnect_attempts=1):
+            with self.assertRaises(ConnectionResetError), self.assertLogs("openeire_api.mail_outbox", "WARNING"):
+                send_message(self._message("Broken"))
+
+    def test_benchmark_command_reports_both_paths(self):
+        out = StringIO()
+        call_command("benchmark_mail_outbox", "--messages", "6", "--batch-size", "4", stdout=out)
+
+        self.assertIn("per-message: messages=6 connections=6", out.getvalue())
+        self.assertIn("outbox(batch=4): messages=6 connections=2", out.getvalue())
+
+
+class AfterCommitExecutorTests(TestCase):
+    def _executor(self):
+        executor = AfterCommitExecutor("test-background", "TEST_BACKGROUND_WORKERS")
+        self.addCleanup(lambda: executor._executor and executor._executor.shutdown(wait=True))
+        return executor
+
+    @override_settings(TEST_BACKGROUND_WORKERS=0)
+    def test_tasks_run_inline_after_commit_without_workers(self):
+        calls = []
+        executor = self._executor()
+        with self.captureOnCommitCallbacks(execute=True):
+            executor.on_commit(calls.append, "sent")
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, ["sent"])
+        self.assertIsNone(executor._executor)
+
+    @override_settings(TEST_BACKGROUND_WORKERS=0)
+    def test_inline_failures_are_logged_not_raised(self):
+        def fail():
+            raise DatabaseError("claim failed")
+
+        with self.assertLogs("openeire_api.background", "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self._executor().on_commit(fail)
+        self.assertIsNotNone(connection.connection)
+
+    @override_settings(TEST_BACKGROUND_WORKERS=2)
+    def test_tasks_run_on_the_pool_and_failures_are_logged(self):
+        threads = []
+        executor = self._executor()
+
+        def record_thread():
+            threads.append(threading.current_thread().name)
+
+        def fail():
+            raise ValueError("boom")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            executor.on_commit(record_thread)
+        with self.assertLogs("openeire_api.background", "ERROR"):
+            executor.submit(fail)
+            executor._executor.shutdown(wait=True)
+
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith("test-background"))
+        self.assertEqual(executor._executor._max_workers, 2)
+
+    def test_count_setting_clamps_at_zero(self):
+        with override_settings(TEST_BACKGROUND_WORKERS=-3):
+            self.assertEqual(count_setting("TEST_BACKGROUND_WORKERS", 1), 0)
+        with override_settings(TEST_BACKGROUND_WORKERS=None):
+            self.assertEqual(count_setting("TEST_BACKGROUND_WORKERS", 1), 0)
+        self.assertEqual(count_setting("TEST_BACKGROUND_WORKERS", 4), 4)
@@ -1,10 +1,17 @@
 import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
 
 from django.conf import settings
 from django.core.cache import caches
 from django.core.cache.backends.base import InvalidCacheBackendError
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
 from rest_framework import exceptions
-from rest_framework.throttling import ScopedRateThrottle
+from rest_framework.throttling import ScopedRateThrottle, SimpleRateThrottle
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +24,313 @@ except ImportError:  # pragma: no cover - redis may not be installed in some loc
 _THROTTLE_CACHE_EXCEPTIONS = (InvalidCacheBackendError,) + ((RedisError,) if RedisError else ())
 
 
-class SharedScopedRateThrottle(ScopedRateThrottle):
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    retry_after: Optional[float] = None
+    granted: int = 0
+
+
+def sliding_window_decision(state, *, now, limit, window_seconds, units=1):
+    """
+    Sliding-window-counter step shared by every limiter engine.
+
+    ``state`` is ``(window_index, current_count, previous_count)`` or ``None``.
+    The previous fixed window's count is weighted by how much of it still
+    overlaps the sliding window, which keeps memory O(1) per key while
+    staying close to DRF's exact request-log semantics.
+    Up to ``units`` requests are granted at once (for local leases); the
+    decision is allowed when at least one is.
+    Returns ``(decision, new_state)``; ``new_state`` is ``None`` when denied.
+    """
+    window_index, elapsed = divmod(now, window_seconds)
+    window_index = int(window_index)
+    current_count = previous_count = 0
+    if state is not None:
+        stored_index, stored_current, stored_previous = state
+        if stored_index == window_index:
+            current_count, previous_count = stored_current, stored_previous
+        elif stored_index == window_index - 1:
+            previous_count = stored_current
+
+    weight = (window_seconds - elapsed) / window_seconds
+    # The epsilon keeps float rounding from hiding a whole available unit.
+    available = math.floor(limit - previous_count * weight - current_count + 1e-9)
+    if available < 1:
+        if current_count + 1 > limit:
+            # Wait for the next window, then for this window's count to
+            # decay enough as the new "previous" window.
+            retry_after = (window_seconds - elapsed) + window_seconds * (
+                1 - (limit - 1) / max(current_count, 1)
+            )
+        else:
+            # Wait until enough of the previous window has slid out.
+            allowed_weight = (limit - current_count - 1) / previous_count
+            retry_after = max(window_seconds * (1 - allowed_weight) - elapsed, 0.0)
+        return RateLimitDecision(False, retry_after), None
+
+    granted = min(max(int(units), 1), available)
+    return (
+        RateLimitDecision(True, granted=granted),
+        (window_index, current_count + granted, previous_count),
+    )
+
+
+class CacheSlidingWindowLimiter:
+    """
+    Sliding-window counter stored through the Django cache API.
+
+    Used for locmem and other non-Redis caches in development and tests.
+    Updates are serialised with a process-local lock, so it is only atomic
+    within one process; shared deployments should use the Redis engine.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, cache, *, clock=time.time):
+        self.cache = cache
+        self.clock = clock
+
+    def hit(self, key, *, limit, window_seconds, units=1):
+        with self._lock:
+            state = self.cache.get(key)
+            decision, new_state = sliding_window_decision(
+                state,
+                now=self.clock(),
+                limit=limit,
+                window_seconds=window_seconds,
+                units=units,
+            )
+            if new_state is not None:
+                self.cache.set(key, new_state, math.ceil(window_seconds * 2))
+        return decision
+
+
+# KEYS[1] = throttle key, ARGV[1] = window in ms, ARGV[2] = limit,
+# ARGV[3] = units wanted. Returns {granted, retry_after_ms}.
+# Same algorithm as ``sliding_window_decision``, using Redis server time so
+# every app instance agrees on window boundaries.
+SLIDING_WINDOW_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local units = math.max(tonumber(ARGV[3]) or 1, 1)
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window_index = math.floor(now / window)
+local elapsed = now - window_index * window
+
+local stored = redis.call('HMGET', KEYS[1], 'w', 'c', 'p')
+local stored_index = tonumber(stored[1])
+local current = 0
+local previous = 0
+if stored_index == window_index then
+  current = tonumber(stored[2]) or 0
+  previous = tonumber(stored[3]) or 0
+elseif stored_index == window_index - 1 then
+  previous = tonumber(stored[2]) or 0
+end
+
+local weight = (window - elapsed) / window
+local available = math.floor(limit - previous * weight - current + 1e-9)
+if available < 1 then
+  local retry_after
+  if current + 1 > limit then
+    retry_after = (window - elapsed) + window * (1 - (limit - 1) / math.max(current, 1))
+  else
+    local allowed_weight = (limit - current - 1) / previous
+    retry_after = math.max(window * (1 - allowed_weight) - elapsed, 0)
+  end
+  return {0, math.ceil(retry_after)}
+end
+
+local granted = math.min(units, available)
+redis.call('HSET', KEYS[1], 'w', window_index, 'c', current + granted, 'p', previous)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {granted, 0}
+"""
+
+
+class RedisSlidingWindowLimiter:
+    """
+    Sliding-window counter evaluated by one Lua script: a single round-trip
+    and one small hash per key, atomic across every worker and instance.
+    """
+
+    _script_lock = threading.Lock()
+    _script = None
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    @classmethod
+    def _get_script(cls, client):
+        if cls._script is None:
+            with cls._script_lock:
+                if cls._script is None:
+                    cls._script = client.register_script(SLIDING_WINDOW_LUA)
+        return cls._script
+
+    def hit(self, key, *, limit, window_seconds, units=1):
+        redis_key = self.cache.make_and_validate_key(key)
+        client = self.cache._cache.get_client(redis_key, write=True)
+        granted, retry_after_ms = self._get_script(client)(
+            keys=[redis_key],
+            args=[max(int(window_seconds * 1000), 1), int(limit), max(int(units), 1)],
+            client=client,
+        )
+        if int(granted) > 0:
+            return RateLimitDecision(True, granted=int(granted))
+        return RateLimitDecision(False, int(retry_after_ms) / 1000)
+
+
+THROTTLE_LIMITER_BACKENDS = {
+    "cache": CacheSlidingWindowLimiter,
+    "redis": RedisSlidingWindowLimiter,
+}
+
+
+def get_rate_limiter(cache):
+    backend = str(getattr(settings, "THROTTLE_LIMITER_BACKEND", "auto") or "auto").strip().lower()
+    if backend == "auto":
+        backend = "redis" if isinstance(cache, RedisCache) else "cache"
+    try:
+        limiter_class = THROTTLE_LIMITER_BACKENDS[backend]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Unknown THROTTLE_LIMITER_BACKEND {backend!r}; expected 'auto', 'redis' or 'cache'."
+        )
+    return limiter_class(cache)
+
+
+@dataclass
+class _LocalLease:
+    remaining: int
+    expires_at: float
+    denied_until: float = 0.0
+
+
+class LocalLeaseAdmission:
+    """
+    In-process pre-admission tier in front of a shared limiter engine.
+
+    A worker leases a slice of a key's budget (several units in one limiter
+    call) and then admits requests locally until the slice is spent or the
+    lease expires; denials are remembered locally until their retry time.
+    Units are counted globally when leased, so the shared limit is never
+    exceeded; at worst a worker's unspent units are wasted, which bounds the
+    under-admission by the lease size.
+    """
+
+    def __init__(self, *, clock=time.monotonic, max_keys=10000):
+        self.clock = clock
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._leases = {}
+
+    def admit(self, key, *, limit, window_seconds, lease_size, lease_seconds, limiter):
+        now = self.clock()
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease.expires_at > now:
+                if lease.remaining > 0:
+                    lease.remaining -= 1
+                    return RateLimitDecision(True, granted=1)
+                if lease.denied_until > now:
+                    return RateLimitDecision(False, lease.denied_until - now)
+
+        # The shared limiter is called outside the lock so a slow backend
+        # only delays requests for keys that actually need a new lease.
+        decision = limiter.hit(key, limit=limit, window_seconds=window_seconds, units=lease_size)
+        lease_seconds = min(lease_seconds, window_seconds)
+        with self._lock:
+            if decision.allowed:
+                self._leases[key] = _LocalLease(
+                    remaining=decision.granted - 1,
+                    expires_at=now + lease_seconds,
+                )
+            else:
+                denied_until = now + min(decision.retry_after or 0.0, lease_seconds)
+                self._leases[key] = _LocalLease(
+                    remaining=0,
+                    expires_at=denied_until,
+                    denied_until=denied_until,
+                )
+            if len(self._leases) > self.max_keys:
+                self._prune(now)
+        if decision.allowed:
+            return RateLimitDecision(True, granted=1)
+        return decision
+
+    def _prune(self, now):
+        self._leases = {
+            key: lease for key, lease in self._leases.items() if lease.expires_at > now
+        }
+        if len(self._leases) > self.max_keys:
+            # Dropping a lease only wastes its unspent units.
+            self._leases.clear()
+
+    def clear(self):
+        with self._lock:
+            self._leases.clear()
+
+
+local_lease_admission = LocalLeaseAdmission()
+
+
+def get_local_lease_size(limit):
+    """
+    Units to lease per limiter call for a scope with ``limit`` requests per
+    window, or 0 when the local tier should be bypassed. Leases are capped at
+    a tenth of the limit so low-limit scopes (login, register) stay exact.
+    """
+    lease_size = int(getattr(settings, "THROTTLE_LOCAL_LEASE_SIZE", 0) or 0)
+    lease_size = min(lease_size, int(limit) // 10)
+    return lease_size if lease_size >= 2 else 0
+
+
+class LimiterEngineRateThrottle(SimpleRateThrottle):
+    """
+    ``SimpleRateThrottle`` with the per-request history list replaced by a
+    pluggable O(1) limiter engine (see ``get_rate_limiter``), optionally
+    fronted by ``LocalLeaseAdmission`` (``THROTTLE_LOCAL_LEASE_SIZE``).
+    """
+
+    retry_after = None
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        limiter = get_rate_limiter(self.cache)
+        lease_size = get_local_lease_size(self.num_requests)
+        if lease_size:
+            decision = local_lease_admission.admit(
+                self.key,
+                limit=self.num_requests,
+                window_seconds=self.duration,
+                lease_size=lease_size,
+                lease_seconds=float(getattr(settings, "THROTTLE_LOCAL_LEASE_SECONDS", 1.0)),
+                limiter=limiter,
+            )
+        else:
+            decision = limiter.hit(
+                self.key,
+                limit=self.num_requests,
+                window_seconds=self.duration,
+            )
+        self.retry_after = decision.retry_after
+        return decision.allowed
+
+    def wait(self):
+        return self.retry_after
+
+
+class SharedScopedRateThrottle(ScopedRateThrottle, LimiterEngineRateThrottle):
     """
     Use a dedicated cache alias so throttle state can be shared globally
     (for example via Redis) across workers/instances.
@@ -46,10 +359,3 @@ class SharedScopedRateThrottle(ScopedRateThrottle):
             raise exceptions.Throttled(
                 detail="Rate limiting backend is temporarily unavailable. Please retry shortly."
             )
-
-    def wait(self):
-        try:
-            self.cache = self._resolve_cache()
-            return super().wait()
-        except _THROTTLE_CACHE_EXCEPTIONS:
-            return None
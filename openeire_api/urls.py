@@ -1,20 +1,18 @@
 from django.contrib import admin
-from django.contrib.sitemaps.views import index, sitemap
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from .admin import custom_admin_site
 from .site_paths import get_admin_path
-from .site_views import robots_txt
-from .sitemaps import sitemaps
+from .site_views import robots_txt, sitemap_index, sitemap_section
 from userprofiles.views import GoogleLogin
 
 ADMIN_URL = get_admin_path()
 
 urlpatterns = [
     path('robots.txt', robots_txt, name='robots_txt'),
-    path('sitemap.xml', index, {'sitemaps': sitemaps, 'sitemap_url_name': 'sitemap_section'}, name='sitemap_index'),
-    path('sitemap-<section>.xml', sitemap, {'sitemaps': sitemaps}, name='sitemap_section'),
+    path('sitemap.xml', sitemap_index, name='sitemap_index'),
+    path('sitemap-<section>.xml', sitemap_section, name='sitemap_section'),
     path(ADMIN_URL, custom_admin_site.urls),
     path('accounts/', include('allauth.urls')),
     path('summernote/', include('django_summernote.urls')),
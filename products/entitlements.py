@@ -0,0 +1,129 @@
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+GALLERY_ENTITLEMENT_CACHE_KEY = "gallery-entitlement:v1:{user_id}"
+DEFAULT_GALLERY_ENTITLEMENT_CACHE_SECONDS = 300
+
+
+@dataclass(frozen=True)
+class GalleryEntitlement:
+    """
+    Whether a user may see the digital gallery, and until when.
+
+    ``valid_until`` is ``None`` for open-ended access (``can_access_gallery``)
+    and for users without access.
+    """
+
+    has_access: bool
+    valid_until: Optional[datetime] = None
+
+    def is_current(self, now=None):
+        return self.valid_until is None or self.valid_until > (now or timezone.now())
+
+
+NO_GALLERY_ENTITLEMENT = GalleryEntitlement(False)
+
+
+def _user_id(user_or_id):
+    return getattr(user_or_id, "pk", user_or_id)
+
+
+def gallery_entitlement_cache_key(user_id):
+    return GALLERY_ENTITLEMENT_CACHE_KEY.format(user_id=user_id)
+
+
+def compute_gallery_entitlement(user_id, *, now=None):
+    """Read a user's entitlement from the database in a single query."""
+    from userprofiles.models import UserProfile
+
+    now = now or timezone.now()
+    row = (
+        UserProfile.objects.filter(user_id=user_id)
+        .annotate(
+            grant_expiry=Max(
+                "user__gallery_access_grants__expires_at",
+                filter=Q(user__gallery_access_grants__expires_at__gt=now),
+            )
+        )
+        .values("can_access_gallery", "grant_expiry")
+        .first()
+    )
+    if row is None:
+        return NO_GALLERY_ENTITLEMENT
+    if row["can_access_gallery"]:
+        return GalleryEntitlement(True)
+    if row["grant_expiry"] is not None:
+        return GalleryEntitlement(True, row["grant_expiry"])
+    return NO_GALLERY_ENTITLEMENT
+
+
+def _cache_timeout(entitlement, now):
+    timeout = int(
+        getattr(
+            settings,
+            "GALLERY_ENTITLEMENT_CACHE_SECONDS",
+            DEFAULT_GALLERY_ENTITLEMENT_CACHE_SECONDS,
+        )
+    )
+    if entitlement.valid_until is not None:
+        # Never serve a grant from cache past its expiry.
+        timeout = min(timeout, math.ceil((entitlement.valid_until - now).total_seconds()))
+    return timeout
+
+
+def get_gallery_entitlement(user_or_id):
+    """
+    Return the cached ``GalleryEntitlement`` for a user, computing it on a
+    miss. Cache entries expire no later than the grant they describe and are
+    dropped by ``invalidate_gallery_entitlement`` whenever grants or the
+    profile change; a cache outage falls back to the database.
+    """
+    user_id = _user_id(user_or_id)
+    if user_id is None:
+        return NO_GALLERY_ENTITLEMENT
+
+    now = timezone.now()
+    key = gallery_entitlement_cache_key(user_id)
+    try:
+        cached = cache.get(key)
+    except Exception:
+        logger.warning("Gallery entitlement cache unavailable; reading from the database.", exc_info=True)
+        return compute_gallery_entitlement(user_id, now=now)
+
+    if cached is not None:
+        entitlement = GalleryEntitlement(*cached)
+        if entitlement.is_current(now):
+            return entitlement
+
+    entitlement = compute_gallery_entitlement(user_id, now=now)
+    timeout = _cache_timeout(entitlement, now)
+    if timeout > 0:
+        try:
+            cache.set(key, (entitlement.has_access, entitlement.valid_until), timeout)
+        except Exception:
+            logger.warning("Could not cache gallery entitlement for user %s.", user_id, exc_info=True)
+    return entitlement
+
+
+def invalidate_gallery_entitlement(*user_or_ids):
+    keys = [
+        gallery_entitlement_cache_key(user_id)
+        for user_id in {_user_id(value) for value in user_or_ids}
+        if user_id is not None
+    ]
+    if not keys:
+        return
+    try:
+        cache.delete_many(keys)
+    except Exception:
+        logger.warning("Could not invalidate gallery entitlement cache.", exc_info=True)
@@ -11,6 +11,7 @@ from django.utils import timezone
 from .models import LicenceDocument, LicenceDeliveryToken, LicenceOffer
 from .file_access import get_asset_file_name, open_asset_file
 from .pdf_generator import generate_licence_schedule_pdf, generate_licence_certificate_pdf
+from openeire_api.mail_outbox import send_message
 from openeire_api.mail_utils import get_licensing_from_email as get_branded_licensing_from_email
 
 
@@ -295,7 +296,7 @@ def send_licence_delivery_email(license_request, documents, download_url, token_
         with doc.file.open("rb") as handle:
             email.attach(filename, handle.read(), "application/pdf")
 
-    email.send(fail_silently=False)
+    send_message(email)
 
 
 def send_licence_quote_email(license_request):
@@ -312,7 +313,7 @@ def send_licence_quote_email(license_request):
         from_email=get_licensing_from_email(),
         to=[license_request.email],
     )
-    email.send(fail_silently=False)
+    send_message(email)
     return body
 
 
@@ -327,7 +328,7 @@ def send_licence_negotiation_email(license_request):
         from_email=get_licensing_from_email(),
         to=[license_request.email],
     )
-    email.send(fail_silently=False)
+    send_message(email)
     return body
 
 
@@ -398,5 +399,5 @@ def send_licence_admin_notification_email(license_request):
         from_email=get_licensing_from_email(),
         to=recipients,
     )
-    email.send(fail_silently=False)
+    send_message(email)
     return True
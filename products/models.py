@@ -7,10 +7,10 @@ from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from datetime import timedelta
-from django.db import models
+from django.db import models, transaction
 from django.db.models import F, Q
 from django.db.models.functions import Lower
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -19,6 +19,9 @@ from django.core.files.storage import default_storage
 from django.utils.html import strip_tags
 from django.conf import settings
 
+from openeire_api.sitemap_cache import invalidate_sitemaps
+
+from .entitlements import invalidate_gallery_entitlement
 from .storage import PrivateAssetStorage
 
 AI_DRAFT_MAX_CHARS = 8000
@@ -75,6 +78,13 @@ class GalleryAccess(models.Model):
             self.expires_at = timezone.now() + timedelta(days=30)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so a reassigned grant also refreshes the previous owner.
+        instance._loaded_granted_user_id = instance.__dict__.get("granted_user_id")
+        return instance
+
     def grant_to_user(self, user):
         self.granted_user = user
         self.verified_at = timezone.now()
@@ -811,6 +821,16 @@ class ProductReview(models.Model):
         return f'Review by {self.user.username}'
     
 
+@receiver(post_save, sender=GalleryAccess)
+@receiver(post_delete, sender=GalleryAccess)
+def invalidate_gallery_access_entitlement(sender, instance, **kwargs):
+    invalidate_gallery_entitlement(
+        instance.granted_user_id,
+        getattr(instance, "_loaded_granted_user_id", None),
+    )
+    instance._loaded_granted_user_id = instance.granted_user_id
+
+
 @receiver(post_save, sender=Photo)
 def generate_variants_for_photo(sender, instance, created, **kwargs):
     """
@@ -839,3 +859,18 @@ def generate_variants_for_photo(sender, instance, created, **kwargs):
         
         if variants_to_create:
             ProductVariant.objects.bulk_create(variants_to_create)
+
+
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def invalidate_physical_sitemap(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_sitemaps("physical"))
+
+
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+def invalidate_footage_sitemap(sender, instance, **kwargs):
+    # Preview clips are listed on the static footage page.
+    transaction.on_commit(lambda: invalidate_sitemaps("static"))
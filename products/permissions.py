@@ -3,6 +3,8 @@ import secrets
 from django.conf import settings
 from rest_framework import permissions
 
+from .entitlements import get_gallery_entitlement
+
 logger = logging.getLogger(__name__)
 
 class IsDigitalGalleryAuthorized(permissions.BasePermission):
@@ -16,10 +18,7 @@ class IsDigitalGalleryAuthorized(permissions.BasePermission):
         user = getattr(request, "user", None)
         if not user or not user.is_authenticated:
             return False
-        profile = getattr(user, "userprofile", None)
-        if not profile:
-            return False
-        return bool(profile.has_digital_gallery_access)
+        return get_gallery_entitlement(user).has_access
 
 
 class IsAIWorkerAuthorized(permissions.BasePermission):
@@ -33,3 +33,39 @@ def ensure_personal_download_token(order_item, days=None):
         order_item=order_item,
         expires_at=expires_at,
     )
+
+
+def bulk_ensure_personal_download_tokens(order_items, days=None):
+    """
+    Batch version of ``ensure_personal_download_token``.
+
+    Returns ``{order_item.id: token_or_None}`` using one lookup query and at
+    most one bulk INSERT, whatever the number of items.
+    """
+    days = days or DEFAULT_TOKEN_DAYS
+    now = timezone.now()
+    item_ids = {item.id for item in order_items}
+    if not item_ids:
+        return {}
+
+    tokens = {}
+    items_with_tokens = set()
+    for token in (
+        PersonalDownloadToken.objects.filter(order_item_id__in=item_ids)
+        .order_by("order_item_id", "-expires_at")
+    ):
+        items_with_tokens.add(token.order_item_id)
+        if token.order_item_id not in tokens and token.used_at is None and token.expires_at > now:
+            tokens[token.order_item_id] = token
+
+    expires_at = now + timedelta(days=days)
+    new_tokens = PersonalDownloadToken.objects.bulk_create(
+        [
+            PersonalDownloadToken(order_item_id=item_id, expires_at=expires_at)
+            for item_id in sorted(item_ids - items_with_tokens)
+        ]
+    )
+    for token in new_tokens:
+        tokens[token.order_item_id] = token
+
+    return {item_id: tokens.get(item_id) for item_id in item_ids}
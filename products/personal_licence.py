@@ -109,8 +109,44 @@ def ensure_personal_licence_token(order, days=None):
     return PersonalLicenceToken.objects.create(order=order, expires_at=expires_at)
 
 
-def build_personal_licence_download_url(order, request=None):
-    token_obj = ensure_personal_licence_token(order)
+def bulk_ensure_personal_licence_tokens(orders, days=None):
+    """
+    Batch version of ``ensure_personal_licence_token``: one lookup query and
+    at most one bulk INSERT. Returns ``{order.id: token}``.
+    """
+    if days is None:
+        days = DEFAULT_TOKEN_DAYS
+    now = timezone.now()
+    order_ids = {order.id for order in orders}
+    if not order_ids:
+        return {}
+
+    tokens = {}
+    for token in (
+        PersonalLicenceToken.objects.filter(
+            order_id__in=order_ids,
+            expires_at__gt=now,
+            used_at__isnull=True,
+        )
+        .order_by("order_id", "-expires_at")
+    ):
+        tokens.setdefault(token.order_id, token)
+
+    expires_at = now + timedelta(days=days)
+    new_tokens = PersonalLicenceToken.objects.bulk_create(
+        [
+            PersonalLicenceToken(order_id=order_id, expires_at=expires_at)
+            for order_id in sorted(order_ids - set(tokens))
+        ]
+    )
+    for token in new_tokens:
+        tokens[token.order_id] = token
+    return tokens
+
+
+def build_personal_licence_download_url(order, request=None, token_obj=None):
+    if token_obj is None:
+        token_obj = ensure_personal_licence_token(order)
     path = reverse("personal-licence-download", args=[str(token_obj.token)])
     base_url = getattr(settings, "PERSONAL_DOWNLOAD_BASE_URL", None)
     if base_url:
@@ -44,6 +44,9 @@ class PrivateAssetStorage(Storage):
     def size(self, name):
         return self._select_storage().size(name)
 
+    def listdir(self, path):
+        return self._select_storage().listdir(path)
+
     def url(self, name):
         return self._select_storage().url(name)
 
@@ -1,9 +1,23 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
 from django.core.exceptions import ImproperlyConfigured
 from django.test import SimpleTestCase
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework import exceptions
+from types import SimpleNamespace
 from unittest.mock import patch
 
 from openeire_api.cache_config import build_cache_settings, infer_runtime_env
-from openeire_api.throttling import SharedScopedRateThrottle
+from openeire_api.throttling import (
+    CacheSlidingWindowLimiter,
+    LocalLeaseAdmission,
+    RedisSlidingWindowLimiter,
+    SharedScopedRateThrottle,
+    get_local_lease_size,
+    get_rate_limiter,
+    local_lease_admission,
+    sliding_window_decision,
+)
 
 
 class CacheConfigTests(SimpleTestCase):
@@ -74,3 +88,190 @@ class CacheConfigTests(SimpleTestCase):
             ):
                 with self.assertRaises(ValueError):
                     throttle.allow_request(object(), object())
+
+
+class ThrottleLimiterEngineTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = LocMemCache("throttle-limiter-tests", {"TIMEOUT": None})
+        self.cache.clear()
+        self.now = 1000.0
+        self.limiter = CacheSlidingWindowLimiter(self.cache, clock=lambda: self.now)
+
+    def test_sliding_window_weights_previous_window(self):
+        decision, state = sliding_window_decision(
+            (16, 10, 0),
+            now=1000.0 + 20,
+            limit=10,
+            window_seconds=60,
+        )
+
+        # 60s windows: t=1020 is 0s into window 17, so window 16 still counts fully.
+        self.assertFalse(decision.allowed)
+        self.assertAlmostEqual(decision.retry_after, 6.0)
+        self.assertIsNone(state)
+
+        decision, state = sliding_window_decision(
+            (16, 10, 0),
+            now=1020.0 + 6,
+            limit=10,
+            window_seconds=60,
+        )
+        self.assertTrue(decision.allowed)
+        self.assertEqual(state, (17, 1, 10))
+
+    def test_cache_limiter_denies_over_limit_and_recovers_as_window_slides(self):
+        results = [
+            self.limiter.hit("throttle_login_1", limit=3, window_seconds=60).allowed
+            for _ in range(4)
+        ]
+        self.assertEqual(results, [True, True, True, False])
+
+        denied = self.limiter.hit("throttle_login_1", limit=3, window_seconds=60)
+        self.now += denied.retry_after
+
+        self.assertTrue(self.limiter.hit("throttle_login_1", limit=3, window_seconds=60).allowed)
+        self.assertFalse(self.limiter.hit("throttle_login_1", limit=3, window_seconds=60).allowed)
+        self.assertTrue(self.limiter.hit("throttle_login_2", limit=3, window_seconds=60).allowed)
+
+    def test_auto_backend_picks_engine_from_cache_type(self):
+        redis_cache = RedisCache("redis://127.0.0.1:6379/0", {})
+
+        self.assertIsInstance(get_rate_limiter(redis_cache), RedisSlidingWindowLimiter)
+        self.assertIsInstance(get_rate_limiter(self.cache), CacheSlidingWindowLimiter)
+        with self.settings(THROTTLE_LIMITER_BACKEND="cache"):
+            self.assertIsInstance(get_rate_limiter(redis_cache), CacheSlidingWindowLimiter)
+        with self.settings(THROTTLE_LIMITER_BACKEND="bogus"):
+            with self.assertRaises(ImproperlyConfigured):
+                get_rate_limiter(self.cache)
+
+    def test_redis_limiter_runs_one_script_call_on_prefixed_key(self):
+        calls = []
+
+        class FakeClient:
+            def register_script(self, source):
+                def script(*, keys, args, client):
+                    calls.append((keys, args, client))
+                    return [0, 1500]
+
+                return script
+
+        client = FakeClient()
+        redis_cache = RedisCache("redis://127.0.0.1:6379/0", {"KEY_PREFIX": "openeire-api:test"})
+        self.addCleanup(setattr, RedisSlidingWindowLimiter, "_script", None)
+        RedisSlidingWindowLimiter._script = None
+
+        with patch.object(type(redis_cache._cache), "get_client", return_value=client):
+            decision = RedisSlidingWindowLimiter(redis_cache).hit(
+                "throttle_login_1",
+                limit=10,
+                window_seconds=60,
+            )
+
+        self.assertFalse(decision.allowed)
+        self.assertEqual(decision.retry_after, 1.5)
+        self.assertEqual(
+            calls,
+            [(["openeire-api:test:1:throttle_login_1"], [60000, 10, 1], client)],
+        )
+
+    def test_redis_errors_from_limiter_follow_fail_open_policy(self):
+        throttle = SharedScopedRateThrottle()
+        view = SimpleNamespace(throttle_scope="login")
+        request = SimpleNamespace(user=None, META={"REMOTE_ADDR": "203.0.113.5"})
+
+        with patch.object(
+            CacheSlidingWindowLimiter,
+            "hit",
+            side_effect=RedisConnectionError("redis down"),
+        ):
+            with self.settings(THROTTLE_FAIL_OPEN=True):
+                self.assertTrue(throttle.allow_request(request, view))
+            with self.settings(THROTTLE_FAIL_OPEN=False):
+                with self.assertRaises(exceptions.Throttled):
+                    throttle.allow_request(request, view)
+
+
+class LocalLeaseAdmissionTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = LocMemCache("throttle-lease-tests", {"TIMEOUT": None})
+        self.cache.clear()
+        self.now = 1000.0
+        self.limiter = CacheSlidingWindowLimiter(self.cache, clock=lambda: self.now)
+        self.limiter_calls = []
+        original_hit = self.limiter.hit
+
+        def counting_hit(key, **kwargs):
+            self.limiter_calls.append(kwargs)
+            return original_hit(key, **kwargs)
+
+        self.limiter.hit = counting_hit
+
+    def _worker(self):
+        return LocalLeaseAdmission(clock=lambda: self.now)
+
+    def _admit(self, worker, *, limit=100, lease_size=10):
+        return worker.admit(
+            "throttle_delivery_1",
+            limit=limit,
+            window_seconds=60,
+            lease_size=lease_size,
+            lease_seconds=1.0,
+            limiter=self.limiter,
+        )
+
+    def test_requests_are_admitted_locally_from_a_leased_slice(self):
+        worker = self._worker()
+
+        results = [self._admit(worker).allowed for _ in range(25)]
+
+        self.assertTrue(all(results))
+        self.assertEqual(len(self.limiter_calls), 3)
+        self.assertEqual(self.limiter_calls[0]["units"], 10)
+
+    def test_workers_sharing_a_limiter_never_exceed_the_global_limit(self):
+        workers = [self._worker(), self._worker(), self._worker()]
+
+        admitted = sum(
+            self._admit(workers[index % 3], limit=20, lease_size=4).allowed
+            for index in range(60)
+        )
+
+        self.assertLessEqual(admitted, 20)
+        self.assertGreaterEqual(admitted, 20 - 3 * (4 - 1))
+
+    def test_denials_are_remembered_until_the_lease_expires(self):
+        worker = self._worker()
+        for _ in range(20):
+            self._admit(worker, limit=20, lease_size=5)
+        calls_before = len(self.limiter_calls)
+
+        denied = [self._admit(worker, limit=20, lease_size=5) for _ in range(10)]
+
+        self.assertFalse(any(decision.allowed for decision in denied))
+        self.assertEqual(len(self.limiter_calls), calls_before + 1)
+        self.now += 1.5
+        self._admit(worker, limit=20, lease_size=5)
+        self.assertEqual(len(self.limiter_calls), calls_before + 2)
+
+    def test_lease_size_is_capped_for_low_limit_scopes(self):
+        with self.settings(THROTTLE_LOCAL_LEASE_SIZE=10):
+            self.assertEqual(get_local_lease_size(300), 10)
+            self.assertEqual(get_local_lease_size(40), 4)
+            self.assertEqual(get_local_lease_size(10), 0)
+        with self.settings(THROTTLE_LOCAL_LEASE_SIZE=0):
+            self.assertEqual(get_local_lease_size(300), 0)
+
+    def test_throttle_uses_local_tier_when_enabled(self):
+        self.addCleanup(local_lease_admission.clear)
+        throttle = SharedScopedRateThrottle()
+        view = SimpleNamespace(throttle_scope="lease_scope")
+        request = SimpleNamespace(user=None, META={"REMOTE_ADDR": "203.0.113.9"})
+        rates = {"lease_scope": "300/minute"}
+
+        with self.settings(THROTTLE_LOCAL_LEASE_SIZE=10), patch.object(
+            SharedScopedRateThrottle, "THROTTLE_RATES", rates
+        ), patch.object(CacheSlidingWindowLimiter, "hit", wraps=self.limiter.hit) as mock_hit:
+            results = [throttle.allow_request(request, view) for _ in range(10)]
+
+        self.assertTrue(all(results))
+        self.assertEqual(mock_hit.call_count, 1)
@@ -14,10 +14,12 @@ from django.contrib.messages.storage.fallback import FallbackStorage
 from django.contrib.sessions.middleware import SessionMiddleware
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.forms.models import model_to_dict
+from django.db import connection
 from django.db.models.signals import post_save
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework.test import APITestCase
 
@@ -28,6 +30,7 @@ from openeire_api.admin import custom_admin_site
 from openeire_api.pdf_markdown import render_markdown_to_flowables
 from openeire_api.test_utils import decode_sender_header
 from .admin import LicenseRequestAdmin, LicenseRequestAdminForm
+from .entitlements import gallery_entitlement_cache_key, get_gallery_entitlement
 from .models import (
     LicenseRequest,
     LicenceOffer,
@@ -2061,6 +2064,74 @@ class LicenseRequestTests(APITestCase):
         other_response = self.client.get(photo_url)
         self.assertEqual(other_response.status_code, 403)
 
+    def test_warm_gallery_entitlement_needs_no_entitlement_queries(self):
+        user = self._create_gallery_user(email="warm-gallery@example.com")
+        self._grant_gallery_access(user)
+        self.client.force_authenticate(user=user)
+        photo_url = reverse("photo_detail", args=[self.photo.id])
+        self.assertEqual(self.client.get(photo_url).status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(photo_url)
+
+        self.assertEqual(response.status_code, 200)
+        entitlement_queries = [
+            query["sql"]
+            for query in queries.captured_queries
+            if "products_galleryaccess" in query["sql"] or "userprofiles_userprofile" in query["sql"]
+        ]
+        self.assertEqual(entitlement_queries, [])
+
+    def test_gallery_entitlement_is_invalidated_by_grant_and_profile_changes(self):
+        user = self._create_gallery_user(email="invalidate-gallery@example.com")
+        self.assertFalse(get_gallery_entitlement(user).has_access)
+
+        access = self._grant_gallery_access(user)
+        self.assertTrue(get_gallery_entitlement(user).has_access)
+
+        access.delete()
+        self.assertFalse(get_gallery_entitlement(user).has_access)
+
+        profile = user.userprofile
+        profile.can_access_gallery = True
+        profile.save()
+        entitlement = get_gallery_entitlement(user)
+        self.assertTrue(entitlement.has_access)
+        self.assertIsNone(entitlement.valid_until)
+
+    def test_reassigning_gallery_grant_invalidates_previous_owner(self):
+        first_user = self._create_gallery_user(email="first-owner@example.com")
+        second_user = self._create_gallery_user(email="second-owner@example.com")
+        access = self._grant_gallery_access(first_user)
+        self.assertTrue(get_gallery_entitlement(first_user).has_access)
+
+        GalleryAccess.objects.get(pk=access.pk).grant_to_user(second_user)
+
+        self.assertFalse(get_gallery_entitlement(first_user).has_access)
+        self.assertTrue(get_gallery_entitlement(second_user).has_access)
+
+    def test_gallery_entitlement_cache_timeout_is_capped_at_grant_expiry(self):
+        user = self._create_gallery_user(email="expiring-gallery@example.com")
+        access = self._grant_gallery_access(
+            user, expires_at=timezone.now() + timedelta(seconds=30)
+        )
+
+        with patch("products.entitlements.cache.set", wraps=cache.set) as mock_set:
+            entitlement = get_gallery_entitlement(user)
+
+        self.assertEqual(entitlement.valid_until, access.expires_at)
+        self.assertLessEqual(mock_set.call_args.args[2], 30)
+
+    def test_expired_cached_gallery_entitlement_is_recomputed(self):
+        user = self._create_gallery_user(email="stale-gallery@example.com")
+        cache.set(
+            gallery_entitlement_cache_key(user.pk),
+            (True, timezone.now() - timedelta(seconds=1)),
+            60,
+        )
+
+        self.assertFalse(get_gallery_entitlement(user).has_access)
+
     def test_anonymous_user_cannot_access_protected_digital_endpoints(self):
         gallery_response = self.client.get(reverse("gallery_list"), {"type": "digital"})
         photo_response = self.client.get(reverse("photo_detail", args=[self.photo.id]))
@@ -60,6 +60,7 @@ from .serializers import (
     LicenseRequestSerializer,
     AIDraftUpdateSerializer,
 )
+from .entitlements import get_gallery_entitlement
 from .permissions import IsDigitalGalleryAuthorized, IsAIWorkerAuthorized
 
 logger = logging.getLogger(__name__)
@@ -666,9 +667,9 @@ class ShoppingBagRecommendationsView(APIView):
         return ids
 
     def get(self, request):
-        profile = getattr(request.user, "userprofile", None) if request.user.is_authenticated else None
         has_gallery_access = bool(
-            profile and profile.has_digital_gallery_access
+            request.user.is_authenticated
+            and get_gallery_entitlement(request.user).has_access
         )
         active_photos = (
             Photo.objects.filter(is_active=True)
@@ -0,0 +1,205 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, time, timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from openeire_api.background import count_setting
+
+from .models import RealEstateDeliveryAccessEvent, RealEstateDeliveryAccessRollup
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_SECONDS = 5.0
+
+
+def get_buffer_size():
+    """Events held in memory before a batch write; 0 writes each event directly."""
+    return count_setting("REAL_ESTATE_ACCESS_EVENT_BUFFER_SIZE")
+
+
+def get_flush_seconds():
+    return float(getattr(settings, "REAL_ESTATE_ACCESS_EVENT_FLUSH_SECONDS", DEFAULT_FLUSH_SECONDS) or 0)
+
+
+def _rollup_key(event):
+    return (
+        timezone.localdate(event.created_at),
+        event.delivery_id,
+        event.recipient_id,
+        event.event_type,
+    )
+
+
+def add_to_rollups(counts):
+    """
+    Add ``{(day, delivery_id, recipient_id, event_type): count}`` to the daily
+    rollup table. Run inside the transaction that inserted the events.
+    """
+    for (day, delivery_id, recipient_id, event_type), count in counts.items():
+        rows = RealEstateDeliveryAccessRollup.objects.filter(
+            day=day,
+            delivery_id=delivery_id,
+            recipient_id=recipient_id,
+            event_type=event_type,
+        )
+        if rows.update(count=F("count") + count):
+            continue
+        try:
+            with transaction.atomic():
+                RealEstateDeliveryAccessRollup.objects.create(
+                    day=day,
+                    delivery_id=delivery_id,
+                    recipient_id=recipient_id,
+                    event_type=event_type,
+                    count=count,
+                )
+        except IntegrityError:
+            # Another writer created the row first.
+            rows.update(count=F("count") + count)
+
+
+def _insert_events(events):
+    with transaction.atomic():
+        RealEstateDeliveryAccessEvent.objects.bulk_create(events)
+        add_to_rollups(Counter(_rollup_key(event) for event in events))
+
+
+def _insert_event(event):
+    with transaction.atomic():
+        event.save(force_insert=True)
+        add_to_rollups({_rollup_key(event): 1})
+
+
+def write_access_events(events):
+    """
+    Insert a batch of unsaved events and their rollup counts in one
+    transaction. If the batch fails, each event is retried on its own so
+    one bad row cannot lose the rest. Returns the number written.
+    """
+    if not events:
+        return 0
+    try:
+        _insert_events(events)
+        return len(events)
+    except Exception:
+        logger.warning(
+            "Batched write of %s delivery access events failed; inserting them individually.",
+            len(events),
+            exc_info=True,
+        )
+    written = 0
+    for event in events:
+        event.pk = None
+        event._state.adding = True
+        try:
+            _insert_event(event)
+            written += 1
+        except Exception:
+            logger.error(
+                "Could not record %s access event for delivery %s.",
+                event.event_type,
+                event.delivery_id,
+                exc_info=True,
+            )
+    return written
+
+
+class AccessEventBuffer:
+    """
+    Bounded in-process buffer for delivery access events.
+
+    Events are flushed with ``bulk_create`` once ``REAL_ESTATE_ACCESS_EVENT_BUFFER_SIZE``
+    are waiting or ``REAL_ESTATE_ACCESS_EVENT_FLUSH_SECONDS`` after the first
+    one arrived, whichever comes first, and when the process exits. A buffer
+    size of 0 keeps the old behaviour of one insert per event, inside the
+    caller's transaction.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = []
+        self._timer = None
+
+    def add(self, event):
+        size = get_buffer_size()
+        if size <= 0:
+            _insert_event(event)
+            return
+        with self._lock:
+            self._events.append(event)
+            full = len(self._events) >= size
+            if not full and self._timer is None:
+                self._start_timer()
+        if full:
+            self.flush()
+
+    def _start_timer(self):
+        seconds = get_flush_seconds()
+        if seconds <= 0:
+            return
+        self._timer = threading.Timer(seconds, self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread opened its own connection.
+            connection.close()
+
+    def flush(self):
+        """Write every buffered event now. Returns the number written."""
+        with self._lock:
+            events, self._events = self._events, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return write_access_events(events)
+
+    def pending(self):
+        with self._lock:
+            return len(self._events)
+
+
+access_event_buffer = AccessEventBuffer()
+atexit.register(access_event_buffer.flush)
+
+
+def queue_access_event(event):
+    """
+    Hand an unsaved event to the buffer once the caller's transaction
+    commits, so events never outlive a rolled-back request.
+    """
+    if get_buffer_size() <= 0:
+        access_event_buffer.add(event)
+        return
+    transaction.on_commit(partial(access_event_buffer.add, event))
+
+
+def rebuild_access_rollups(day):
+    """
+    Recount one day's rollups from the raw events. Returns the number of
+    rollup rows written.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = start + timedelta(days=1)
+    counts = (
+        RealEstateDeliveryAccessEvent.objects.filter(created_at__gte=start, created_at__lt=end)
+        .values("delivery_id", "recipient_id", "event_type")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    with transaction.atomic():
+        RealEstateDeliveryAccessRollup.objects.filter(day=day).delete()
+        rows = RealEstateDeliveryAccessRollup.objects.bulk_create(
+            [RealEstateDeliveryAccessRollup(day=day, **row) for row in counts]
+        )
+    return len(rows)
@@ -2,11 +2,13 @@ import logging
 
 from django.contrib import admin
 from django.contrib import messages
+from django.contrib.admin.utils import unquote
 from django import forms
 from django.core.exceptions import PermissionDenied, ValidationError
+from django.db.models import Prefetch, Sum
 from django.template.response import TemplateResponse
 from django.utils import timezone
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from django.urls import path, reverse
@@ -15,6 +17,7 @@ import uuid
 
 from openeire_api.admin import custom_admin_site
 from openeire_api.business_identity import get_business_identity
+from openeire_api.mail_outbox import mail_outbox
 
 from .emails import build_realestate_email_context
 from .emails import get_realestate_reply_to_email
@@ -28,10 +31,12 @@ from .models import (
     RealEstateDeliverable,
     RealEstateDelivery,
     RealEstateDeliveryAccessEvent,
+    RealEstateDeliveryAccessRollup,
     RealEstateDeliveryEmailAttempt,
     RealEstateDeliveryOverride,
     RealEstateDeliveryRecipient,
     RealEstateDeliveryUploadSession,
+    RealEstateEnquiryEmail,
     RealEstateInvoice,
     RealEstatePayment,
 )
@@ -43,16 +48,14 @@ from .delivery import (
 )
 from .delivery_emails import send_delivery_recipient_email
 from .delivery_storage import get_max_size
-from .finance import can_release_realestate_delivery, create_realestate_balance_checkout_session, ensure_invoices_for_arrangement, record_realestate_payment, revoke_delivery_override, void_local_realestate_invoice
+from .finance import can_release_realestate_delivery, create_realestate_balance_checkout_session, evaluate_realestate_release, ensure_invoices_for_arrangement, record_realestate_payment, revoke_delivery_override, void_local_realestate_invoice
 from .stripe_invoices import create_stripe_invoice, mark_stripe_invoice_paid_out_of_band, send_stripe_invoice
 from .payments import calculate_realestate_deposit_amounts
 from .payments import prepare_realestate_deposit_checkout_session
 from .package_catalogue import get_included_add_ons
 from .timeline import record_timeline_event
-from .financial_documents import (
-    build_invoice_filename, build_receipt_filename,
-    generate_invoice_pdf, generate_cash_receipt_pdf,
-)
+from .document_cache import open_cash_receipt_pdf, open_invoice_pdf
+from .financial_documents import build_invoice_filename, build_receipt_filename
 
 
 logger = logging.getLogger(__name__)
@@ -110,6 +113,9 @@ class RealEstateTimelineEventInline(admin.TabularInline):
     ordering = ("-created_at",)
     show_change_link = True
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("enquiry", "created_by")
+
 
 class RealEstateInvoiceInline(admin.TabularInline):
     model = RealEstateInvoice
@@ -181,6 +187,9 @@ class RealEstateDeliveryOverrideInline(admin.TabularInline):
     )
     readonly_fields = fields
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("enquiry", "created_by", "revoked_by")
+
     @admin.display(description="State")
     def state_inline(self, obj):
         return "Active" if obj and obj.is_active else "Revoked"
@@ -523,7 +532,8 @@ class RealEstateEnquiryAdmin(admin.ModelAdmin):
     def financial_summary(self, enquiry):
         if not enquiry or not enquiry.pk:
             return "Save the enquiry to create financial records."
-        invoices = list(enquiry.invoices.all())
+        graph = getattr(enquiry, "hub_invoices", None) is not None
+        invoices = enquiry.hub_invoices if graph else list(enquiry.invoices.all())
         total_paid = sum((invoice.amount_paid for invoice in invoices), Decimal("0"))
         required = (
             enquiry.custom_required_total
@@ -543,6 +553,14 @@ class RealEstateEnquiryAdmin(admin.ModelAdmin):
                 f'paid EUR {invoice.amount_paid}; outstanding EUR {invoice.amount_outstanding}; '
                 f'Stripe {invoice.stripe_invoice_status or "not created"}{stripe_link}</li>'
             )
+        if graph:
+            ready = evaluate_realestate_release(
+                enquiry, invoices=enquiry.hub_invoices, overrides=enquiry.hub_overrides
+            )
+            active_override = any(override.revoked_at is None for override in enquiry.hub_overrides)
+        else:
+            ready = can_release_realestate_delivery(enquiry)
+            active_override = enquiry.delivery_overrides.filter(revoked_at__isnull=True).exists()
         guidance = {
             RealEstateEnquiry.PaymentArrangement.DEPOSIT_THEN_BALANCE: "Deposit and balance invoices; deposit is required before confirmation.",
             RealEstateEnquiry.PaymentArrangement.FULL_UPFRONT: "One full invoice; payment is required before confirmation.",
@@ -558,8 +576,8 @@ class RealEstateEnquiryAdmin(admin.ModelAdmin):
             required, total_paid, outstanding,
             "Received" if enquiry.booking_agreement_received else "Pending",
             enquiry.get_status_display(),
-            "Ready" if can_release_realestate_delivery(enquiry) else "Locked",
-            "Active" if enquiry.delivery_overrides.filter(revoked_at__isnull=True).exists() else "None",
+            "Ready" if ready else "Locked",
+            "Active" if active_override else "None",
             guidance, mark_safe("".join(rows)),
         )
 
@@ -586,7 +604,6 @@ class RealEstateEnquiryAdmin(admin.ModelAdmin):
     def _nonvoid_invoices(self, enquiry):
         return list(
             enquiry.invoices.exclude(status=RealEstateInvoice.Status.VOID)
-            .prefetch_related("payments")
             .order_by("created_at")
         )
 
@@ -654,18 +671,58 @@ class RealEstateEnquiryAdmin(admin.ModelAdmin):
             return "Review delivery override", "view-timeline"
         return "Review financial records", "view-invoices"
 
+    def _operations_graph(self, request, object_id):
+        """
+        The enquiry with its portal delivery, invoices and their payments, and
+        overrides: everything the operations hub and financial summary read,
+        in four queries.
+        """
+        return (
+            self.get_queryset(request)
+            .select_related("portal_delivery")
+            .prefetch_related(
+                Prefetch(
+                    "invoices",
+                    queryset=RealEstateInvoice.objects.order_by("created_at").prefetch_related(
+                        Prefetch("payments", queryset=RealEstatePayment.objects.all(), to_attr="hub_payments")
+                    ),
+                    to_attr="hub_invoices",
+                ),
+                Prefetch(
+                    "delivery_overrides",
+                    queryset=RealEstateDeliveryOverride.objects.select_related(
+                        "created_by", "revoked_by"
+                    ).order_by("-created_at"),
+                    to_attr="hub_overrides",
+                ),
+            )
+            .filter(pk=object_id)
+            .first()
+        )
+
     def _build_operations_hub(self, request, enquiry):
         if not enquiry or not enquiry.pk:
             return None
 
-        invoices = self._nonvoid_invoices(enquiry)
-        payments = list(
-            RealEstatePayment.objects.filter(invoice__enquiry=enquiry)
-            .select_related("invoice", "recorded_by")
-            .order_by("-paid_at", "-created_at")
+        if getattr(enquiry, "hub_invoices", None) is None:
+            enquiry = self._operations_graph(request, enquiry.pk)
+        invoices = [
+            invoice for invoice in enquiry.hub_invoices
+            if invoice.status != RealEstateInvoice.Status.VOID
+        ]
+        # Newest first; payments without a paid date go last.
+        payments = sorted(
+            (payment for invoice in enquiry.hub_invoices for payment in invoice.hub_payments),
+            key=lambda payment: (payment.paid_at is not None, payment.paid_at or payment.created_at, payment.created_at),
+            reverse=True,
+        )
+        active_override = next(
+            (override for override in enquiry.hub_overrides if override.revoked_at is None), None
+        )
+        # Computed from the loaded rows, so the hub never shows a stale cached decision.
+        ready = evaluate_realestate_release(
+            enquiry, invoices=enquiry.hub_invoices, overrides=enquiry.hub_overrides
         )
-        active_override = enquiry.delivery_overrides.filter(revoked_at__isnull=True).first()
-        ready = can_release_realestate_delivery(enquiry)
         total_paid = sum((invoice.amount_paid for invoice in invoices), Decimal("0.00"))
         required_total = (
             enquiry.custom_required_total
@@ -809,7 +866,7 @@ class RealEstateEnquiryAdmin(admin.ModelAdmin):
             })
 
         override_rows = []
-        for override in enquiry.delivery_overrides.select_related("created_by", "revoked_by").order_by("-created_at"):
+        for override in enquiry.hub_overrides:
             override_rows.append({
                 "state": "Active" if override.is_active else "Revoked",
                 "reason": override.reason,
@@ -864,14 +921,31 @@ class RealEstateEnquiryAdmin(admin.ModelAdmin):
         ]
         return custom_urls + urls
 
+    def get_object(self, request, object_id, from_field=None):
+        # The change view loads the enquiry graph once for the form, the
+        # financial summary and the operations hub.
+        graph = getattr(request, "_realestate_enquiry_graph", None)
+        if graph is not None and from_field is None and str(graph.pk) == str(object_id):
+            return graph
+        return super().get_object(request, object_id, from_field)
+
     def changeform_view(self, request, object_id=None, form_url="", extra_context=None):
         extra_context = extra_context or {}
         if object_id:
-            enquiry = self.get_object(request, object_id)
+            try:
+                enquiry = self._operations_graph(request, unquote(object_id))
+            except (ValidationError, ValueError):
+                enquiry = None
             if enquiry:
+                request._realestate_enquiry_graph = enquiry
                 extra_context["operations_hub"] = self._build_operations_hub(request, enquiry)
         return super().changeform_view(request, object_id, form_url, extra_context)
 
+    def response_action(self, request, queryset):
+        # Bulk email actions send the whole selection over one SMTP connection.
+        with mail_outbox():
+            return super().response_action(request, queryset)
+
     def _require_change_permission(self, request, enquiry):
         if not self.has_change_permission(request, enquiry):
             raise PermissionDenied("You do not have permission to change this enquiry.")
@@ -1043,7 +1117,7 @@ class RealEstateEnquiryAdmin(admin.ModelAdmin):
                 invoice = self._get_ops_invoice(enquiry, request)
                 if not invoice:
                     raise ValidationError("No invoice is available.")
-                response = HttpResponse(generate_invoice_pdf(invoice), content_type="application/pdf")
+                response = FileResponse(open_invoice_pdf(invoice), content_type="application/pdf")
                 response["Content-Disposition"] = f'attachment; filename="{build_invoice_filename(invoice)}"'
                 return response
 
@@ -1055,7 +1129,7 @@ class RealEstateEnquiryAdmin(admin.ModelAdmin):
                 )
                 if not payment.cash_receipt_number:
                     raise ValidationError("The selected payment has no cash receipt.")
-                response = HttpResponse(generate_cash_receipt_pdf(payment), content_type="application/pdf")
+                response = FileResponse(open_cash_receipt_pdf(payment), content_type="application/pdf")
                 response["Content-Disposition"] = f'attachment; filename="{build_receipt_filename(payment)}"'
                 return response
 
@@ -2001,7 +2075,7 @@ class RealEstateInvoiceAdmin(admin.ModelAdmin):
             self.message_user(request, "Select exactly one invoice.", level=messages.ERROR)
             return None
         invoice = queryset.get()
-        response = HttpResponse(generate_invoice_pdf(invoice), content_type="application/pdf")
+        response = FileResponse(open_invoice_pdf(invoice), content_type="application/pdf")
         response["Content-Disposition"] = f'attachment; filename="{build_invoice_filename(invoice)}"'
         return response
 
@@ -2010,6 +2084,7 @@ class RealEstateInvoiceAdmin(admin.ModelAdmin):
 class RealEstatePaymentAdmin(admin.ModelAdmin):
     list_display = ("enquiry_display", "invoice", "amount", "currency", "method", "status", "reversal_status", "reversed_amount", "paid_at", "remaining_balance", "out_of_band_display", "cash_receipt_number", "recorded_by")
     list_filter = ("method", "status", "reversal_status", "currency", "invoice__enquiry")
+    list_select_related = ("invoice__enquiry", "recorded_by")
     search_fields = ("invoice__invoice_number", "external_reference", "cash_receipt_number", "stripe_checkout_session_id")
     actions = ("download_cash_receipt",)
 
@@ -2034,7 +2109,7 @@ class RealEstatePaymentAdmin(admin.ModelAdmin):
         if not payment.cash_receipt_number:
             self.message_user(request, "The selected payment has no cash receipt.", level=messages.ERROR)
             return None
-        response = HttpResponse(generate_cash_receipt_pdf(payment), content_type="application/pdf")
+        response = FileResponse(open_cash_receipt_pdf(payment), content_type="application/pdf")
         response["Content-Disposition"] = f'attachment; filename="{build_receipt_filename(payment)}"'
         return response
 
@@ -2182,6 +2257,7 @@ class RealEstateDeliveryAdmin(admin.ModelAdmin):
         "created_by",
         "created_at",
         "updated_at",
+        "access_summary",
     )
 
     def save_model(self, request, obj, form, change):
@@ -2189,6 +2265,30 @@ class RealEstateDeliveryAdmin(admin.ModelAdmin):
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
 
+    @admin.display(description="Portal activity")
+    def access_summary(self, delivery):
+        if not delivery or not delivery.pk:
+            return "-"
+        totals = (
+            delivery.access_rollups.values("event_type")
+            .annotate(total=Sum("count"))
+            .order_by("event_type")
+        )
+        labels = dict(RealEstateDeliveryAccessEvent.EventType.choices)
+        summary = "; ".join(
+            f"{labels.get(row['event_type'], row['event_type'])}: {row['total']}"
+            for row in totals
+        )
+        url = (
+            reverse("customadmin:realestate_realestatedeliveryaccessrollup_changelist")
+            + f"?delivery__id__exact={delivery.pk}"
+        )
+        return format_html(
+            '{} <a href="{}">Daily breakdown</a>',
+            summary or "No portal activity recorded.",
+            url,
+        )
+
     def get_urls(self):
         return [
             path(
@@ -2611,10 +2711,28 @@ class RealEstateDeliveryEmailAttemptAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(RealEstateEnquiryEmail, site=custom_admin_site)
+class RealEstateEnquiryEmailAdmin(admin.ModelAdmin):
+    list_display = ("enquiry", "kind", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("kind", "status")
+    list_select_related = ("enquiry",)
+    search_fields = ("enquiry__email", "enquiry__name")
+    readonly_fields = tuple(
+        field.name for field in RealEstateEnquiryEmail._meta.fields
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(RealEstateDeliveryAccessEvent, site=custom_admin_site)
 class RealEstateDeliveryAccessEventAdmin(admin.ModelAdmin):
     list_display = ("event_type", "delivery", "recipient", "deliverable", "created_at")
     list_filter = ("event_type",)
+    list_select_related = ("delivery", "recipient", "deliverable")
     readonly_fields = tuple(
         field.name for field in RealEstateDeliveryAccessEvent._meta.fields
     )
@@ -2626,6 +2744,26 @@ class RealEstateDeliveryAccessEventAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(RealEstateDeliveryAccessRollup, site=custom_admin_site)
+class RealEstateDeliveryAccessRollupAdmin(admin.ModelAdmin):
+    list_display = ("day", "delivery", "recipient", "event_type", "count")
+    list_filter = ("event_type", "day")
+    list_select_related = ("delivery", "recipient")
+    date_hierarchy = "day"
+    readonly_fields = tuple(
+        field.name for field in RealEstateDeliveryAccessRollup._meta.fields
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(RealEstateDeliveryUploadSession, site=custom_admin_site)
 class RealEstateDeliveryUploadSessionAdmin(admin.ModelAdmin):
     list_display = (
@@ -11,8 +11,10 @@ from django.conf import settings
 from django.core import signing
 from django.core.exceptions import ImproperlyConfigured, PermissionDenied, ValidationError
 from django.db import transaction
+from django.db.models import OuterRef, Subquery
 from django.utils import timezone
 
+from .access_events import queue_access_event
 from .finance import can_release_realestate_delivery
 from .models import (
     RealEstateDeliverable,
@@ -283,28 +285,78 @@ def record_access_event(
     for key, value in (metadata or {}).items():
         if key in {"reason", "state", "category", "content_version"}:
             safe_metadata[key] = str(value)[:100]
-    return RealEstateDeliveryAccessEvent.objects.create(
+    event = RealEstateDeliveryAccessEvent(
         delivery=delivery,
         recipient=recipient,
         deliverable=deliverable,
         event_type=event_type,
         metadata=safe_metadata,
     )
+    queue_access_event(event)
+    return event
+
+
+def _portal_deliverables(delivery):
+    """
+    Every live (not deleted) deliverable of a delivery in one query, each
+    annotated with the latest ``updated_at`` across all of the delivery's
+    deliverables, deleted ones included.
+    """
+    latest_change = (
+        RealEstateDeliverable.objects.filter(delivery_id=OuterRef("delivery_id"))
+        .order_by("-updated_at")
+        .values("updated_at")[:1]
+    )
+    return list(
+        delivery.deliverables.filter(deleted_at__isnull=True).annotate(
+            content_updated_at=Subquery(latest_change)
+        )
+    )
+
+
+def _is_available(item, now):
+    return item.is_active and item.available_at is not None and item.available_at <= now
+
+
+def delivery_content_version(recipient, available, content_updated_at):
+    """
+    Version of a recipient's portal page: changes whenever a deliverable is
+    edited, a file becomes available, the delivery changes or the
+    recipient's link is rotated.
+    """
+    delivery = recipient.delivery
+    parts = (
+        delivery.status,
+        delivery.updated_at.isoformat() if delivery.updated_at else "",
+        content_updated_at.isoformat() if content_updated_at else "",
+        ",".join(str(item.public_id) for item in available),
+        str(recipient.token_version),
+        delivery.enquiry.review_link or "",
+    )
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32]
 
 
 def delivery_dto(recipient):
-    decision = evaluate_delivery_access(recipient)
+    """
+    Portal page data for a recipient: the cached access decision plus one
+    deliverables query. Returns ``(decision, dto)``; the decision is the one
+    the page was built from, so a denied request is recorded without
+    evaluating access again. Valid responses carry a ``content_version``
+    the session view uses as its ETag.
+    """
+    decision = evaluate_delivery_access(recipient, require_deliverables=False)
     if not decision.allowed:
-        return {"state": decision.state}
+        return decision, {"state": decision.state}
     now = timezone.now()
-    files = recipient.delivery.deliverables.filter(
-        is_active=True,
-        deleted_at__isnull=True,
-        available_at__isnull=False,
-        available_at__lte=now,
-    )
+    deliverables = _portal_deliverables(recipient.delivery)
+    available = [item for item in deliverables if _is_available(item, now)]
+    if not available:
+        return (
+            DeliveryAccessDecision(False, "empty", "no_active_deliverables"),
+            {"state": "empty"},
+        )
     grouped = {}
-    for item in files:
+    for item in available:
         grouped.setdefault(item.category, []).append(
             {
                 "id": str(item.public_id),
@@ -320,15 +372,11 @@ def delivery_dto(recipient):
             }
         )
     delivery = recipient.delivery
-    has_partial_availability = delivery.deliverables.filter(
-        deleted_at__isnull=True,
-    ).exclude(
-        is_active=True,
-        available_at__isnull=False,
-        available_at__lte=now,
-    ).exists()
-    return {
+    return decision, {
         "state": "valid",
+        "content_version": delivery_content_version(
+            recipient, available, deliverables[0].content_updated_at
+        ),
         "delivery": {
             "title": delivery.public_title,
             "available_from": delivery.available_from.isoformat(),
@@ -336,7 +384,7 @@ def delivery_dto(recipient):
             "licence_summary": delivery.licence_summary,
             "download_instructions": delivery.download_instructions,
             "review_url": delivery.enquiry.review_link,
-            "partial_availability": has_partial_availability,
+            "partial_availability": len(available) < len(deliverables),
             "groups": [
                 {"category": category, "files": items}
                 for category, items in grouped.items()
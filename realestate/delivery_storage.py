@@ -25,6 +25,8 @@ CANONICAL_ZIP_TYPE = "application/zip"
 ZIP_MIME_TYPES = {CANONICAL_ZIP_TYPE, "application/x-zip-compressed"}
 ZIP_FALLBACK_MIME_TYPES = {"", "application/octet-stream"}
 ZIP_CATEGORIES = {"photographs", "archive"}
+# S3/R2 DeleteObjects accepts at most 1000 keys per request.
+DELETE_OBJECTS_BATCH_SIZE = 1000
 GENERATED_OBJECT_NAME_RE = re.compile(r"^[0-9a-f]{32}(?:\.[A-Za-z0-9]{1,10})?$")
 
 
@@ -52,7 +54,7 @@ def get_max_files():
     return value
 
 
-def _validated_prefix():
+def get_delivery_prefix():
     prefix = str(
         getattr(settings, "REAL_ESTATE_DELIVERY_R2_PREFIX", DELIVERY_PREFIX)
     ).strip("/")
@@ -93,7 +95,7 @@ def validate_upload(filename, content_type, file_size, category):
 
 def delivery_object_key(delivery, filename):
     suffix = Path(safe_download_filename(filename)).suffix.lower()
-    prefix = _validated_prefix()
+    prefix = get_delivery_prefix()
     return f"{prefix}/{delivery.pk}/{uuid.uuid4().hex}{suffix}"
 
 
@@ -207,8 +209,9 @@ def download_url(deliverable):
     )
 
 
-def delete_validated_object(object_key):
-    prefix = _validated_prefix()
+def validate_deletable_key(object_key):
+    """Return ``object_key`` if it is a generated key under the delivery prefix."""
+    prefix = get_delivery_prefix()
     expected = f"{prefix}/"
     supplied = str(object_key or "")
     relative = supplied.removeprefix(expected)
@@ -223,4 +226,43 @@ def delete_validated_object(object_key):
         or not GENERATED_OBJECT_NAME_RE.fullmatch(relative_parts[1])
     ):
         raise ValidationError("Refusing to delete an object outside the delivery prefix.")
-    _client().delete_object(Bucket=_bucket(), Key=supplied)
+    return supplied
+
+
+def delete_validated_object(object_key):
+    _client().delete_object(Bucket=_bucket(), Key=validate_deletable_key(object_key))
+
+
+def delete_validated_objects(object_keys):
+    """
+    Delete many objects with ``DeleteObjects``, at most
+    ``DELETE_OBJECTS_BATCH_SIZE`` keys per call. Keys that fail validation are
+    never sent. Returns ``(deleted_keys, failures)`` where ``failures`` maps
+    each key that was not deleted to a short error code.
+    """
+    deleted, failures, valid = [], {}, []
+    for key in dict.fromkeys(object_keys):
+        try:
+            valid.append(validate_deletable_key(key))
+        except ValidationError:
+            failures[key] = "InvalidKey"
+    if not valid:
+        return deleted, failures
+    client = _client()
+    for start in range(0, len(valid), DELETE_OBJECTS_BATCH_SIZE):
+        chunk = valid[start:start + DELETE_OBJECTS_BATCH_SIZE]
+        try:
+            response = client.delete_objects(
+                Bucket=_bucket(),
+                Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True},
+            )
+        except Exception as exc:
+            failures.update((key, exc.__class__.__name__[:100]) for key in chunk)
+            continue
+        errors = {
+            error.get("Key"): str(error.get("Code") or "DeleteFailed")[:100]
+            for error in response.get("Errors", ())
+        }
+        failures.update(errors)
+        deleted.extend(key for key in chunk if key not in errors)
+    return deleted, failures
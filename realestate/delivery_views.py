@@ -72,6 +72,11 @@ def _record_denied_decision(recipient, decision):
     )
 
 
+def _if_none_match(request):
+    header = request.META.get("HTTP_IF_NONE_MATCH", "")
+    return {value.strip().removeprefix("W/") for value in header.split(",") if value.strip()}
+
+
 class DeliveryScopedRateThrottle(SharedScopedRateThrottle):
     def get_cache_key(self, request, view):
         raw_identifier = (
@@ -202,16 +207,19 @@ class DeliverySessionView(DeliveryInternalView):
             recipient = load_delivery_session(serializer.validated_data["session"])
         except Exception:
             return Response(GENERIC_UNAVAILABLE, status=status.HTTP_404_NOT_FOUND)
-        dto = delivery_dto(recipient)
-        if dto["state"] != "valid":
-            _record_denied_decision(
-                recipient,
-                evaluate_delivery_access(recipient),
-            )
+        decision, dto = delivery_dto(recipient)
+        if not decision.allowed:
+            _record_denied_decision(recipient, decision)
             return Response(dto, status=status.HTTP_423_LOCKED)
         recipient.last_accessed_at = timezone.now()
         recipient.save(update_fields=("last_accessed_at", "updated_at"))
-        return Response(dto)
+        etag = f'"{dto["content_version"]}"'
+        if etag in _if_none_match(request):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(dto)
+        response["ETag"] = etag
+        return response
 
 
 class DeliveryDownloadView(DeliveryInternalView):
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+import posixpath
+from dataclasses import asdict
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+
+from openeire_api.background import AfterCommitExecutor
+from openeire_api.business_identity import get_business_identity
+from products.storage import PrivateAssetStorage
+
+from .financial_documents import (
+    cash_receipt_document,
+    invoice_document,
+    render_financial_pdf,
+)
+from .models import RealEstateInvoice, RealEstatePayment
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_PREFIX = "realestate-documents"
+# Bump when the PDF layout changes so stored renders are not reused.
+RENDER_VERSION = 1
+DEFAULT_RENDER_WORKERS = 1
+
+INVOICE = "invoices"
+CASH_RECEIPT = "receipts"
+
+
+# Background render threads; 0 renders lazily on first download instead.
+render_executor = AfterCommitExecutor(
+    "realestate-documents", "REAL_ESTATE_DOCUMENT_RENDER_WORKERS", DEFAULT_RENDER_WORKERS
+)
+
+
+def _storage():
+    return PrivateAssetStorage()
+
+
+def document_fingerprint(title, rows, notices):
+    """Hash of everything a financial PDF shows, so any change is a new file."""
+    payload = json.dumps(
+        {
+            "version": RENDER_VERSION,
+            "identity": asdict(get_business_identity()),
+            "title": title,
+            "rows": rows,
+            "notices": notices,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def document_key(kind, number, fingerprint):
+    return f"{DOCUMENT_PREFIX}/{kind}/{number}/{fingerprint[:32]}.pdf"
+
+
+def _document(kind, obj):
+    if kind == INVOICE:
+        return obj.invoice_number, invoice_document(obj)
+    return obj.cash_receipt_number, cash_receipt_document(obj)
+
+
+def _cacheable(kind, obj):
+    # Drafts can still change freely; only issued invoices are stored.
+    return kind != INVOICE or obj.status != RealEstateInvoice.Status.DRAFT
+
+
+def _store(storage, key, data):
+    directory = posixpath.dirname(key)
+    saved = storage.save(key, ContentFile(data))
+    if saved != key:
+        # Another render stored the same content first.
+        storage.delete(saved)
+        return
+    # Earlier renders of the same document (before a payment changed its
+    # totals, say) are never served again.
+    try:
+        _dirs, files = storage.listdir(directory)
+    except Exception:
+        return
+    for name in files:
+        stale = f"{directory}/{name}"
+        if stale != key:
+            try:
+                storage.delete(stale)
+            except Exception:
+                logger.warning("Could not delete stale document %s.", stale, exc_info=True)
+
+
+def _open(kind, obj, *, render_only=False):
+    number, (title, rows, notices) = _document(kind, obj)
+    if not _cacheable(kind, obj):
+        return BytesIO(render_financial_pdf(title, rows, notices))
+    storage = _storage()
+    key = document_key(kind, number, document_fingerprint(title, rows, notices))
+    try:
+        if storage.exists(key):
+            return None if render_only else storage.open(key, "rb")
+    except Exception:
+        logger.warning("Document store unavailable; rendering %s.", key, exc_info=True)
+        storage = None
+    data = render_financial_pdf(title, rows, notices)
+    if storage is not None:
+        try:
+            _store(storage, key, data)
+        except Exception:
+            logger.warning("Could not store rendered document %s.", key, exc_info=True)
+    return None if render_only else BytesIO(data)
+
+
+def open_invoice_pdf(invoice):
+    """
+    A readable file with the invoice PDF. Issued invoices are served from
+    private storage when this exact content was rendered before, and rendered
+    and stored otherwise.
+    """
+    return _open(INVOICE, invoice)
+
+
+def open_cash_receipt_pdf(payment):
+    """A readable file with the cash receipt PDF, stored like invoices."""
+    return _open(CASH_RECEIPT, payment)
+
+
+def render_document(kind, pk):
+    """Render and store one document ahead of its first download."""
+    if kind == INVOICE:
+        obj = RealEstateInvoice.objects.select_related("enquiry").filter(pk=pk).first()
+    else:
+        obj = RealEstatePayment.objects.select_related("invoice").filter(pk=pk).first()
+    if obj is None or (kind == CASH_RECEIPT and not obj.cash_receipt_number):
+        return
+    _open(kind, obj, render_only=True)
+
+
+def schedule_document_render(kind, pk):
+    """Pre-render a document in the background once the caller's transaction commits."""
+    if render_executor.workers() <= 0:
+        return
+    render_executor.on_commit(render_document, kind, pk)
@@ -15,6 +15,7 @@ from django.template.loader import render_to_string
 from django.templatetags.static import static
 from django.urls import reverse
 
+from openeire_api.mail_outbox import send_message
 from openeire_api.mail_utils import get_default_from_email
 from .models import RealEstateEnquiry, RealEstateInvoice, RealEstatePayment
 from .turnaround import TURNAROUND_CONTEXT
@@ -300,7 +301,7 @@ def send_templated_email(
             email.attach(*attachment)
         else:
             email.attach(attachment)
-    return email.send(fail_silently=False)
+    return send_message(email)
 
 
 def build_realestate_email_context(enquiry, **overrides):
@@ -472,7 +473,7 @@ def send_realestate_internal_notification_email(enquiry, request=None):
         to=[get_realestate_notification_email()],
         reply_to=[get_realestate_reply_to_email()],
     )
-    email.send(fail_silently=False)
+    send_message(email)
 
 
 def send_realestate_client_confirmation_email(enquiry):
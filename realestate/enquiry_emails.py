@@ -0,0 +1,156 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from openeire_api.background import AfterCommitExecutor
+
+from . import emails
+from .models import RealEstateEnquiryEmail, RealEstateTimelineEvent
+from .timeline import record_timeline_event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEND_WORKERS = 1
+DEFAULT_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = timedelta(minutes=1)
+# A claim older than this belongs to a worker that died mid-send.
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+Kind = RealEstateEnquiryEmail.Kind
+Status = RealEstateEnquiryEmail.Status
+
+TIMELINE = {
+    Kind.INTERNAL_NOTIFICATION: (
+        RealEstateTimelineEvent.EventType.ENQUIRY_NOTIFICATION_SENT,
+        "Internal enquiry notification sent",
+    ),
+    Kind.CLIENT_CONFIRMATION: (
+        RealEstateTimelineEvent.EventType.ENQUIRY_CONFIRMATION_SENT,
+        "Enquiry confirmation sent to client",
+    ),
+}
+
+
+# Background send threads; 0 sends in the request once it commits.
+send_executor = AfterCommitExecutor(
+    "realestate-enquiry-email", "REAL_ESTATE_ENQUIRY_EMAIL_WORKERS", DEFAULT_SEND_WORKERS
+)
+
+
+def get_max_attempts():
+    return max(int(getattr(settings, "REAL_ESTATE_ENQUIRY_EMAIL_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS) or 1), 1)
+
+
+def _due(now):
+    return Q(status=Status.PENDING, next_attempt_at__lte=now) | Q(
+        status=Status.SENDING, claimed_at__lte=now - CLAIM_TIMEOUT
+    )
+
+
+def due_enquiry_emails(now=None):
+    """Pending emails whose retry time has come, and abandoned claims."""
+    now = now or timezone.now()
+    return RealEstateEnquiryEmail.objects.filter(_due(now), attempts__lt=get_max_attempts())
+
+
+def fail_exhausted_claims(now=None):
+    """Give up on abandoned claims that have used every attempt."""
+    now = now or timezone.now()
+    return RealEstateEnquiryEmail.objects.filter(
+        status=Status.SENDING,
+        claimed_at__lte=now - CLAIM_TIMEOUT,
+        attempts__gte=get_max_attempts(),
+    ).update(
+        status=Status.FAILED,
+        failure_code="claim_expired",
+        failure_message="The sending worker stopped before finishing.",
+        updated_at=now,
+    )
+
+
+def _deliver(email):
+    enquiry = email.enquiry
+    if email.kind == Kind.INTERNAL_NOTIFICATION:
+        emails.send_realestate_internal_notification_email(enquiry)
+        return emails.get_realestate_notification_email()
+    emails.send_realestate_client_confirmation_email(enquiry)
+    return enquiry.email
+
+
+def send_enquiry_email(enquiry_id, kind):
+    """
+    Claim and send one enquiry email. The claim is a conditional update, so
+    concurrent senders (the background thread and the management command,
+    say) never send the same email twice. Returns the row, or ``None`` when
+    it is not due.
+    """
+    now = timezone.now()
+    claimed = due_enquiry_emails(now).filter(enquiry_id=enquiry_id, kind=kind).update(
+        status=Status.SENDING,
+        claimed_at=now,
+        attempts=F("attempts") + 1,
+        updated_at=now,
+    )
+    if not claimed:
+        return None
+    email = RealEstateEnquiryEmail.objects.select_related("enquiry").get(
+        enquiry_id=enquiry_id, kind=kind
+    )
+    try:
+        recipient = _deliver(email)
+    except Exception as exc:
+        logger.exception(
+            "Real estate enquiry email failed. enquiry_id=%s kind=%s attempt=%s",
+            enquiry_id,
+            kind,
+            email.attempts,
+        )
+        exhausted = email.attempts >= get_max_attempts()
+        email.status = Status.FAILED if exhausted else Status.PENDING
+        email.next_attempt_at = now + RETRY_BASE_DELAY * 2 ** (email.attempts - 1)
+        email.failure_code = exc.__class__.__name__[:64]
+        email.failure_message = "Email transport failed."
+        email.save(
+            update_fields=("status", "next_attempt_at", "failure_code", "failure_message", "updated_at")
+        )
+        return email
+
+    email.status = Status.SENT
+    email.sent_at = timezone.now()
+    email.failure_code = ""
+    email.failure_message = ""
+    email.save(update_fields=("status", "sent_at", "failure_code", "failure_message", "updated_at"))
+    event_type, title = TIMELINE[email.kind]
+    try:
+        record_timeline_event(
+            email.enquiry,
+            event_type,
+            status=RealEstateTimelineEvent.EventStatus.SENT,
+            title=title,
+            email_template="enquiry_reply" if email.kind == Kind.CLIENT_CONFIRMATION else "",
+            recipient_email=recipient,
+        )
+    except Exception:
+        logger.exception(
+            "Enquiry email was accepted but timeline recording failed. enquiry_id=%s kind=%s",
+            enquiry_id,
+            kind,
+        )
+    return email
+
+
+def queue_enquiry_emails(enquiry):
+    """
+    Record the internal notification and client confirmation as pending in
+    the caller's transaction and send them once it commits. Each
+    (enquiry, kind) pair is recorded and sent at most once.
+    """
+    RealEstateEnquiryEmail.objects.bulk_create(
+        [RealEstateEnquiryEmail(enquiry=enquiry, kind=kind) for kind in Kind.values],
+        ignore_conflicts=True,
+    )
+    for kind in Kind.values:
+        send_executor.on_commit(send_enquiry_email, enquiry.pk, kind)
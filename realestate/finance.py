@@ -1,12 +1,16 @@
 import logging
+import uuid
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime, time
+from functools import partial
 
 import stripe
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from openeire_api.business_identity import get_business_identity
@@ -27,6 +31,17 @@ from .timeline import record_timeline_event
 MONEY = Decimal("0.01")
 logger = logging.getLogger(__name__)
 
+FINANCE_VERSION_CACHE_KEY = "realestate-finance-version:v1:{enquiry_id}"
+RELEASE_CACHE_KEY = "realestate-release:v1:{enquiry_id}:{version}:{arrangement}:{required}"
+DEFAULT_RELEASE_CACHE_SECONDS = 300
+RELEASABLE_INVOICE_STATUSES = (
+    RealEstateInvoice.Status.ISSUED,
+    RealEstateInvoice.Status.PARTIALLY_PAID,
+    RealEstateInvoice.Status.PAID,
+    RealEstateInvoice.Status.OVERDUE,
+)
+FINAL_INVOICE_TYPES = (RealEstateInvoice.InvoiceType.BALANCE, RealEstateInvoice.InvoiceType.FULL)
+
 
 def money(value):
     return Decimal(str(value)).quantize(MONEY, rounding=ROUND_HALF_UP)
@@ -336,6 +351,7 @@ def void_local_realestate_invoice(invoice, *, user=None):
 
         invoice.status = RealEstateInvoice.Status.VOID
         invoice.save(update_fields=("status", "updated_at"))
+        invoice.recalculate_amounts()
         record_timeline_event(
             invoice.enquiry,
             RealEstateTimelineEvent.EventType.NOTE,
@@ -360,6 +376,34 @@ def void_local_realestate_invoice(invoice, *, user=None):
         return invoice, True
 
 
+def find_invoice_amount_drift():
+    """
+    ``[(invoice, actual_paid, actual_outstanding)]`` for invoices whose stored
+    amounts disagree with their payments, computed in one annotated query.
+    """
+    settled = Q(payments__status=RealEstatePayment.Status.SUCCEEDED) & ~Q(
+        payments__reversal_status__in=RealEstatePayment.UNSETTLED_REVERSAL_STATUSES
+    )
+    invoices = RealEstateInvoice.objects.annotate(
+        actual_paid=Coalesce(
+            Sum(
+                F("payments__amount") - F("payments__reversed_amount"),
+                filter=settled,
+                output_field=DecimalField(max_digits=10, decimal_places=2),
+            ),
+            Value(Decimal("0.00")),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+    ).order_by("pk")
+    drift = []
+    for invoice in invoices:
+        paid = money(invoice.actual_paid)
+        outstanding = max(invoice.total - paid, Decimal("0.00"))
+        if paid != invoice.amount_paid or outstanding != invoice.amount_outstanding:
+            drift.append((invoice, paid, outstanding))
+    return drift
+
+
 def _successful_total(invoice):
     return invoice.payments.filter(status=RealEstatePayment.Status.SUCCEEDED).aggregate(
         value=Sum("amount")
@@ -505,25 +549,137 @@ def _refresh_invoice_and_compatibility(invoice, *, paid_at, actor=None, was_rele
         )
 
 
-def can_release_realestate_delivery(enquiry):
-    invoices = enquiry.invoices.exclude(status=RealEstateInvoice.Status.VOID).filter(
-        status__in=(
-            RealEstateInvoice.Status.ISSUED,
-            RealEstateInvoice.Status.PARTIALLY_PAID,
-            RealEstateInvoice.Status.PAID,
-            RealEstateInvoice.Status.OVERDUE,
+def _release_cache_timeout():
+    return int(getattr(settings, "REAL_ESTATE_RELEASE_CACHE_SECONDS", DEFAULT_RELEASE_CACHE_SECONDS))
+
+
+def _set_finance_version(enquiry_id):
+    try:
+        cache.set(
+            FINANCE_VERSION_CACHE_KEY.format(enquiry_id=enquiry_id),
+            uuid.uuid4().hex[:12],
+            _release_cache_timeout() * 2,
         )
-    )
-    has_final_invoice = invoices.filter(
-        invoice_type__in=(RealEstateInvoice.InvoiceType.BALANCE, RealEstateInvoice.InvoiceType.FULL)
-    ).exists()
+    except Exception:
+        logger.warning("Could not bump real-estate finance version for enquiry %s.", enquiry_id, exc_info=True)
+
+
+def bump_realestate_finance_version(enquiry_id):
+    """
+    Retire every cached release decision for an enquiry. Call whenever one
+    of its invoices, payments or delivery overrides changes.
+
+    The version moves now, so the changing transaction never reads a
+    decision cached before it, and again on commit, so a decision other
+    requests cached from the pre-commit rows is dropped too.
+    """
+    if enquiry_id is None:
+        return
+    _set_finance_version(enquiry_id)
+    transaction.on_commit(partial(_set_finance_version, enquiry_id))
+
+
+def _finance_version(enquiry_id):
+    key = FINANCE_VERSION_CACHE_KEY.format(enquiry_id=enquiry_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex[:12], _release_cache_timeout() * 2)
+        version = cache.get(key)
+    return version
+
+
+def _store_release_decision(key, released):
+    try:
+        cache.set(key, released, _release_cache_timeout())
+    except Exception:
+        logger.warning("Could not cache real-estate release decision %s.", key, exc_info=True)
+
+
+def _release_decision(enquiry, facts):
+    has_final_invoice = facts["final_invoice_count"] > 0
     if enquiry.payment_arrangement == RealEstateEnquiry.PaymentArrangement.CUSTOM:
         required = enquiry.custom_required_total or Decimal("0")
-        invoiced = sum((invoice.total for invoice in invoices), Decimal("0"))
-        has_final_invoice = bool(invoices.exists() and invoiced >= required)
-    if has_final_invoice and invoices.exists() and all(invoice.amount_outstanding == 0 for invoice in invoices):
+        invoiced = facts["invoiced_total"] or Decimal("0")
+        has_final_invoice = bool(facts["invoice_count"] and invoiced >= required)
+    if has_final_invoice and facts["invoice_count"] and not facts["unsettled_invoice_count"]:
         return True
-    return enquiry.delivery_overrides.filter(revoked_at__isnull=True).exists()
+    return bool(facts["has_active_override"])
+
+
+def release_facts(invoices, overrides):
+    """The facts ``evaluate_realestate_release`` queries for, from loaded rows."""
+    releasable = [invoice for invoice in invoices if invoice.status in RELEASABLE_INVOICE_STATUSES]
+    return {
+        "invoice_count": len(releasable),
+        "final_invoice_count": sum(
+            1 for invoice in releasable if invoice.invoice_type in FINAL_INVOICE_TYPES
+        ),
+        "unsettled_invoice_count": sum(1 for invoice in releasable if invoice.amount_outstanding != 0),
+        "invoiced_total": sum((invoice.total for invoice in releasable), Decimal("0")) if releasable else None,
+        "has_active_override": any(override.revoked_at is None for override in overrides),
+    }
+
+
+def evaluate_realestate_release(enquiry, *, invoices=None, overrides=None):
+    """
+    Decide whether an enquiry's delivery may be released, in one query, or
+    in memory when every invoice and override of the enquiry is passed in.
+    """
+    if invoices is not None and overrides is not None:
+        return _release_decision(enquiry, release_facts(invoices, overrides))
+    releasable = Q(invoices__status__in=RELEASABLE_INVOICE_STATUSES)
+    facts = (
+        RealEstateEnquiry.objects.filter(pk=enquiry.pk)
+        .annotate(
+            invoice_count=Count("invoices", filter=releasable),
+            final_invoice_count=Count(
+                "invoices", filter=releasable & Q(invoices__invoice_type__in=FINAL_INVOICE_TYPES)
+            ),
+            unsettled_invoice_count=Count(
+                "invoices", filter=releasable & ~Q(invoices__amount_outstanding=0)
+            ),
+            invoiced_total=Sum("invoices__total", filter=releasable),
+            has_active_override=Exists(
+                RealEstateDeliveryOverride.objects.filter(enquiry=OuterRef("pk"), revoked_at__isnull=True)
+            ),
+        )
+        .values(
+            "invoice_count",
+            "final_invoice_count",
+            "unsettled_invoice_count",
+            "invoiced_total",
+            "has_active_override",
+        )
+        .first()
+    )
+    if facts is None:
+        return False
+    return _release_decision(enquiry, facts)
+
+
+def can_release_realestate_delivery(enquiry):
+    """
+    Cached ``evaluate_realestate_release``. Decisions are keyed by the
+    enquiry's finance version and payment arrangement, and are only stored
+    once the reading transaction commits, so rolled-back payments never
+    leak into the cache. A cache outage falls back to the query.
+    """
+    try:
+        key = RELEASE_CACHE_KEY.format(
+            enquiry_id=enquiry.pk,
+            version=_finance_version(enquiry.pk),
+            arrangement=enquiry.payment_arrangement,
+            required=enquiry.custom_required_total,
+        )
+        cached = cache.get(key)
+    except Exception:
+        logger.warning("Real-estate release cache unavailable; evaluating enquiry %s.", enquiry.pk, exc_info=True)
+        return evaluate_realestate_release(enquiry)
+    if cached is not None:
+        return cached
+    released = evaluate_realestate_release(enquiry)
+    transaction.on_commit(partial(_store_release_decision, key, released))
+    return released
 
 
 @transaction.atomic
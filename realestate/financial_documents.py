@@ -1,3 +1,4 @@
+from functools import lru_cache
 from io import BytesIO
 
 from reportlab.lib.pagesizes import A4
@@ -14,13 +15,20 @@ RELEASE_NOTICE = (
 )
 
 
-def _pdf(title, rows, notices):
+@lru_cache(maxsize=1)
+def _styles():
+    # Building the sample stylesheet is a large share of a small render;
+    # these documents only read from it.
+    return getSampleStyleSheet()
+
+
+def render_financial_pdf(title, rows, notices):
     identity = get_business_identity()
     buffer = BytesIO()
     document = SimpleDocTemplate(
         buffer, pagesize=A4, title=title, author=identity.display_name, pageCompression=0
     )
-    styles = getSampleStyleSheet()
+    styles = _styles()
     story = [Paragraph(identity.display_name, styles["Title"])]
     for value in (identity.address, identity.email, identity.phone):
         if value:
@@ -36,7 +44,8 @@ def build_invoice_filename(invoice):
     return f"{invoice.invoice_number}.pdf"
 
 
-def generate_invoice_pdf(invoice):
+def invoice_document(invoice):
+    """The ``(title, rows, notices)`` an invoice PDF is rendered from."""
     enquiry = invoice.enquiry
     deliverables = enquiry.get_preferred_package_summary()
     payment_refs = ", ".join(
@@ -65,14 +74,19 @@ def generate_invoice_pdf(invoice):
     notices = [RELEASE_NOTICE]
     if not invoice.vat_rate:
         notices.insert(0, VAT_NOTICE)
-    return _pdf(f"Invoice {invoice.invoice_number}", rows, notices)
+    return f"Invoice {invoice.invoice_number}", rows, notices
+
+
+def generate_invoice_pdf(invoice):
+    return render_financial_pdf(*invoice_document(invoice))
 
 
 def build_receipt_filename(payment):
     return f"{payment.cash_receipt_number}.pdf"
 
 
-def generate_cash_receipt_pdf(payment):
+def cash_receipt_document(payment):
+    """The ``(title, rows, notices)`` a cash receipt PDF is rendered from."""
     if not payment.cash_receipt_number:
         raise ValueError("Only receipted cash payments can generate a cash receipt.")
     invoice = payment.invoice
@@ -88,4 +102,8 @@ def generate_cash_receipt_pdf(payment):
         ("Remaining balance", f"EUR {invoice.amount_outstanding:.2f}"),
     )
     notices = [VAT_NOTICE] if not invoice.vat_rate else []
-    return _pdf(f"Cash receipt {payment.cash_receipt_number}", rows, notices)
+    return f"Cash receipt {payment.cash_receipt_number}", rows, notices
+
+
+def generate_cash_receipt_pdf(payment):
+    return render_financial_pdf(*cash_receipt_document(payment))
@@ -1,11 +1,18 @@
+import time
 from datetime import timedelta
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
 from django.utils import timezone
 
-from realestate.delivery_storage import abort_upload, delete_validated_object
+from realestate.access_events import write_access_events
+from realestate.delivery_storage import (
+    DELETE_OBJECTS_BATCH_SIZE,
+    abort_upload,
+    delete_validated_objects,
+)
 from realestate.models import (
     RealEstateDeliverable,
     RealEstateDelivery,
@@ -13,6 +20,21 @@ from realestate.models import (
     RealEstateDeliveryUploadSession,
 )
 
+DEFAULT_BATCH_SIZE = 500
+
+
+def _cleanup_event(delivery_id, succeeded, *, deliverable_id=None, reason=""):
+    return RealEstateDeliveryAccessEvent(
+        delivery_id=delivery_id,
+        deliverable_id=deliverable_id,
+        event_type=(
+            RealEstateDeliveryAccessEvent.EventType.CLEANUP_SUCCEEDED
+            if succeeded
+            else RealEstateDeliveryAccessEvent.EventType.CLEANUP_FAILED
+        ),
+        metadata={"reason": reason[:100]} if reason else {},
+    )
+
 
 class Command(BaseCommand):
     help = "Expire portal deliveries and report or perform validated delivery cleanup."
@@ -28,114 +50,195 @@ class Command(BaseCommand):
             type=int,
             default=24,
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=(
+                "Rows loaded and objects deleted per batch "
+                f"(default {DEFAULT_BATCH_SIZE}, at most {DELETE_OBJECTS_BATCH_SIZE})."
+            ),
+        )
+        parser.add_argument(
+            "--max-runtime",
+            type=float,
+            default=0,
+            help="Stop starting new batches after this many seconds (default: no limit).",
+        )
 
     def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if not 1 <= batch_size <= DELETE_OBJECTS_BATCH_SIZE:
+            raise CommandError(f"--batch-size must be between 1 and {DELETE_OBJECTS_BATCH_SIZE}.")
+        self.batch_size = batch_size
+        self.started = time.monotonic()
+        self.max_runtime = max(options["max_runtime"], 0)
+        self.out_of_time = False
+
         execute = options["execute"]
         now = timezone.now()
         grace_days = int(
             getattr(settings, "REAL_ESTATE_DELIVERY_GRACE_DAYS", 60)
         )
+        stale_before = now - timedelta(hours=options["stale_upload_hours"])
         expired = RealEstateDelivery.objects.filter(
             status=RealEstateDelivery.Status.ACTIVE,
             expires_at__lte=now,
         )
         stale = RealEstateDeliveryUploadSession.objects.filter(
             status=RealEstateDeliveryUploadSession.Status.INITIATED,
-            created_at__lte=now - timedelta(hours=options["stale_upload_hours"]),
+            created_at__lte=stale_before,
         )
-        orphan_candidates = RealEstateDeliveryUploadSession.objects.filter(
+        orphaned = RealEstateDeliveryUploadSession.objects.filter(
             status__in=(
                 RealEstateDeliveryUploadSession.Status.COMPLETING,
                 RealEstateDeliveryUploadSession.Status.COMPLETED,
                 RealEstateDeliveryUploadSession.Status.FAILED,
             ),
-            updated_at__lte=now - timedelta(hours=options["stale_upload_hours"]),
-        ).select_related("delivery")
-        orphaned = [
-            session
-            for session in orphan_candidates
-            if not RealEstateDeliverable.objects.filter(
-                object_key=session.object_key
-            ).exists()
-        ]
+            updated_at__lte=stale_before,
+        ).exclude(
+            error_code="cleanup_orphan_removed",
+        ).filter(
+            ~Exists(RealEstateDeliverable.objects.filter(object_key=OuterRef("object_key")))
+        )
         eligible = RealEstateDeliverable.objects.filter(
             deleted_at__isnull=True,
             delivery__expires_at__lte=now - timedelta(days=grace_days),
         ).filter(
             Q(deletion_eligible_at__isnull=True)
             | Q(deletion_eligible_at__lte=now)
+        ).filter(
+            ~Exists(
+                RealEstateDeliverable.objects.filter(
+                    replaces=OuterRef("pk"), deleted_at__isnull=True
+                )
+            )
         )
         self.stdout.write(
             f"{'EXECUTE' if execute else 'DRY RUN'}: "
             f"{expired.count()} deliveries to expire, "
             f"{stale.count()} stale multipart uploads, "
-            f"{len(orphaned)} completed/failed unreferenced uploads, "
+            f"{orphaned.count()} completed/failed unreferenced uploads, "
             f"{eligible.count()} objects eligible for deletion."
         )
         if not execute:
             return
-        expired.update(status=RealEstateDelivery.Status.EXPIRED)
-        for session in stale.iterator():
-            try:
-                abort_upload(session)
-                session.status = session.Status.ABORTED
-                session.aborted_at = now
-                session.save(update_fields=("status", "aborted_at", "updated_at"))
-            except Exception as exc:
-                session.status = session.Status.FAILED
-                session.error_code = "cleanup_abort_failed"
-                session.save(update_fields=("status", "error_code", "updated_at"))
-                raise CommandError(
-                    f"Multipart cleanup failed for session {session.pk}."
-                ) from exc
-        for session in orphaned:
-            try:
+        expired.update(status=RealEstateDelivery.Status.EXPIRED, updated_at=now)
+        failures = self._abort_stale_uploads(stale, now)
+        failures += self._remove_orphaned_uploads(orphaned, now)
+        deleted, object_failures = self._delete_eligible_objects(eligible, now)
+        failures += object_failures
+        self.stdout.write(f"Deleted {deleted} delivery object(s).")
+        if self.out_of_time:
+            self.stdout.write(
+                self.style.WARNING("Stopped at --max-runtime; re-run to continue the sweep.")
+            )
+        if failures:
+            raise CommandError(
+                f"{failures} cleanup operation(s) failed; see the cleanup_failed access events."
+            )
+
+    def _batches(self, queryset, fields):
+        """Walk ``queryset`` by primary key, ``batch_size`` rows at a time."""
+        last_pk = 0
+        while True:
+            if self.max_runtime and time.monotonic() - self.started >= self.max_runtime:
+                self.out_of_time = True
+                return
+            rows = list(
+                queryset.filter(pk__gt=last_pk).order_by("pk").values(
+                    "pk", *fields
+                )[: self.batch_size]
+            )
+            if not rows:
+                return
+            yield rows
+            last_pk = rows[-1]["pk"]
+
+    def _abort_stale_uploads(self, stale, now):
+        failures = 0
+        Status = RealEstateDeliveryUploadSession.Status
+        for rows in self._batches(stale, ("object_key", "upload_id")):
+            aborted, failed = [], []
+            for row in rows:
+                session = RealEstateDeliveryUploadSession(
+                    pk=row["pk"], object_key=row["object_key"], upload_id=row["upload_id"]
+                )
                 try:
                     abort_upload(session)
+                    aborted.append(row["pk"])
                 except Exception:
-                    # A completed multipart upload has no active upload to abort.
-                    pass
-                delete_validated_object(session.object_key)
-                session.status = session.Status.FAILED
-                session.error_code = "cleanup_orphan_removed"
-                session.save(update_fields=("status", "error_code", "updated_at"))
-                RealEstateDeliveryAccessEvent.objects.create(
-                    delivery=session.delivery,
-                    event_type=RealEstateDeliveryAccessEvent.EventType.CLEANUP_SUCCEEDED,
-                    metadata={"reason": "orphan_upload_removed"},
+                    failed.append(row["pk"])
+            with transaction.atomic():
+                RealEstateDeliveryUploadSession.objects.filter(pk__in=aborted).update(
+                    status=Status.ABORTED, aborted_at=now, updated_at=now
                 )
-            except Exception as exc:
-                RealEstateDeliveryAccessEvent.objects.create(
-                    delivery=session.delivery,
-                    event_type=RealEstateDeliveryAccessEvent.EventType.CLEANUP_FAILED,
-                    metadata={"reason": "orphan_upload_cleanup_failed"},
+                RealEstateDeliveryUploadSession.objects.filter(pk__in=failed).update(
+                    status=Status.FAILED, error_code="cleanup_abort_failed", updated_at=now
                 )
-                raise CommandError(
-                    f"Orphan cleanup failed for upload session {session.pk}."
-                ) from exc
-        for deliverable in eligible.select_related("delivery").iterator():
-            if deliverable.replacements.filter(deleted_at__isnull=True).exists():
-                continue
-            try:
-                delete_validated_object(deliverable.object_key)
-                deliverable.deleted_at = now
-                deliverable.is_active = False
-                deliverable.save(
-                    update_fields=("deleted_at", "is_active", "updated_at")
-                )
-                RealEstateDeliveryAccessEvent.objects.create(
-                    delivery=deliverable.delivery,
-                    deliverable=deliverable,
-                    event_type=RealEstateDeliveryAccessEvent.EventType.CLEANUP_SUCCEEDED,
-                    metadata={},
+            failures += len(failed)
+        return failures
+
+    def _remove_orphaned_uploads(self, orphaned, now):
+        failures = 0
+        for rows in self._batches(orphaned, ("delivery_id", "object_key", "upload_id", "status")):
+            for row in rows:
+                # Completed multipart uploads have no active upload to abort.
+                if row["status"] == RealEstateDeliveryUploadSession.Status.COMPLETED:
+                    continue
+                try:
+                    abort_upload(
+                        RealEstateDeliveryUploadSession(
+                            pk=row["pk"], object_key=row["object_key"], upload_id=row["upload_id"]
+                        )
+                    )
+                except Exception:
+                    pass
+            deleted, _failures = delete_validated_objects(row["object_key"] for row in rows)
+            deleted = set(deleted)
+            removed = [row for row in rows if row["object_key"] in deleted]
+            events = [
+                _cleanup_event(
+                    row["delivery_id"],
+                    row["object_key"] in deleted,
+                    reason=(
+                        "orphan_upload_removed"
+                        if row["object_key"] in deleted
+                        else "orphan_upload_cleanup_failed"
+                    ),
                 )
-            except Exception as exc:
-                RealEstateDeliveryAccessEvent.objects.create(
-                    delivery=deliverable.delivery,
-                    deliverable=deliverable,
-                    event_type=RealEstateDeliveryAccessEvent.EventType.CLEANUP_FAILED,
-                    metadata={"reason": exc.__class__.__name__[:100]},
+                for row in rows
+            ]
+            RealEstateDeliveryUploadSession.objects.filter(
+                pk__in=[row["pk"] for row in removed]
+            ).update(
+                status=RealEstateDeliveryUploadSession.Status.FAILED,
+                error_code="cleanup_orphan_removed",
+                updated_at=now,
+            )
+            write_access_events(events)
+            failures += len(rows) - len(removed)
+        return failures
+
+    def _delete_eligible_objects(self, eligible, now):
+        deleted_count = failures = 0
+        for rows in self._batches(eligible, ("delivery_id", "object_key")):
+            deleted, errors = delete_validated_objects(row["object_key"] for row in rows)
+            deleted = set(deleted)
+            events = [
+                _cleanup_event(
+                    row["delivery_id"],
+                    row["object_key"] in deleted,
+                    deliverable_id=row["pk"],
+                    reason=errors.get(row["object_key"], ""),
                 )
-                raise CommandError(
-                    f"Object cleanup failed for deliverable {deliverable.pk}."
-                ) from exc
+                for row in rows
+            ]
+            removed = [row["pk"] for row in rows if row["object_key"] in deleted]
+            RealEstateDeliverable.objects.filter(pk__in=removed).update(
+                deleted_at=now, is_active=False, updated_at=now
+            )
+            write_access_events(events)
+            deleted_count += len(removed)
+            failures += len(rows) - len(removed)
+        return deleted_count, failures
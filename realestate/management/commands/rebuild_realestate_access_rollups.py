@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from realestate.access_events import rebuild_access_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the daily delivery access rollups from the raw access events "
+        "for recent days (today and the days before it)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=2,
+            help="Number of days to rebuild, counting back from today (default 2).",
+        )
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        if days < 1:
+            raise CommandError("--days must be at least 1.")
+        today = timezone.localdate()
+        for offset in range(days):
+            day = today - timedelta(days=offset)
+            rows = rebuild_access_rollups(day)
+            self.stdout.write(f"{day.isoformat()}: {rows} rollup row(s)")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt access rollups for {days} day(s)."))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from openeire_api.mail_outbox import mail_outbox
+from realestate.enquiry_emails import (
+    due_enquiry_emails,
+    fail_exhausted_claims,
+    send_enquiry_email,
+)
+from realestate.models import RealEstateEnquiryEmail
+
+DEFAULT_LIMIT = 200
+
+
+class Command(BaseCommand):
+    help = (
+        "Send enquiry notification emails that are due: retries after a failed "
+        "attempt and emails left pending or half-sent by a crashed worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=DEFAULT_LIMIT,
+            help=f"Send at most this many emails per run (default {DEFAULT_LIMIT}).",
+        )
+
+    def handle(self, *args, **options):
+        if options["limit"] < 1:
+            raise CommandError("--limit must be at least 1.")
+        now = timezone.now()
+        abandoned = fail_exhausted_claims(now)
+        due = list(
+            due_enquiry_emails(now)
+            .order_by("next_attempt_at", "pk")
+            .values_list("enquiry_id", "kind")[: options["limit"]]
+        )
+        sent = failed = 0
+        with mail_outbox():
+            for enquiry_id, kind in due:
+                email = send_enquiry_email(enquiry_id, kind)
+                if email is None:
+                    continue
+                if email.status == RealEstateEnquiryEmail.Status.SENT:
+                    sent += 1
+                else:
+                    failed += 1
+        self.stdout.write(
+            f"Sent {sent} enquiry email(s); {failed} failed; "
+            f"{abandoned} abandoned send(s) marked failed."
+        )
+        if failed:
+            raise CommandError(f"{failed} enquiry email(s) failed; see the logs.")
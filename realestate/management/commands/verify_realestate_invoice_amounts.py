@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from realestate.finance import find_invoice_amount_drift
+from realestate.models import RealEstateInvoice
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare stored invoice amount_paid/amount_outstanding with the "
+        "payment ledger and optionally repair drifted invoices."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Recalculate drifted invoices from their payments.",
+        )
+
+    def handle(self, *args, **options):
+        drift = find_invoice_amount_drift()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("All real-estate invoice amounts match the payment ledger."))
+            return
+
+        for invoice, paid, outstanding in drift:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{invoice.invoice_number}: stored paid={invoice.amount_paid} "
+                    f"outstanding={invoice.amount_outstanding}; ledger paid={paid} "
+                    f"outstanding={outstanding}"
+                )
+            )
+        if not options["fix"]:
+            self.stdout.write(f"{len(drift)} invoice(s) drifted. Re-run with --fix to repair.")
+            return
+
+        for invoice, _paid, _outstanding in drift:
+            with transaction.atomic():
+                RealEstateInvoice.objects.select_for_update().get(pk=invoice.pk).recalculate_amounts()
+        self.stdout.write(self.style.SUCCESS(f"Repaired {len(drift)} invoice(s)."))
@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+UNSETTLED_REVERSAL_STATUSES = ("refunded", "disputed", "chargeback")
+
+
+def populate_invoice_amounts(apps, schema_editor):
+    invoice_model = apps.get_model("realestate", "RealEstateInvoice")
+    payment_model = apps.get_model("realestate", "RealEstatePayment")
+    paid_by_invoice = {}
+    settled = payment_model.objects.filter(status="succeeded").exclude(
+        reversal_status__in=UNSETTLED_REVERSAL_STATUSES
+    )
+    for invoice_id, amount, reversed_amount in settled.values_list(
+        "invoice_id", "amount", "reversed_amount"
+    ):
+        paid_by_invoice[invoice_id] = paid_by_invoice.get(invoice_id, Decimal("0.00")) + max(
+            amount - reversed_amount, Decimal("0.00")
+        )
+    for invoice in invoice_model.objects.only("pk", "total").iterator():
+        paid = paid_by_invoice.get(invoice.pk, Decimal("0.00"))
+        invoice_model.objects.filter(pk=invoice.pk).update(
+            amount_paid=paid,
+            amount_outstanding=max(invoice.total - paid, Decimal("0.00")),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("realestate", "0026_realestatedelivery_public_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="realestateinvoice",
+            name="amount_paid",
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name="realestateinvoice",
+            name="amount_outstanding",
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(
+            populate_invoice_amounts,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,111 @@
+from collections import Counter
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def populate_access_rollups(apps, schema_editor):
+    event_model = apps.get_model("realestate", "RealEstateDeliveryAccessEvent")
+    rollup_model = apps.get_model("realestate", "RealEstateDeliveryAccessRollup")
+    counts = Counter()
+    for delivery_id, recipient_id, event_type, created_at in (
+        event_model.objects.values_list("delivery_id", "recipient_id", "event_type", "created_at")
+        .iterator(chunk_size=2000)
+    ):
+        day = django.utils.timezone.localdate(created_at)
+        counts[(day, delivery_id, recipient_id, event_type)] += 1
+    rollup_model.objects.bulk_create(
+        [
+            rollup_model(
+                day=day,
+                delivery_id=delivery_id,
+                recipient_id=recipient_id,
+                event_type=event_type,
+                count=count,
+            )
+            for (day, delivery_id, recipient_id, event_type), count in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("realestate", "0027_realestateinvoice_stored_amounts"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="realestatedeliveryaccessevent",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="realestatedeliveryaccessevent",
+            index=models.Index(fields=["created_at"], name="re_access_event_created_idx"),
+        ),
+        migrations.CreateModel(
+            name="RealEstateDeliveryAccessRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                (
+                    "event_type",
+                    models.CharField(
+                        choices=[
+                            ("session_accessed", "Page/session accessed"),
+                            ("download_url_issued", "Download URL issued"),
+                            ("access_denied", "Access denied"),
+                            ("expired", "Expired"),
+                            ("revoked", "Revoked"),
+                            ("upload_completed", "Upload completed"),
+                            ("file_replaced", "File replaced"),
+                            ("cleanup_succeeded", "Cleanup succeeded"),
+                            ("cleanup_failed", "Cleanup failed"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "delivery",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="access_rollups",
+                        to="realestate.realestatedelivery",
+                    ),
+                ),
+                (
+                    "recipient",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="access_rollups",
+                        to="realestate.realestatedeliveryrecipient",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("-day", "delivery_id", "event_type"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="realestatedeliveryaccessrollup",
+            constraint=models.UniqueConstraint(
+                fields=("day", "delivery", "recipient", "event_type"),
+                name="uniq_re_access_rollup",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="realestatedeliveryaccessrollup",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("recipient__isnull", True)),
+                fields=("day", "delivery", "event_type"),
+                name="uniq_re_access_rollup_no_recipient",
+            ),
+        ),
+        migrations.RunPython(populate_access_rollups, reverse_code=migrations.RunPython.noop),
+    ]
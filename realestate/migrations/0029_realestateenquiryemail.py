@@ -0,0 +1,45 @@
+# Generated by Django 4.2.17 on 2026-10-19 05:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0028_realestatedeliveryaccessrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='realestatetimelineevent',
+            name='event_type',
+            field=models.CharField(choices=[('enquiry_received', 'Enquiry received'), ('quote_sent', 'Quote sent'), ('booking_agreement_sent', 'Booking agreement sent'), ('booking_agreement_received', 'Booking agreement received'), ('deposit_request_sent', 'Deposit request sent'), ('deposit_paid', 'Deposit paid'), ('confirmation_sent', 'Confirmation sent'), ('weather_reschedule_sent', 'Weather reschedule sent'), ('shoot_scheduled', 'Shoot scheduled'), ('shoot_completed', 'Shoot completed'), ('delivery_sent', 'Delivery sent'), ('follow_up_sent', 'Follow-up sent'), ('thank_you_sent', 'Thank-you sent'), ('review_received', 'Review received'), ('status_changed', 'Status changed'), ('note', 'Note'), ('invoice_issued', 'Invoice issued'), ('payment_recorded', 'Payment recorded'), ('invoice_paid', 'Invoice paid in full'), ('delivery_ready', 'Delivery ready'), ('delivery_released', 'Delivery released'), ('delivery_override_granted', 'Delivery override granted'), ('delivery_override_revoked', 'Delivery override revoked'), ('enquiry_notification_sent', 'Enquiry notification sent'), ('enquiry_confirmation_sent', 'Enquiry confirmation sent')], max_length=50),
+        ),
+        migrations.CreateModel(
+            name='RealEstateEnquiryEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('internal_notification', 'Internal notification'), ('client_confirmation', 'Client confirmation')], max_length=32)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=12)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('failure_code', models.CharField(blank=True, max_length=64)),
+                ('failure_message', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('enquiry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_emails', to='realestate.realestateenquiry')),
+            ],
+            options={
+                'ordering': ('-created_at',),
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='re_enquiry_email_due_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='realestateenquiryemail',
+            constraint=models.UniqueConstraint(fields=('enquiry', 'kind'), name='uniq_re_enquiry_email'),
+        ),
+    ]
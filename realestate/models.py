@@ -1,12 +1,15 @@
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import Q, Sum
-from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+from decimal import Decimal, ROUND_HALF_UP
 import re
 import uuid
 
+from openeire_api.model_mixins import ProtectedFieldsMixin
+
 from .package_catalogue import (
     ADDITIONAL_PHOTOGRAPH_COPY,
     PACKAGE_SUMMARIES,
@@ -495,6 +498,8 @@ class RealEstateTimelineEvent(models.Model):
         DELIVERY_RELEASED = "delivery_released", "Delivery released"
         DELIVERY_OVERRIDE_GRANTED = "delivery_override_granted", "Delivery override granted"
         DELIVERY_OVERRIDE_REVOKED = "delivery_override_revoked", "Delivery override revoked"
+        ENQUIRY_NOTIFICATION_SENT = "enquiry_notification_sent", "Enquiry notification sent"
+        ENQUIRY_CONFIRMATION_SENT = "enquiry_confirmation_sent", "Enquiry confirmation sent"
 
     class EventStatus(models.TextChoices):
         PENDING = "pending", "Pending"
@@ -551,6 +556,52 @@ class RealEstateTimelineEvent(models.Model):
         return f"{self.get_event_type_display()} - {self.enquiry}"
 
 
+class RealEstateEnquiryEmail(models.Model):
+    """
+    One notification email owed for a new enquiry. Rows are written with the
+    enquiry and sent after commit, so a crash before sending leaves them
+    pending for ``send_realestate_enquiry_emails``.
+    """
+
+    class Kind(models.TextChoices):
+        INTERNAL_NOTIFICATION = "internal_notification", "Internal notification"
+        CLIENT_CONFIRMATION = "client_confirmation", "Client confirmation"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENDING = "sending", "Sending"
+        SENT = "sent", "Sent"
+        FAILED = "failed", "Failed"
+
+    enquiry = models.ForeignKey(
+        RealEstateEnquiry,
+        on_delete=models.CASCADE,
+        related_name="notification_emails",
+    )
+    kind = models.CharField(max_length=32, choices=Kind.choices)
+    status = models.CharField(max_length=12, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    failure_code = models.CharField(max_length=64, blank=True)
+    failure_message = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+        constraints = [
+            models.UniqueConstraint(fields=("enquiry", "kind"), name="uniq_re_enquiry_email"),
+        ]
+        indexes = [
+            models.Index(fields=("status", "next_attempt_at"), name="re_enquiry_email_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} for enquiry {self.enquiry_id}"
+
+
 class RealEstateDocumentSequence(models.Model):
     class Kind(models.TextChoices):
         INVOICE = "invoice", "Invoice"
@@ -602,7 +653,7 @@ class RealEstateBookingAgreementSnapshot(models.Model):
         return f"{self.enquiry} booking agreement v{self.template_version}"
 
 
-class RealEstateInvoice(models.Model):
+class RealEstateInvoice(ProtectedFieldsMixin, models.Model):
     class InvoiceType(models.TextChoices):
         DEPOSIT = "deposit", "Deposit"
         BALANCE = "balance", "Balance"
@@ -617,6 +668,8 @@ class RealEstateInvoice(models.Model):
         OVERDUE = "overdue", "Overdue"
         VOID = "void", "Void"
 
+    protected_fields = ("amount_paid", "amount_outstanding")
+
     enquiry = models.ForeignKey(
         RealEstateEnquiry, on_delete=models.PROTECT, related_name="invoices"
     )
@@ -654,6 +707,10 @@ class RealEstateInvoice(models.Model):
     )
     stripe_checkout_session_id = models.CharField(max_length=255, blank=True)
     stripe_checkout_url = models.URLField(max_length=500, blank=True)
+    # Settled payments net of reversals, and what remains of ``total``.
+    # Maintained by recalculate_amounts(); see verify_realestate_invoice_amounts.
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    amount_outstanding = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -675,22 +732,37 @@ class RealEstateInvoice(models.Model):
             ),
         ]
 
-    @property
-    def amount_paid(self):
-        total = Decimal("0.00")
-        for payment in self.payments.filter(status=RealEstatePayment.Status.SUCCEEDED):
-            if payment.reversal_status in {
-                RealEstatePayment.ReversalStatus.REFUNDED,
-                RealEstatePayment.ReversalStatus.DISPUTED,
-                RealEstatePayment.ReversalStatus.CHARGEBACK,
-            }:
-                continue
-            total += max(payment.amount - payment.reversed_amount, Decimal("0.00"))
-        return total
+    def settled_amount_paid(self):
+        """Read the settled total from the payments table in one aggregate query."""
+        value = RealEstatePayment.objects.filter(
+            invoice_id=self.pk,
+            status=RealEstatePayment.Status.SUCCEEDED,
+        ).exclude(
+            reversal_status__in=RealEstatePayment.UNSETTLED_REVERSAL_STATUSES,
+        ).aggregate(
+            value=Sum(
+                F("amount") - F("reversed_amount"),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            )
+        )["value"]
+        return Decimal(str(value or 0)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+    def recalculate_amounts(self):
+        """
+        Recompute and store ``amount_paid``/``amount_outstanding`` from the
+        payments table and retire cached release decisions for the enquiry.
+        Call inside the transaction that changed a payment.
+        """
+        self.amount_paid = self.settled_amount_paid()
+        self.amount_outstanding = max(self.total - self.amount_paid, Decimal("0.00"))
+        RealEstateInvoice.objects.filter(pk=self.pk).update(
+            amount_paid=self.amount_paid,
+            amount_outstanding=self.amount_outstanding,
+        )
+        from .finance import bump_realestate_finance_version
 
-    @property
-    def amount_outstanding(self):
-        return max(self.total - self.amount_paid, Decimal("0.00"))
+        bump_realestate_finance_version(self.enquiry_id)
+        return self.amount_paid, self.amount_outstanding
 
     def save(self, *args, **kwargs):
         if self.pk:
@@ -705,7 +777,16 @@ class RealEstateInvoice(models.Model):
                 if immutable:
                     raise ValidationError(f"Issued invoice fields are immutable: {', '.join(immutable)}")
         self.currency = str(self.currency or "EUR").upper()
-        super().save(*args, **kwargs)
+        if self._state.adding:
+            self.amount_paid = Decimal("0.00")
+            self.amount_outstanding = max(Decimal(str(self.total)), Decimal("0.00"))
+            super().save(*args, **kwargs)
+            return
+        update_fields = kwargs.get("update_fields")
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if update_fields is None or "total" in update_fields:
+                self.recalculate_amounts()
 
     def __str__(self):
         return self.invoice_number
@@ -735,6 +816,13 @@ class RealEstatePayment(models.Model):
         DISPUTED = "disputed", "Disputed"
         CHARGEBACK = "chargeback", "Chargeback"
 
+    # Reversals that take the whole payment out of an invoice's paid total.
+    UNSETTLED_REVERSAL_STATUSES = (
+        ReversalStatus.REFUNDED,
+        ReversalStatus.DISPUTED,
+        ReversalStatus.CHARGEBACK,
+    )
+
     invoice = models.ForeignKey(
         RealEstateInvoice, on_delete=models.PROTECT, related_name="payments"
     )
@@ -796,12 +884,19 @@ class RealEstatePayment(models.Model):
             raise ValidationError("A payment reversal cannot exceed the payment amount.")
         if self.reversal_status == self.ReversalStatus.NONE and self.reversed_amount:
             raise ValidationError("A reversed amount requires a reversal status.")
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Keep the invoice's stored paid/outstanding amounts in the same
+            # transaction as the payment change.
+            self.invoice.recalculate_amounts()
 
     def delete(self, *args, **kwargs):
         if self.status == self.Status.SUCCEEDED:
             raise ValidationError("Successful payments cannot be deleted.")
-        return super().delete(*args, **kwargs)
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self.invoice.recalculate_amounts()
+        return result
 
     def __str__(self):
         return f"{self.get_method_display()} {self.amount} {self.currency}"
@@ -1153,8 +1248,51 @@ class RealEstateDeliveryAccessEvent(models.Model):
     )
     event_type = models.CharField(max_length=32, choices=EventType.choices)
     metadata = models.JSONField(default=dict, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Stamped when the event is recorded, not when a buffered batch is written.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=("created_at",), name="re_access_event_created_idx"),
+        ]
+
+
+class RealEstateDeliveryAccessRollup(models.Model):
+    """Per-day access event counts for a delivery and recipient."""
+
+    day = models.DateField()
+    delivery = models.ForeignKey(
+        RealEstateDelivery,
+        on_delete=models.CASCADE,
+        related_name="access_rollups",
+    )
+    recipient = models.ForeignKey(
+        RealEstateDeliveryRecipient,
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="access_rollups",
+    )
+    event_type = models.CharField(
+        max_length=32, choices=RealEstateDeliveryAccessEvent.EventType.choices
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ("-day", "delivery_id", "event_type")
+        constraints = [
+            models.UniqueConstraint(
+                fields=("day", "delivery", "recipient", "event_type"),
+                name="uniq_re_access_rollup",
+            ),
+            models.UniqueConstraint(
+                fields=("day", "delivery", "event_type"),
+                condition=Q(recipient__isnull=True),
+                name="uniq_re_access_rollup_no_recipient",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.get_event_type_display()}: {self.count}"
 
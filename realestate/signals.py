@@ -1,7 +1,15 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import RealEstateEnquiry, RealEstateTimelineEvent
+from .document_cache import CASH_RECEIPT, INVOICE, schedule_document_render
+from .finance import bump_realestate_finance_version
+from .models import (
+    RealEstateDeliveryOverride,
+    RealEstateEnquiry,
+    RealEstateInvoice,
+    RealEstatePayment,
+    RealEstateTimelineEvent,
+)
 
 
 @receiver(post_save, sender=RealEstateEnquiry)
@@ -23,3 +31,39 @@ def record_completed_shoot_once(sender, instance, **kwargs):
             "created_by": actor,
         },
     )
+
+
+@receiver(post_save, sender=RealEstateEnquiry)
+def start_finance_version(sender, instance, created, raw=False, **kwargs):
+    # Never trust decisions cached for an earlier enquiry with the same id.
+    if created and not raw:
+        bump_realestate_finance_version(instance.pk)
+
+
+@receiver(post_save, sender=RealEstateInvoice)
+@receiver(post_delete, sender=RealEstateInvoice)
+@receiver(post_save, sender=RealEstateDeliveryOverride)
+@receiver(post_delete, sender=RealEstateDeliveryOverride)
+def bump_finance_version_for_enquiry(sender, instance, **kwargs):
+    bump_realestate_finance_version(instance.enquiry_id)
+
+
+@receiver(post_save, sender=RealEstateInvoice)
+def prerender_issued_invoice(sender, instance, raw=False, **kwargs):
+    if not raw and instance.status != RealEstateInvoice.Status.DRAFT:
+        schedule_document_render(INVOICE, instance.pk)
+
+
+@receiver(post_save, sender=RealEstatePayment)
+def prerender_payment_documents(sender, instance, raw=False, **kwargs):
+    # Payments change the invoice's paid and outstanding lines.
+    if raw:
+        return
+    schedule_document_render(INVOICE, instance.invoice_id)
+    if instance.cash_receipt_number:
+        schedule_document_render(CASH_RECEIPT, instance.pk)
+
+
+@receiver(post_delete, sender=RealEstatePayment)
+def prerender_invoice_after_payment_delete(sender, instance, **kwargs):
+    schedule_document_render(INVOICE, instance.invoice_id)
@@ -1,6 +1,7 @@
 from datetime import timedelta
 from decimal import Decimal
 from html.parser import HTMLParser
+from io import StringIO
 from unittest.mock import patch
 
 from django.core import mail
@@ -9,8 +10,10 @@ from django.contrib.auth.models import Permission
 from django.core.cache import caches
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured, ValidationError
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APIClient
@@ -25,11 +28,13 @@ from .delivery import (
     evaluate_delivery_access,
     issue_delivery_session,
     load_delivery_session,
+    record_access_event,
     recipient_secret,
     recipient_secret_matches,
     revoke_recipient_access,
     rotate_recipient_secret,
 )
+from .access_events import access_event_buffer
 from .delivery_serializers import DeliveryUploadStartSerializer
 from .delivery_emails import send_delivery_recipient_email
 from .delivery_storage import (
@@ -44,6 +49,7 @@ from .models import (
     RealEstateDeliverable,
     RealEstateDelivery,
     RealEstateDeliveryAccessEvent,
+    RealEstateDeliveryAccessRollup,
     RealEstateDeliveryEmailAttempt,
     RealEstateDeliveryOverride,
     RealEstateDeliveryRecipient,
@@ -398,7 +404,7 @@ class DeliveryPortalTestCase(TestCase):
         self.assertLessEqual(lifetime, 43_200)
         loaded = load_delivery_session(token)
         self.assertEqual(loaded.pk, self.recipient.pk)
-        payload = delivery_dto(loaded)
+        _decision, payload = delivery_dto(loaded)
         self.assertEqual(payload["state"], "valid")
         self.assertNotIn("object_key", str(payload))
         delivered_file = payload["delivery"]["groups"][0]["files"][0]
@@ -528,6 +534,190 @@ class DeliveryPortalTestCase(TestCase):
         self.assertEqual(response.status_code, 423)
         self.assertEqual(response.data["state"], "unavailable")
 
+    def test_empty_session_records_the_decision_it_was_built_from(self):
+        self.addCleanup(access_event_buffer.flush)
+        session_token, _ = issue_delivery_session(self.recipient)
+        self.file.is_active = False
+        self.file.save(update_fields=("is_active", "updated_at"))
+        with patch(
+            "realestate.delivery.evaluate_delivery_access",
+            wraps=evaluate_delivery_access,
+        ) as evaluate, self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post(
+                reverse("delivery-session"),
+                {"session": session_token},
+                format="json",
+                **self.internal_headers(),
+            )
+        access_event_buffer.flush()
+
+        self.assertEqual(response.status_code, 423)
+        self.assertEqual(response.data["state"], "empty")
+        self.assertEqual(evaluate.call_count, 1)
+        event = RealEstateDeliveryAccessEvent.objects.get(
+            event_type=RealEstateDeliveryAccessEvent.EventType.ACCESS_DENIED
+        )
+        self.assertEqual(
+            event.metadata, {"state": "empty", "reason": "no_active_deliverables"}
+        )
+
+    def test_session_page_data_is_query_bounded_and_honours_etag(self):
+        session_token, _ = issue_delivery_session(self.recipient)
+        recipient = load_delivery_session(session_token)
+        with self.captureOnCommitCallbacks(execute=True):
+            delivery_dto(recipient)
+        with self.assertNumQueries(1):
+            _decision, payload = delivery_dto(recipient)
+        self.assertFalse(payload["delivery"]["partial_availability"])
+
+        client = APIClient()
+        first = client.post(
+            reverse("delivery-session"),
+            {"session": session_token},
+            format="json",
+            **self.internal_headers(),
+        )
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+        self.assertEqual(etag, f'"{first.data["content_version"]}"')
+
+        repeat = client.post(
+            reverse("delivery-session"),
+            {"session": session_token},
+            format="json",
+            HTTP_IF_NONE_MATCH=etag,
+            **self.internal_headers(),
+        )
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat["ETag"], etag)
+
+        self.file.display_name = "Renamed photographs"
+        self.file.save(update_fields=("display_name", "updated_at"))
+        changed = client.post(
+            reverse("delivery-session"),
+            {"session": session_token},
+            format="json",
+            HTTP_IF_NONE_MATCH=etag,
+            **self.internal_headers(),
+        )
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+    def test_content_version_changes_when_link_rotates_or_files_are_pending(self):
+        original = delivery_dto(self.recipient)[1]["content_version"]
+
+        RealEstateDeliverable.objects.create(
+            delivery=self.delivery,
+            category=RealEstateDeliverable.Category.OTHER,
+            display_name="Pending floor plan",
+            original_filename="plan.pdf",
+            object_key="realestate/fictional/pending-plan.pdf",
+            file_size=10,
+            mime_type="application/pdf",
+        )
+        _decision, pending = delivery_dto(self.recipient)
+        self.assertTrue(pending["delivery"]["partial_availability"])
+        self.assertNotEqual(pending["content_version"], original)
+
+        rotate_recipient_secret(self.recipient, actor=self.user)
+        self.recipient.refresh_from_db()
+        self.assertNotEqual(delivery_dto(self.recipient)[1]["content_version"], pending["content_version"])
+
+    @override_settings(
+        REAL_ESTATE_ACCESS_EVENT_BUFFER_SIZE=3,
+        REAL_ESTATE_ACCESS_EVENT_FLUSH_SECONDS=0,
+    )
+    def test_access_events_are_buffered_and_written_in_batches(self):
+        self.addCleanup(access_event_buffer.flush)
+        session_type = RealEstateDeliveryAccessEvent.EventType.SESSION_ACCESSED
+        with self.captureOnCommitCallbacks(execute=True):
+            record_access_event(self.delivery, session_type, recipient=self.recipient)
+            record_access_event(self.delivery, session_type, recipient=self.recipient)
+        self.assertEqual(access_event_buffer.pending(), 2)
+        self.assertFalse(RealEstateDeliveryAccessEvent.objects.exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                record_access_event(self.delivery, session_type, recipient=self.recipient)
+        event_inserts = [
+            query for query in queries.captured_queries
+            if query["sql"].startswith('INSERT INTO "realestate_realestatedeliveryaccessevent"')
+        ]
+        self.assertEqual(len(event_inserts), 1)
+
+        self.assertEqual(access_event_buffer.pending(), 0)
+        self.assertEqual(
+            RealEstateDeliveryAccessEvent.objects.filter(event_type=session_type).count(), 3
+        )
+        rollup = RealEstateDeliveryAccessRollup.objects.get(
+            delivery=self.delivery, recipient=self.recipient, event_type=session_type
+        )
+        self.assertEqual(rollup.day, timezone.localdate())
+        self.assertEqual(rollup.count, 3)
+
+    @override_settings(
+        REAL_ESTATE_ACCESS_EVENT_BUFFER_SIZE=10,
+        REAL_ESTATE_ACCESS_EVENT_FLUSH_SECONDS=0,
+    )
+    def test_failed_batch_falls_back_to_individual_inserts(self):
+        self.addCleanup(access_event_buffer.flush)
+        with self.captureOnCommitCallbacks(execute=True):
+            record_access_event(
+                self.delivery,
+                RealEstateDeliveryAccessEvent.EventType.DOWNLOAD_URL_ISSUED,
+                recipient=self.recipient,
+                deliverable=self.file,
+            )
+            record_access_event(
+                self.delivery,
+                RealEstateDeliveryAccessEvent.EventType.ACCESS_DENIED,
+                recipient=self.recipient,
+                metadata={"reason": "file_unavailable"},
+            )
+
+        with patch.object(
+            RealEstateDeliveryAccessEvent.objects,
+            "bulk_create",
+            side_effect=DatabaseError("batch rejected"),
+        ), self.assertLogs("realestate.access_events", level="WARNING"):
+            written = access_event_buffer.flush()
+
+        self.assertEqual(written, 2)
+        self.assertEqual(RealEstateDeliveryAccessEvent.objects.count(), 2)
+        self.assertEqual(
+            RealEstateDeliveryAccessRollup.objects.filter(delivery=self.delivery).count(), 2
+        )
+
+    def test_access_rollups_can_be_rebuilt_and_are_shown_in_admin(self):
+        for _ in range(2):
+            record_access_event(
+                self.delivery,
+                RealEstateDeliveryAccessEvent.EventType.DOWNLOAD_URL_ISSUED,
+                recipient=self.recipient,
+                deliverable=self.file,
+            )
+        RealEstateDeliveryAccessRollup.objects.update(count=99)
+
+        call_command("rebuild_realestate_access_rollups", "--days", "1", stdout=StringIO())
+
+        rollup = RealEstateDeliveryAccessRollup.objects.get(delivery=self.delivery)
+        self.assertEqual(rollup.count, 2)
+
+        admin_user = get_user_model().objects.create_superuser(
+            "fictional-admin", "admin@example.test", "not-a-real-password"
+        )
+        self.client.force_login(admin_user)
+        change = self.client.get(
+            reverse("customadmin:realestate_realestatedelivery_change", args=(self.delivery.pk,))
+        )
+        self.assertContains(change, "Download URL issued: 2")
+        breakdown = self.client.get(
+            reverse("customadmin:realestate_realestatedeliveryaccessrollup_changelist"),
+            {"delivery__id__exact": self.delivery.pk},
+        )
+        self.assertEqual(breakdown.status_code, 200)
+        self.assertContains(breakdown, "Download URL issued")
+
     def test_independent_multiple_recipient_revocation(self):
         other = RealEstateDeliveryRecipient.objects.create(
             delivery=self.delivery,
@@ -1333,6 +1523,141 @@ class DeliveryPortalTestCase(TestCase):
         self.delivery.refresh_from_db()
         self.assertEqual(self.delivery.status, RealEstateDelivery.Status.ACTIVE)
 
+    def _expire_for_cleanup(self, count):
+        self.file.deleted_at = timezone.now()
+        self.file.save(update_fields=("deleted_at", "updated_at"))
+        RealEstateDelivery.objects.filter(pk=self.delivery.pk).update(
+            expires_at=timezone.now() - timedelta(days=90)
+        )
+        return [
+            RealEstateDeliverable.objects.create(
+                delivery=self.delivery,
+                category=RealEstateDeliverable.Category.PHOTOGRAPHS,
+                display_name=f"Expired file {index}",
+                original_filename=f"expired-{index}.zip",
+                object_key=delivery_object_key(self.delivery, f"expired-{index}.zip"),
+                file_size=1024,
+                mime_type="application/zip",
+            )
+            for index in range(count)
+        ]
+
+    @patch("realestate.delivery_storage._client")
+    def test_cleanup_deletes_objects_in_batched_delete_requests(self, client_factory):
+        client_factory.return_value.delete_objects.return_value = {}
+        files = self._expire_for_cleanup(5)
+        replacement = RealEstateDeliverable.objects.create(
+            delivery=self.delivery,
+            category=RealEstateDeliverable.Category.PHOTOGRAPHS,
+            display_name="Replacement",
+            original_filename="replacement.zip",
+            object_key="real-estate-deliveries/not-yet-eligible.zip",
+            file_size=1024,
+            mime_type="application/zip",
+            replaces=files[0],
+            deletion_eligible_at=timezone.now() + timedelta(days=1),
+        )
+        orphan = RealEstateDeliveryUploadSession.objects.create(
+            delivery=self.delivery,
+            created_by=self.user,
+            original_filename="orphan.zip",
+            display_name="Orphan",
+            category=RealEstateDeliverable.Category.ARCHIVE,
+            object_key=delivery_object_key(self.delivery, "orphan.zip"),
+            upload_id="upload-orphan",
+            expected_size=1024,
+            expected_mime_type="application/zip",
+            part_size=10 * 1024 * 1024,
+            status=RealEstateDeliveryUploadSession.Status.COMPLETED,
+        )
+        RealEstateDeliveryUploadSession.objects.filter(pk=orphan.pk).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+
+        output = StringIO()
+        call_command(
+            "maintain_realestate_deliveries", "--execute", "--batch-size", "2", stdout=output
+        )
+
+        delete_calls = client_factory.return_value.delete_objects.call_args_list
+        self.assertEqual(len(delete_calls), 3)
+        deleted_keys = [
+            item["Key"] for call in delete_calls for item in call.kwargs["Delete"]["Objects"]
+        ]
+        self.assertCountEqual(
+            deleted_keys, [item.object_key for item in files[1:]] + [orphan.object_key]
+        )
+        self.assertIn("Deleted 4 delivery object(s).", output.getvalue())
+        client_factory.return_value.abort_multipart_upload.assert_not_called()
+        self.assertFalse(
+            RealEstateDeliverable.objects.filter(pk__in=[item.pk for item in files[1:]], deleted_at__isnull=True).exists()
+        )
+        files[0].refresh_from_db()
+        replacement.refresh_from_db()
+        self.assertIsNone(files[0].deleted_at)
+        self.assertIsNone(replacement.deleted_at)
+        orphan.refresh_from_db()
+        self.assertEqual(orphan.error_code, "cleanup_orphan_removed")
+        self.assertEqual(
+            RealEstateDeliveryAccessEvent.objects.filter(
+                event_type=RealEstateDeliveryAccessEvent.EventType.CLEANUP_SUCCEEDED
+            ).count(),
+            5,
+        )
+
+        call_command("maintain_realestate_deliveries", "--execute", stdout=StringIO())
+        self.assertEqual(len(client_factory.return_value.delete_objects.call_args_list), 3)
+
+    @patch("realestate.delivery_storage._client")
+    def test_cleanup_records_failed_keys_and_leaves_them_for_the_next_run(self, client_factory):
+        files = self._expire_for_cleanup(2)
+        client_factory.return_value.delete_objects.return_value = {
+            "Errors": [{"Key": files[1].object_key, "Code": "AccessDenied"}]
+        }
+        bad_key = RealEstateDeliverable.objects.create(
+            delivery=self.delivery,
+            category=RealEstateDeliverable.Category.OTHER,
+            display_name="Legacy key",
+            original_filename="legacy.zip",
+            object_key="real-estate-deliveries/1/legacy.zip",
+            file_size=1024,
+            mime_type="application/zip",
+        )
+
+        with self.assertRaisesMessage(CommandError, "2 cleanup operation(s) failed"):
+            call_command("maintain_realestate_deliveries", "--execute", stdout=StringIO())
+
+        sent = client_factory.return_value.delete_objects.call_args.kwargs["Delete"]["Objects"]
+        self.assertNotIn({"Key": bad_key.object_key}, sent)
+        self.assertEqual(
+            list(
+                RealEstateDeliverable.objects.filter(deleted_at__isnull=True)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            ),
+            [files[1].pk, bad_key.pk],
+        )
+        failures = dict(
+            RealEstateDeliveryAccessEvent.objects.filter(
+                event_type=RealEstateDeliveryAccessEvent.EventType.CLEANUP_FAILED
+            ).values_list("deliverable_id", "metadata__reason")
+        )
+        self.assertEqual(failures, {files[1].pk: "AccessDenied", bad_key.pk: "InvalidKey"})
+
+    @patch("realestate.delivery_storage._client")
+    def test_cleanup_stops_starting_batches_after_max_runtime(self, client_factory):
+        self._expire_for_cleanup(2)
+        output = StringIO()
+        with patch(
+            "realestate.management.commands.maintain_realestate_deliveries.time.monotonic",
+            side_effect=[0.0, 100.0, 100.0, 100.0],
+        ):
+            call_command(
+                "maintain_realestate_deliveries", "--execute", "--max-runtime", "30", stdout=output
+            )
+        client_factory.return_value.delete_objects.assert_not_called()
+        self.assertIn("Stopped at --max-runtime", output.getvalue())
+
     @override_settings(REAL_ESTATE_DELIVERY_PORTAL_ENABLED=False)
     def test_global_feature_flag_fails_closed_without_changing_legacy_fields(self):
         decision = evaluate_delivery_access(self.recipient)
@@ -1,6 +1,7 @@
 from decimal import Decimal
 from io import BytesIO, StringIO
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest.mock import Mock, patch
 
 from django.contrib.auth import get_user_model
@@ -8,12 +9,21 @@ from django.contrib.auth.models import Permission
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.core.management import call_command, CommandError
 from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
-from django.db import connection
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
 from django.db.migrations.executor import MigrationExecutor
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
 
+from .document_cache import (
+    CASH_RECEIPT,
+    INVOICE,
+    open_cash_receipt_pdf,
+    open_invoice_pdf,
+    render_document,
+    render_executor,
+)
 from .documents import build_booking_agreement_filename, generate_booking_agreement_pdf
 from .finance import (
     _refresh_invoice_and_compatibility,
@@ -21,6 +31,7 @@ from .finance import (
     create_realestate_balance_checkout_session,
     ensure_standard_realestate_invoices,
     ensure_invoices_for_arrangement,
+    evaluate_realestate_release,
     grant_delivery_override,
     record_realestate_payment,
     revoke_delivery_override,
@@ -459,6 +470,82 @@ class RealEstateFinanceTests(TestCase):
             )
         self.assertEqual(self.deposit.amount_paid, Decimal("0.00"))
 
+    def test_invoice_amounts_are_stored_and_follow_reversals(self):
+        self.assertEqual(self.deposit.amount_outstanding, self.deposit.total)
+        payment, _ = record_realestate_payment(
+            invoice=self.deposit, amount="50", method=RealEstatePayment.Method.BANK_TRANSFER,
+            paid_at=timezone.now(), external_reference="BANK-STORED",
+        )
+        self.deposit.refresh_from_db()
+        self.assertEqual(self.deposit.amount_paid, Decimal("50.00"))
+        self.assertEqual(self.deposit.amount_outstanding, self.deposit.total - Decimal("50.00"))
+
+        payment.reversal_status = RealEstatePayment.ReversalStatus.PARTIALLY_REFUNDED
+        payment.reversed_amount = Decimal("20.00")
+        payment.save(update_fields=("reversal_status", "reversed_amount", "updated_at"))
+        self.deposit.refresh_from_db()
+        self.assertEqual(self.deposit.amount_paid, Decimal("30.00"))
+
+        payment.reversal_status = RealEstatePayment.ReversalStatus.DISPUTED
+        payment.save(update_fields=("reversal_status", "updated_at"))
+        self.deposit.refresh_from_db()
+        self.assertEqual(self.deposit.amount_paid, Decimal("0.00"))
+        self.assertEqual(self.deposit.amount_outstanding, self.deposit.total)
+
+    def test_stale_invoice_save_does_not_overwrite_stored_amounts(self):
+        stale = RealEstateInvoice.objects.get(pk=self.deposit.pk)
+        record_realestate_payment(
+            invoice=self.deposit, amount="25", method=RealEstatePayment.Method.BANK_TRANSFER,
+            paid_at=timezone.now(), external_reference="BANK-STALE",
+        )
+
+        stale.description = "Edited after payment"
+        stale.save()
+
+        stale.refresh_from_db()
+        self.assertEqual(stale.amount_paid, Decimal("25.00"))
+
+    def test_invoice_amount_reads_need_no_queries(self):
+        record_realestate_payment(
+            invoice=self.deposit, amount="10", method=RealEstatePayment.Method.BANK_TRANSFER,
+            paid_at=timezone.now(), external_reference="BANK-READ",
+        )
+        invoices = list(self.enquiry.invoices.order_by("created_at"))
+        model_admin = RealEstateEnquiryAdmin(RealEstateEnquiry, custom_admin_site)
+
+        with self.assertNumQueries(0):
+            next_invoice = model_admin._invoice_for_next_payment(invoices)
+            reason = model_admin._delivery_lock_reason(self.enquiry, invoices, False)
+            totals = [(invoice.amount_paid, invoice.amount_outstanding) for invoice in invoices]
+
+        self.assertEqual(next_invoice.pk, self.deposit.pk)
+        self.assertEqual(reason, "full payment required")
+        self.assertIn((Decimal("10.00"), self.deposit.total - Decimal("10.00")), totals)
+
+    def test_verify_invoice_amounts_command_reports_and_fixes_drift(self):
+        record_realestate_payment(
+            invoice=self.deposit, amount="40", method=RealEstatePayment.Method.BANK_TRANSFER,
+            paid_at=timezone.now(), external_reference="BANK-DRIFT",
+        )
+        RealEstateInvoice.objects.filter(pk=self.deposit.pk).update(
+            amount_paid=Decimal("0.00"), amount_outstanding=self.deposit.total,
+        )
+
+        out = StringIO()
+        call_command("verify_realestate_invoice_amounts", stdout=out)
+        self.assertIn(f"{self.deposit.invoice_number}: stored paid=0.00", out.getvalue())
+        self.assertIn("1 invoice(s) drifted", out.getvalue())
+
+        out = StringIO()
+        call_command("verify_realestate_invoice_amounts", "--fix", stdout=out)
+        self.assertIn("Repaired 1 invoice(s).", out.getvalue())
+        self.deposit.refresh_from_db()
+        self.assertEqual(self.deposit.amount_paid, Decimal("40.00"))
+
+        out = StringIO()
+        call_command("verify_realestate_invoice_amounts", stdout=out)
+        self.assertIn("All real-estate invoice amounts match", out.getvalue())
+
     def test_delivery_requires_full_payment(self):
         record_realestate_payment(
             invoice=self.deposit, amount=self.deposit.total,
@@ -473,6 +560,89 @@ class RealEstateFinanceTests(TestCase):
         )
         self.assertTrue(can_release_realestate_delivery(self.enquiry))
 
+    def _pay_in_full(self):
+        payments = []
+        for invoice in (self.deposit, self.balance):
+            payment, _ = record_realestate_payment(
+                invoice=invoice, amount=invoice.total,
+                method=RealEstatePayment.Method.BANK_TRANSFER, paid_at=timezone.now(),
+                recorded_by=self.staff, external_reference=f"BANK-{invoice.pk}",
+            )
+            payments.append(payment)
+        return payments
+
+    def test_release_decision_is_one_query_and_cached_per_enquiry(self):
+        self._pay_in_full()
+        with self.assertNumQueries(1):
+            self.assertTrue(evaluate_realestate_release(self.enquiry))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(can_release_realestate_delivery(self.enquiry))
+        with self.assertNumQueries(0):
+            self.assertTrue(can_release_realestate_delivery(self.enquiry))
+
+    def test_in_memory_release_matches_the_query(self):
+        def both():
+            invoices = list(self.enquiry.invoices.all())
+            overrides = list(self.enquiry.delivery_overrides.all())
+            with self.assertNumQueries(0):
+                in_memory = evaluate_realestate_release(
+                    self.enquiry, invoices=invoices, overrides=overrides
+                )
+            return in_memory, evaluate_realestate_release(self.enquiry)
+
+        self.assertEqual(both(), (False, False))
+        override = grant_delivery_override(self.enquiry, user=self.staff, reason="Agreed with client")
+        self.assertEqual(both(), (True, True))
+        revoke_delivery_override(override, user=self.staff, reason="Client paid late")
+        self._pay_in_full()
+        self.assertEqual(both(), (True, True))
+
+    def test_cached_release_follows_refunds_disputes_and_overrides(self):
+        deposit_payment, balance_payment = self._pay_in_full()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(can_release_realestate_delivery(self.enquiry))
+
+        balance_payment.reversal_status = RealEstatePayment.ReversalStatus.PARTIALLY_REFUNDED
+        balance_payment.reversed_amount = Decimal("1.00")
+        balance_payment.save(update_fields=("reversal_status", "reversed_amount", "updated_at"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertFalse(can_release_realestate_delivery(self.enquiry))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            override = grant_delivery_override(self.enquiry, user=self.staff, reason="Agreed with client")
+        self.assertTrue(can_release_realestate_delivery(self.enquiry))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            revoke_delivery_override(override, user=self.staff, reason="Client disputed")
+        self.assertFalse(can_release_realestate_delivery(self.enquiry))
+
+        balance_payment.reversal_status = RealEstatePayment.ReversalStatus.NONE
+        balance_payment.reversed_amount = Decimal("0.00")
+        balance_payment.save(update_fields=("reversal_status", "reversed_amount", "updated_at"))
+        deposit_payment.reversal_status = RealEstatePayment.ReversalStatus.DISPUTED
+        deposit_payment.save(update_fields=("reversal_status", "updated_at"))
+        self.assertFalse(can_release_realestate_delivery(self.enquiry))
+
+    def test_release_decision_from_rolled_back_payment_is_not_cached(self):
+        record_realestate_payment(
+            invoice=self.deposit, amount=self.deposit.total,
+            method=RealEstatePayment.Method.CASH, paid_at=timezone.now(),
+            recorded_by=self.staff, external_reference="Jane",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    record_realestate_payment(
+                        invoice=self.balance, amount=self.balance.total,
+                        method=RealEstatePayment.Method.BANK_TRANSFER, paid_at=timezone.now(),
+                        recorded_by=self.staff, external_reference="BANK-ROLLBACK",
+                    )
+                    self.assertTrue(can_release_realestate_delivery(self.enquiry))
+                    raise RuntimeError("rollback")
+
+        self.assertFalse(can_release_realestate_delivery(self.enquiry))
+
     def test_delivery_ready_timeline_event_is_recorded_once(self):
         record_realestate_payment(
             invoice=self.deposit, amount=self.deposit.total,
@@ -674,6 +844,85 @@ class RealEstateFinanceTests(TestCase):
                 self.assertNotIn(forbidden, text, str(path))
 
 
+class RealEstateDocumentCacheTests(TestCase):
+    def setUp(self):
+        self.enquiry = RealEstateEnquiry.objects.create(
+            name="Jane Agent", email="jane@example.com", phone="123",
+            client_type=RealEstateEnquiry.ClientType.ESTATE_AGENT,
+            property_address="Example House", county="Galway", property_type="House",
+            preferred_package=RealEstateEnquiry.PreferredPackage.PRO,
+            consent_to_contact=True, quoted_price=Decimal("399.00"),
+        )
+        calculate_realestate_deposit_amounts(self.enquiry)
+        self.deposit, self.balance = ensure_standard_realestate_invoices(self.enquiry)
+        self.staff = get_user_model().objects.create_user("staff", is_staff=True)
+        media = TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = Path(media.name)
+        media_settings = self.settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def stored(self, kind, number):
+        folder = self.media_root / "realestate-documents" / kind / number
+        return sorted(folder.iterdir()) if folder.exists() else []
+
+    def test_issued_invoice_pdf_is_rendered_once_and_streamed_from_storage(self):
+        first = open_invoice_pdf(self.deposit).read()
+        self.assertTrue(first.startswith(b"%PDF"))
+        self.assertEqual(len(self.stored(INVOICE, self.deposit.invoice_number)), 1)
+
+        with patch("realestate.document_cache.render_financial_pdf") as render:
+            again = open_invoice_pdf(self.deposit)
+            self.assertEqual(again.read(), first)
+            again.close()
+        render.assert_not_called()
+
+    def test_payment_replaces_the_stored_invoice_render(self):
+        open_invoice_pdf(self.deposit).read()
+        [before] = self.stored(INVOICE, self.deposit.invoice_number)
+        record_realestate_payment(
+            invoice=self.deposit, amount="50", method=RealEstatePayment.Method.CASH,
+            paid_at=timezone.now(), recorded_by=self.staff,
+            external_reference="Jane", notes="cash",
+        )
+        self.deposit.refresh_from_db()
+
+        text = open_invoice_pdf(self.deposit).read().decode("latin-1")
+
+        self.assertIn("EUR 50.00", text)
+        [after] = self.stored(INVOICE, self.deposit.invoice_number)
+        self.assertNotEqual(before, after)
+
+    def test_draft_invoice_is_rendered_without_being_stored(self):
+        self.deposit.status = RealEstateInvoice.Status.DRAFT
+        RealEstateInvoice.objects.filter(pk=self.deposit.pk).update(status=RealEstateInvoice.Status.DRAFT)
+
+        self.assertTrue(open_invoice_pdf(self.deposit).read().startswith(b"%PDF"))
+        self.assertEqual(self.stored(INVOICE, self.deposit.invoice_number), [])
+
+    @override_settings(REAL_ESTATE_DOCUMENT_RENDER_WORKERS=1)
+    def test_cash_payment_prerenders_invoice_and_receipt_on_commit(self):
+        with patch.object(
+            render_executor, "submit", side_effect=lambda func, *args: func(*args)
+        ) as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                payment, _ = record_realestate_payment(
+                    invoice=self.deposit, amount="50", method=RealEstatePayment.Method.CASH,
+                    paid_at=timezone.now(), recorded_by=self.staff,
+                    external_reference="Jane", notes="cash",
+                )
+            self.assertEqual(len(self.stored(CASH_RECEIPT, payment.cash_receipt_number)), 1)
+            self.assertEqual(len(self.stored(INVOICE, self.deposit.invoice_number)), 1)
+
+        self.assertIn(
+            (render_document, CASH_RECEIPT, payment.pk), [call.args for call in submit.call_args_list]
+        )
+        with patch("realestate.document_cache.render_financial_pdf") as render:
+            self.assertIn(payment.cash_receipt_number, open_cash_receipt_pdf(payment).read().decode("latin-1"))
+        render.assert_not_called()
+
+
 class RealEstateLedgerMigrationTests(TransactionTestCase):
     migrate_from = [("realestate", "0007_realestate_pricing_snapshots")]
     migrate_to = [("realestate", "0009_backfill_realestate_invoices")]
@@ -1426,6 +1675,47 @@ class RealEstateAdminOperationsHubTests(TestCase):
         self.assertContains(response, "Send delivery email")
         self.assertContains(response, "Released")
 
+    def _busy_enquiry(self):
+        enquiry = self.make_enquiry(RealEstateEnquiry.PaymentArrangement.DEPOSIT_THEN_BALANCE)
+        for invoice in ensure_standard_realestate_invoices(enquiry):
+            for amount in ("10", "20"):
+                record_realestate_payment(
+                    invoice=invoice, amount=amount, method=RealEstatePayment.Method.CASH,
+                    paid_at=timezone.now(), recorded_by=self.admin_user,
+                    external_reference="cash", notes="Part payment.",
+                )
+        grant_delivery_override(enquiry, user=self.admin_user, reason="Agent vouched for balance.")
+        return enquiry
+
+    def test_operations_hub_is_built_from_one_enquiry_graph(self):
+        enquiry = self._busy_enquiry()
+        request = self.factory.get(self.change_url(enquiry))
+        request.user = self.admin_user
+
+        # Enquiry + delivery, invoices, payments, overrides, agreement snapshot.
+        with self.assertNumQueries(5):
+            hub = self.model_admin._build_operations_hub(request, enquiry)
+
+        self.assertEqual(len(hub["invoices"]), 2)
+        self.assertEqual(len(hub["payments"]), 4)
+        self.assertEqual(hub["financial"]["paid"], "€60.00")
+        self.assertEqual(hub["delivery"]["override"], "Active")
+        self.assertEqual(hub["delivery"]["state"], "Ready")
+
+    def test_change_page_query_count_does_not_grow_with_financial_records(self):
+        quiet = self.make_enquiry(RealEstateEnquiry.PaymentArrangement.FULL_ON_SHOOT_DAY)
+        ensure_invoices_for_arrangement(quiet)
+        busy = self._busy_enquiry()
+        self.client.get(self.change_url(quiet))
+
+        with CaptureQueriesContext(connection) as quiet_queries:
+            self.client.get(self.change_url(quiet))
+        with CaptureQueriesContext(connection) as busy_queries:
+            response = self.client.get(self.change_url(busy))
+
+        self.assertContains(response, "Real-estate operations hub")
+        self.assertEqual(len(busy_queries), len(quiet_queries))
+
     def test_issue_invoice_action_is_idempotent(self):
         enquiry = self.make_enquiry(RealEstateEnquiry.PaymentArrangement.FULL_ON_SHOOT_DAY)
 
@@ -10,6 +10,8 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.core import mail
 from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db import DataError
 from django.template.loader import get_template, render_to_string
 from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
@@ -29,9 +31,11 @@ from .documents import render_booking_agreement_markdown
 from .emails import build_realestate_email_context
 from .emails import format_money
 from .emails import send_templated_email
+from .enquiry_emails import CLAIM_TIMEOUT, send_enquiry_email
 from .finance import ensure_invoices_for_arrangement
 from .finance import record_realestate_payment
 from .models import RealEstateEnquiry
+from .models import RealEstateEnquiryEmail
 from .models import RealEstateBookingAgreementSnapshot
 from .models import RealEstateInvoice
 from .models import RealEstatePayment
@@ -1884,7 +1888,8 @@ class RealEstateEnquiryTests(APITestCase):
         self.assertIn("form_schema_version", response.data)
 
     def test_internal_notification_email_is_sent(self):
-        self.client.post(self.url, data=self.payload, format="json")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, data=self.payload, format="json")
 
         self.assertEqual(len(mail.outbox), 2)
         internal_email = mail.outbox[0]
@@ -1901,7 +1906,8 @@ class RealEstateEnquiryTests(APITestCase):
         self.assertIn("View in admin:", internal_email.body)
 
     def test_client_confirmation_email_is_sent(self):
-        self.client.post(self.url, data=self.payload, format="json")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, data=self.payload, format="json")
 
         self.assertEqual(len(mail.outbox), 2)
         client_email = mail.outbox[1]
@@ -2266,11 +2272,11 @@ class RealEstateEnquiryTests(APITestCase):
             )
 
     @patch(
-        "realestate.views.send_realestate_internal_notification_email",
+        "realestate.emails.send_realestate_internal_notification_email",
         side_effect=RuntimeError("smtp timeout"),
     )
     @patch(
-        "realestate.views.send_realestate_client_confirmation_email",
+        "realestate.emails.send_realestate_client_confirmation_email",
         side_effect=RuntimeError("smtp timeout"),
     )
     def test_email_failure_does_not_delete_saved_enquiry_or_return_500(
@@ -2278,11 +2284,88 @@ class RealEstateEnquiryTests(APITestCase):
         _mock_client_email,
         _mock_internal_email,
     ):
-        response = self.client.post(self.url, data=self.payload, format="json")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, data=self.payload, format="json")
 
         self.assertEqual(response.status_code, 201)
         self.assertEqual(RealEstateEnquiry.objects.count(), 1)
         self.assertEqual(RealEstateTimelineEvent.objects.count(), 1)
+        self.assertEqual(
+            list(RealEstateEnquiryEmail.objects.values_list("status", "attempts", "failure_code")),
+            [("pending", 1, "RuntimeError")] * 2,
+        )
+
+    def test_enquiry_responds_before_emails_are_sent(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(self.url, data=self.payload, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        enquiry = RealEstateEnquiry.objects.get()
+        self.assertEqual(
+            sorted(enquiry.notification_emails.values_list("kind", "status")),
+            [("client_confirmation", "pending"), ("internal_notification", "pending")],
+        )
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(
+            set(enquiry.notification_emails.values_list("status", flat=True)), {"sent"}
+        )
+        self.assertEqual(
+            list(
+                enquiry.timeline_events.filter(status="sent")
+                .order_by("event_type")
+                .values_list("event_type", "recipient_email")
+            ),
+            [
+                ("enquiry_confirmation_sent", "jane@example.com"),
+                ("enquiry_notification_sent", "shoots@openeire.ie"),
+            ],
+        )
+
+    def test_enquiry_email_is_sent_once_per_kind(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, data=self.payload, format="json")
+        enquiry = RealEstateEnquiry.objects.get()
+
+        self.assertIsNone(send_enquiry_email(enquiry.pk, "client_confirmation"))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(enquiry.timeline_events.filter(status="sent").count(), 2)
+
+    def test_command_retries_failed_and_abandoned_enquiry_emails(self):
+        with patch(
+            "realestate.emails.send_realestate_client_confirmation_email",
+            side_effect=RuntimeError("smtp timeout"),
+        ), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, data=self.payload, format="json")
+        enquiry = RealEstateEnquiry.objects.get()
+        confirmation = enquiry.notification_emails.get(kind="client_confirmation")
+        self.assertEqual(confirmation.status, "pending")
+        self.assertGreater(confirmation.next_attempt_at, timezone.now())
+        # A worker that died after claiming the internal notification.
+        enquiry.notification_emails.filter(kind="internal_notification").update(
+            status="sending",
+            sent_at=None,
+            claimed_at=timezone.now() - CLAIM_TIMEOUT - timedelta(minutes=1),
+        )
+        mail.outbox = []
+
+        call_command("send_realestate_enquiry_emails", stdout=Mock())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["shoots@openeire.ie"])
+
+        confirmation.next_attempt_at = timezone.now()
+        confirmation.save(update_fields=("next_attempt_at",))
+        with override_settings(REAL_ESTATE_ENQUIRY_EMAIL_MAX_ATTEMPTS=2), patch(
+            "realestate.emails.send_realestate_client_confirmation_email",
+            side_effect=RuntimeError("smtp timeout"),
+        ):
+            with self.assertRaises(CommandError):
+                call_command("send_realestate_enquiry_emails", stdout=Mock())
+        confirmation.refresh_from_db()
+        self.assertEqual((confirmation.status, confirmation.attempts), ("failed", 2))
 
     @patch(
         "realestate.views.record_timeline_event",
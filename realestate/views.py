@@ -1,6 +1,7 @@
 import logging
 
 from django.conf import settings
+from django.db import transaction
 from django.views.generic import TemplateView
 from rest_framework import generics, status
 from rest_framework.permissions import AllowAny
@@ -8,11 +9,8 @@ from rest_framework.response import Response
 
 from openeire_api.throttling import SharedScopedRateThrottle
 
-from .emails import (
-    get_realestate_reply_to_email,
-    send_realestate_client_confirmation_email,
-    send_realestate_internal_notification_email,
-)
+from .emails import get_realestate_reply_to_email
+from .enquiry_emails import queue_enquiry_emails
 from .models import RealEstateEnquiry
 from .serializers import RealEstateEnquirySerializer
 from .timeline import record_timeline_event
@@ -54,7 +52,14 @@ class RealEstateEnquiryCreateView(generics.CreateAPIView):
     throttle_scope = "real_estate_enquiry"
 
     def perform_create(self, serializer):
-        self.enquiry = serializer.save()
+        # The emails are recorded with the enquiry and sent after commit, so
+        # the response never waits on SMTP and a crash cannot lose them.
+        with transaction.atomic():
+            self.enquiry = serializer.save()
+            self._record_received_event()
+            queue_enquiry_emails(self.enquiry)
+
+    def _record_received_event(self):
         notes = []
         if self.enquiry.preferred_package:
             notes.append(
@@ -71,41 +76,25 @@ class RealEstateEnquiryCreateView(generics.CreateAPIView):
         if self.enquiry.property_address:
             notes.append(f"Property address: {self.enquiry.property_address}")
         try:
-            record_timeline_event(
-                self.enquiry,
-                "enquiry_received",
-                status="completed",
-                actor_type="client",
-                title="Enquiry received",
-                notes="\n".join(notes),
-            )
+            with transaction.atomic():
+                record_timeline_event(
+                    self.enquiry,
+                    "enquiry_received",
+                    status="completed",
+                    actor_type="client",
+                    title="Enquiry received",
+                    notes="\n".join(notes),
+                )
         except Exception:
             logger.exception(
                 "Failed to record enquiry timeline event. enquiry_id=%s",
                 self.enquiry.id,
             )
 
-    def _send_emails(self, enquiry):
-        try:
-            send_realestate_internal_notification_email(enquiry, request=self.request)
-        except Exception:
-            logger.exception(
-                "Failed to send internal real estate enquiry notification. enquiry_id=%s",
-                enquiry.id,
-            )
-        try:
-            send_realestate_client_confirmation_email(enquiry)
-        except Exception:
-            logger.exception(
-                "Failed to send real estate enquiry confirmation email. enquiry_id=%s",
-                enquiry.id,
-            )
-
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-        self._send_emails(self.enquiry)
         return Response(
             {
                 "id": self.enquiry.id,
@@ -0,0 +1,263 @@
+import copy
+import logging
+from dataclasses import dataclass
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.functional import SimpleLazyObject, empty
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .token_store import CachedBlacklistMixin
+
+logger = logging.getLogger(__name__)
+
+USER_VERSION_CLAIM = "uv"
+USER_AUTH_STATE_CACHE_KEY = "jwt-user-state:v1:{user_id}"
+DEFAULT_USER_AUTH_STATE_CACHE_SECONDS = 300
+_MISSING_USER = "missing"
+
+
+@dataclass(frozen=True)
+class UserAuthState:
+    """The per-user facts every JWT-authenticated request is checked against."""
+
+    token_version: int
+    is_active: bool
+    is_staff: bool
+    email: str
+    profile_id: int = None
+
+
+def user_auth_state_cache_key(user_id):
+    return USER_AUTH_STATE_CACHE_KEY.format(user_id=user_id)
+
+
+def _state_cache_timeout():
+    return int(
+        getattr(
+            settings,
+            "JWT_USER_STATE_CACHE_SECONDS",
+            DEFAULT_USER_AUTH_STATE_CACHE_SECONDS,
+        )
+    )
+
+
+def load_user_auth_state(user_id):
+    row = (
+        get_user_model().objects.filter(pk=user_id)
+        .values("is_active", "is_staff", "email", "userprofile__id", "userprofile__token_version")
+        .first()
+    )
+    if row is None:
+        return None
+    return UserAuthState(
+        token_version=row["userprofile__token_version"] or 0,
+        is_active=row["is_active"],
+        is_staff=row["is_staff"],
+        email=row["email"] or "",
+        profile_id=row["userprofile__id"],
+    )
+
+
+def get_user_auth_state(user_id):
+    """
+    Return the cached ``UserAuthState`` for a user, or ``None`` when the user
+    no longer exists. A cache outage falls back to the database, which costs
+    the same single query the stock authentication class always made.
+    """
+    key = user_auth_state_cache_key(user_id)
+    try:
+        cached = cache.get(key)
+    except Exception:
+        logger.warning("JWT auth state cache unavailable; reading from the database.", exc_info=True)
+        return load_user_auth_state(user_id)
+
+    if cached == _MISSING_USER:
+        return None
+    if cached is not None:
+        return UserAuthState(*cached)
+
+    state = load_user_auth_state(user_id)
+    try:
+        # add() rather than set() so a fill racing a version bump cannot
+        # overwrite the newer state the bump just stored.
+        cache.add(
+            key,
+            _MISSING_USER if state is None else (
+                state.token_version,
+                state.is_active,
+                state.is_staff,
+                state.email,
+                state.profile_id,
+            ),
+            _state_cache_timeout(),
+        )
+    except Exception:
+        logger.warning("Could not cache JWT auth state for user %s.", user_id, exc_info=True)
+    return state
+
+
+def invalidate_user_auth_state(user_id):
+    if user_id is None:
+        return
+    try:
+        cache.delete(user_auth_state_cache_key(user_id))
+    except Exception:
+        logger.warning("Could not invalidate JWT auth state for user %s.", user_id, exc_info=True)
+
+
+def bump_user_token_version(user):
+    """
+    Revoke every access and refresh token issued to ``user`` so far. Tokens
+    issued afterwards carry the new version and stay valid.
+    """
+    from .models import UserProfile
+
+    user_id = getattr(user, "pk", user)
+    UserProfile.objects.filter(user_id=user_id).update(token_version=F("token_version") + 1)
+    invalidate_user_auth_state(user_id)
+    # Warm the cache with the new version straight away so a concurrent
+    # request cannot fill it with the pre-bump state.
+    state = load_user_auth_state(user_id)
+    if state is not None:
+        try:
+            cache.set(
+                user_auth_state_cache_key(user_id),
+                (state.token_version, state.is_active, state.is_staff, state.email, state.profile_id),
+                _state_cache_timeout(),
+            )
+        except Exception:
+            logger.warning("Could not cache JWT auth state for user %s.", user_id, exc_info=True)
+
+
+def add_user_token_claims(token, user):
+    """Stamp the claims ``StatelessJWTAuthentication`` builds its user from."""
+    from products.entitlements import get_gallery_entitlement
+
+    state = get_user_auth_state(user.pk)
+    entitlement = get_gallery_entitlement(user.pk)
+    token[USER_VERSION_CLAIM] = state.token_version if state else 0
+    token["email"] = user.email or ""
+    token["is_staff"] = bool(user.is_staff)
+    token["profile_id"] = state.profile_id if state else None
+    # Informational for clients; server-side gallery checks always go
+    # through the entitlement cache so revoked grants apply immediately.
+    token["gallery"] = entitlement.has_access
+    token["gallery_until"] = (
+        int(entitlement.valid_until.timestamp()) if entitlement.valid_until else None
+    )
+    return token
+
+
+def check_token_user_state(token):
+    """
+    Validate a token's user against the cached auth state and return that
+    state. Raises ``AuthenticationFailed``/``InvalidToken`` for deleted or
+    inactive users and for tokens revoked by a version bump.
+    """
+    try:
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    state = get_user_auth_state(user_id)
+    if state is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+    if not state.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    if int(token.get(USER_VERSION_CLAIM, 0) or 0) != state.token_version:
+        raise InvalidToken(_("Token has been revoked"))
+    return state
+
+
+class VersionedRefreshToken(CachedBlacklistMixin, RefreshToken):
+    """
+    Refresh token that is also rejected once its user version is stale, with
+    blacklist checks served from the cache.
+    """
+
+    def verify(self):
+        super().verify()
+        check_token_user_state(self)
+
+
+def _load_user(user_id):
+    return get_user_model().objects.select_related("userprofile").get(pk=user_id)
+
+
+class LazyTokenUser(SimpleLazyObject):
+    """
+    Request user backed by verified token claims.
+
+    ``id``/``pk``, ``email``, ``is_staff``, ``profile_id`` and the
+    authentication flags are answered from the claims; anything else
+    (including ``isinstance`` checks, ORM use and ``userprofile``) loads
+    the real ``User`` row, with its profile, in a single query.
+    """
+
+    def __init__(self, user_id, claims):
+        super().__init__(partial(_load_user, user_id))
+        self.__dict__["_user_id"] = user_id
+        self.__dict__["_claims"] = claims
+
+    def __getattr__(self, name):
+        claims = self.__dict__["_claims"]
+        if name in claims and (self._wrapped is empty or name == "profile_id"):
+            return claims[name]
+        return super().__getattr__(name)
+
+    def __bool__(self):
+        return True
+
+    def __copy__(self):
+        if self._wrapped is empty:
+            return type(self)(self.__dict__["_user_id"], dict(self.__dict__["_claims"]))
+        return copy.copy(self._wrapped)
+
+    def __deepcopy__(self, memo):
+        if self._wrapped is empty:
+            result = type(self)(self.__dict__["_user_id"], copy.deepcopy(self.__dict__["_claims"], memo))
+            memo[id(self)] = result
+            return result
+        return copy.deepcopy(self._wrapped, memo)
+
+    @property
+    def is_loaded(self):
+        return self._wrapped is not empty
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` without the per-request ``auth_user`` query.
+
+    The user is rebuilt from token claims and checked against a cached
+    per-user auth state (active flag, staff flag, email and token version);
+    the state wins if the token disagrees, so demotions and email changes
+    apply without waiting for the token to expire.
+    """
+
+    def get_user(self, validated_token):
+        state = check_token_user_state(validated_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        claims = {
+            "id": user_id,
+            "pk": user_id,
+            "email": state.email,
+            "is_staff": state.is_staff,
+            "is_active": True,
+            "is_authenticated": True,
+            "is_anonymous": False,
+            "profile_id": state.profile_id,
+        }
+        return LazyTokenUser(user_id, claims)
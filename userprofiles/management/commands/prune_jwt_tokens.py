@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from userprofiles.token_store import (
+    DEFAULT_PRUNE_BATCH_SIZE,
+    get_token_table_stats,
+    log_token_table_stats,
+    prune_expired_tokens,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding and blacklisted refresh tokens in batches "
+        "and report token table sizes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_PRUNE_BATCH_SIZE,
+            help=f"Rows to delete per transaction. Defaults to {DEFAULT_PRUNE_BATCH_SIZE}.",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop after this many batches (the next run continues where it left off).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report table sizes without deleting anything.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("Batch size must be at least 1.")
+        max_batches = options["max_batches"]
+        if max_batches is not None and max_batches < 1:
+            raise CommandError("Max batches must be at least 1.")
+
+        now = timezone.now()
+        stats = get_token_table_stats(now)
+        log_token_table_stats(stats)
+        self.stdout.write(self._format_stats(stats))
+        if options["dry_run"]:
+            self.stdout.write(
+                f"Would delete {stats['outstanding_expired']} expired outstanding token(s) "
+                f"and {stats['blacklisted_expired']} blacklisted token(s)."
+            )
+            return
+
+        outstanding_deleted, blacklisted_deleted = prune_expired_tokens(
+            batch_size=batch_size,
+            now=now,
+            max_batches=max_batches,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {outstanding_deleted} expired outstanding token(s) "
+                f"and {blacklisted_deleted} blacklisted token(s)."
+            )
+        )
+        remaining = get_token_table_stats(now)
+        log_token_table_stats(remaining, label="JWT token store metrics after prune")
+        self.stdout.write(self._format_stats(remaining))
+
+    def _format_stats(self, stats):
+        return (
+            f"outstanding={stats['outstanding']} outstanding_expired={stats['outstanding_expired']} "
+            f"blacklisted={stats['blacklisted']} blacklisted_expired={stats['blacklisted_expired']}"
+        )
@@ -2,13 +2,15 @@
 
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django_countries.fields import CountryField
-from django.utils import timezone
 
-class UserProfile(models.Model):
+from openeire_api.model_mixins import ProtectedFieldsMixin
+
+class UserProfile(ProtectedFieldsMixin, models.Model):
     """User Profile model for maintaining delivery information and order history"""
+    protected_fields = ("token_version",)
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     default_phone_number = models.CharField(max_length=20, null=True, blank=True)
     default_street_address1 = models.CharField(max_length=255, null=True, blank=True)
@@ -18,6 +20,8 @@ class UserProfile(models.Model):
     default_postcode = models.CharField(max_length=20, null=True, blank=True)
     default_country = CountryField(blank=True, null=True)
     can_access_gallery = models.BooleanField(default=False)
+    # Bumped to revoke every JWT issued to the user (see authentication.py).
+    token_version = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.user.username
@@ -26,7 +30,9 @@ class UserProfile(models.Model):
     def has_digital_gallery_access(self):
         if self.can_access_gallery:
             return True
-        return self.user.gallery_access_grants.filter(expires_at__gt=timezone.now()).exists()
+        from products.entitlements import get_gallery_entitlement
+
+        return get_gallery_entitlement(self.user_id).has_access
 
 @receiver(post_save, sender=User)
 def create_or_update_user_profile(sender, instance, created, **kwargs):
@@ -35,3 +41,21 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
         UserProfile.objects.create(user=instance)
     # Existing users: just save the profile
     instance.userprofile.save()
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_gallery_entitlement(sender, instance, **kwargs):
+    """Drop the cached gallery entitlement when the profile changes"""
+    from products.entitlements import invalidate_gallery_entitlement
+
+    invalidate_gallery_entitlement(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_auth_state(sender, instance, **kwargs):
+    """Drop the cached JWT auth state when the user changes"""
+    from .authentication import invalidate_user_auth_state as invalidate
+
+    invalidate(instance.pk)
@@ -5,7 +5,9 @@ from django.contrib.auth.password_validation import validate_password as django_
 from .models import UserProfile
 from django_countries.serializer_fields import CountryField
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+
+from .authentication import VersionedRefreshToken, add_user_token_claims
 
 
 def _normalize_email(value):
@@ -166,6 +168,12 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     Custom token serializer to allow login with either username or email.
     """
+    token_class = VersionedRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        return add_user_token_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         # Get the identifier (could be username or email) and password
         identifier = attrs.get(self.username_field)
@@ -216,6 +224,13 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         return data
 
+class MyTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh serializer that rejects refresh tokens revoked by a token
+    version bump (password change, logout, account deletion).
+    """
+    token_class = VersionedRefreshToken
+
 class ChangePasswordSerializer(serializers.Serializer):
     """
     Serializer for password change endpoint.
@@ -1,20 +1,34 @@
+from datetime import timedelta
+from io import StringIO
+
 from django.contrib.auth.models import User
 from django.conf import settings
-from django.core.cache import caches
+from django.core.cache import cache, caches
+from django.core.management import call_command
 from django.core import mail
 from django.core.exceptions import ImproperlyConfigured
 from django.db import IntegrityError
-from django.db import transaction
+from django.db import connection, transaction
 from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from allauth.socialaccount.models import EmailAddress, SocialAccount, SocialApp, SocialLogin
 from dj_rest_auth.registration.views import SocialLoginView
-from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from rest_framework.test import APIClient
 from unittest.mock import patch
 from checkout.models import Order
 
 from .adapters import OpenEireSocialAccountAdapter
+from .authentication import (
+    USER_VERSION_CLAIM,
+    LazyTokenUser,
+    StatelessJWTAuthentication,
+    VersionedRefreshToken,
+)
+from .token_store import prune_expired_tokens, token_state_cache_key
 from .token_utils import (
     EMAIL_VERIFICATION_PURPOSE,
     PASSWORD_RESET_PURPOSE,
@@ -356,6 +370,23 @@ class ActionTokenPurposeTests(TestCase):
         self.user.refresh_from_db()
         self.assertTrue(self.user.is_active)
 
+    def test_verify_email_claims_guest_orders_for_the_verified_address(self):
+        guest_order = Order.objects.create(
+            email=" TokenPurpose@example.com",
+            stripe_pid="pi_guest_order_verify",
+        )
+        token = issue_user_action_token(
+            user=self.user,
+            purpose=EMAIL_VERIFICATION_PURPOSE,
+            lifetime_minutes=30,
+        )
+
+        response = self.client.post(self.verify_url, data={"token": token})
+
+        self.assertEqual(response.status_code, 200)
+        guest_order.refresh_from_db()
+        self.assertEqual(guest_order.user_profile.user_id, self.user.id)
+
     def test_password_reset_confirm_rejects_token_with_wrong_purpose(self):
         wrong_purpose_token = issue_user_action_token(
             user=self.user,
@@ -426,6 +457,257 @@ class TokenRefreshTests(TestCase):
         self.assertEqual(response.json().get("code"), "token_not_valid")
 
 
+class StatelessJwtAuthenticationTests(TestCase):
+    def setUp(self):
+        caches[getattr(settings, "THROTTLE_CACHE_ALIAS", "throttle")].clear()
+        self.user = User.objects.create_user(
+            username="statelessuser",
+            email="stateless@example.com",
+            password="StrongPass123!",
+            is_active=True,
+        )
+        self.tokens = self._login()
+
+    def _login(self, password="StrongPass123!"):
+        response = self.client.post(
+            reverse("auth_login"),
+            data={"username": self.user.username, "password": password},
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _auth(self, access):
+        return {"HTTP_AUTHORIZATION": f"Bearer {access}"}
+
+    def test_access_token_carries_user_claims(self):
+        token = AccessToken(self.tokens["access"])
+
+        self.assertEqual(token[USER_VERSION_CLAIM], 0)
+        self.assertEqual(token["email"], "stateless@example.com")
+        self.assertFalse(token["is_staff"])
+        self.assertEqual(token["profile_id"], self.user.userprofile.id)
+        self.assertFalse(token["gallery"])
+
+    def test_warm_authenticated_request_skips_user_query(self):
+        url = reverse("order_history")
+        self.assertEqual(self.client.get(url, **self._auth(self.tokens["access"])).status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **self._auth(self.tokens["access"]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(
+            [query["sql"] for query in queries.captured_queries if '"auth_user"' in query["sql"]]
+        )
+
+    def test_token_user_loads_user_and_profile_in_one_query(self):
+        user_id = self.user.id
+        token_user = LazyTokenUser(user_id, {"id": user_id, "pk": user_id, "profile_id": 1})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(token_user.pk, user_id)
+            self.assertTrue(token_user)
+        with self.assertNumQueries(1):
+            self.assertEqual(token_user.username, "statelessuser")
+            self.assertEqual(token_user.userprofile.user_id, user_id)
+        self.assertIsInstance(token_user, User)
+
+    def test_logout_revokes_existing_access_and_refresh_tokens(self):
+        response = self.client.post(reverse("auth_logout"), **self._auth(self.tokens["access"]))
+        self.assertEqual(response.status_code, 200)
+
+        profile_response = self.client.get(reverse("user_profile"), **self._auth(self.tokens["access"]))
+        refresh_response = self.client.post(
+            reverse("token_refresh"),
+            data={"refresh": self.tokens["refresh"]},
+        )
+
+        self.assertEqual(profile_response.status_code, 401)
+        self.assertEqual(refresh_response.status_code, 401)
+        fresh_tokens = self._login()
+        self.assertEqual(
+            self.client.get(reverse("user_profile"), **self._auth(fresh_tokens["access"])).status_code,
+            200,
+        )
+
+    def test_password_change_revokes_old_tokens_and_returns_new_pair(self):
+        response = self.client.put(
+            reverse("auth_password_change"),
+            data={"old_password": "StrongPass123!", "new_password": "NewStrongPass456!"},
+            content_type="application/json",
+            **self._auth(self.tokens["access"]),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.client.get(reverse("user_profile"), **self._auth(self.tokens["access"])).status_code,
+            401,
+        )
+        self.assertEqual(
+            self.client.get(reverse("user_profile"), **self._auth(response.json()["access"])).status_code,
+            200,
+        )
+
+    def test_deleted_account_tokens_are_rejected(self):
+        response = self.client.delete(
+            reverse("delete_account"),
+            data={"password": "StrongPass123!"},
+            content_type="application/json",
+            **self._auth(self.tokens["access"]),
+        )
+        self.assertEqual(response.status_code, 204)
+
+        profile_response = self.client.get(reverse("user_profile"), **self._auth(self.tokens["access"]))
+
+        self.assertEqual(profile_response.status_code, 401)
+
+    def test_staff_flag_follows_cached_state_not_token_claim(self):
+        self.user.is_staff = True
+        self.user.save()
+        staff_tokens = self._login()
+        self.user.is_staff = False
+        self.user.save()
+
+        token_user = StatelessJWTAuthentication().get_user(AccessToken(staff_tokens["access"]))
+
+        self.assertFalse(token_user.is_staff)
+
+    def test_inactive_user_is_rejected_without_token_bump(self):
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(reverse("user_profile"), **self._auth(self.tokens["access"]))
+
+        self.assertEqual(response.status_code, 401)
+
+
+class JwtTokenStoreTests(TestCase):
+    def setUp(self):
+        caches[getattr(settings, "THROTTLE_CACHE_ALIAS", "throttle")].clear()
+        self.user = User.objects.create_user(
+            username="tokenstoreuser",
+            email="tokenstore@example.com",
+            password="StrongPass123!",
+            is_active=True,
+        )
+        response = self.client.post(
+            reverse("auth_login"),
+            data={"username": self.user.username, "password": "StrongPass123!"},
+        )
+        self.refresh = response.json()["refresh"]
+
+    def _expired_token(self, jti, *, blacklisted=False):
+        token = OutstandingToken.objects.create(
+            user=self.user,
+            jti=jti,
+            token="expired",
+            created_at=timezone.now() - timedelta(days=3),
+            expires_at=timezone.now() - timedelta(days=2),
+        )
+        if blacklisted:
+            BlacklistedToken.objects.create(token=token)
+        return token
+
+    def test_rotated_refresh_token_is_blacklisted_and_rejected_on_reuse(self):
+        first = self.client.post(reverse("token_refresh"), data={"refresh": self.refresh})
+        self.assertEqual(first.status_code, 200)
+        self.assertNotEqual(first.json()["refresh"], self.refresh)
+
+        reuse = self.client.post(reverse("token_refresh"), data={"refresh": self.refresh})
+
+        self.assertEqual(reuse.status_code, 401)
+        old_jti = RefreshToken(self.refresh, verify=False)["jti"]
+        new_jti = RefreshToken(first.json()["refresh"], verify=False)["jti"]
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=old_jti).exists())
+        self.assertFalse(BlacklistedToken.objects.filter(token__jti=new_jti).exists())
+
+    def _blacklist_queries(self, refresh):
+        with CaptureQueriesContext(connection) as queries:
+            VersionedRefreshToken(refresh)
+        return len([query for query in queries.captured_queries if "token_blacklist" in query["sql"]])
+
+    def test_blacklist_check_reads_table_then_is_served_from_cache(self):
+        cache.delete(token_state_cache_key(RefreshToken(self.refresh, verify=False)["jti"]))
+        self.assertEqual(self._blacklist_queries(self.refresh), 1)
+        with self.assertNumQueries(0):
+            VersionedRefreshToken(self.refresh)
+
+    def test_outstanding_state_is_only_cached_briefly(self):
+        jti = RefreshToken(self.refresh, verify=False)["jti"]
+        cache.delete(token_state_cache_key(jti))
+
+        with patch("userprofiles.token_store.cache.set") as cache_set:
+            VersionedRefreshToken(self.refresh)
+
+        cache_set.assert_called_once_with(token_state_cache_key(jti), "o", 30)
+
+    def test_rotated_token_is_refused_when_caching_the_blacklist_fails(self):
+        # Warm the cache with the token's not-blacklisted state first.
+        VersionedRefreshToken(self.refresh)
+        with patch("userprofiles.token_store.cache.set", side_effect=ConnectionError("redis down")):
+            first = self.client.post(reverse("token_refresh"), data={"refresh": self.refresh})
+        self.assertEqual(first.status_code, 200)
+
+        reuse = self.client.post(reverse("token_refresh"), data={"refresh": self.refresh})
+
+        self.assertEqual(reuse.status_code, 401)
+
+    def test_token_of_a_deleted_user_is_blacklisted_without_a_user(self):
+        token = VersionedRefreshToken(self.refresh, verify=False)
+        OutstandingToken.objects.filter(jti=token["jti"]).delete()
+        self.user.delete()
+
+        token.blacklist()
+        connection.check_constraints()
+
+        outstanding = OutstandingToken.objects.get(jti=token["jti"])
+        self.assertIsNone(outstanding.user_id)
+        self.assertTrue(BlacklistedToken.objects.filter(token=outstanding).exists())
+
+    @override_settings(JWT_TOKEN_STATE_CACHE_SHARED=None)
+    def test_per_process_cache_is_not_trusted_for_token_state(self):
+        jti = RefreshToken(self.refresh, verify=False)["jti"]
+        cache.set(token_state_cache_key(jti), "o")
+
+        self.assertEqual(self._blacklist_queries(self.refresh), 1)
+        cache.delete(token_state_cache_key(jti))
+        self.assertEqual(self._blacklist_queries(self.refresh), 1)
+        self.assertIsNone(cache.get(token_state_cache_key(jti)))
+
+    def test_prune_command_deletes_expired_rows_in_batches_and_keeps_live_tokens(self):
+        self._expired_token("expired-1", blacklisted=True)
+        self._expired_token("expired-2")
+        self._expired_token("expired-3", blacklisted=True)
+        live_count = OutstandingToken.objects.filter(expires_at__gt=timezone.now()).count()
+        out = StringIO()
+
+        call_command("prune_jwt_tokens", "--batch-size", "2", stdout=out)
+
+        self.assertFalse(OutstandingToken.objects.filter(jti__startswith="expired-").exists())
+        self.assertEqual(BlacklistedToken.objects.count(), 0)
+        self.assertEqual(OutstandingToken.objects.count(), live_count)
+        self.assertIn("Deleted 3 expired outstanding token(s) and 2 blacklisted token(s).", out.getvalue())
+        self.assertIn("outstanding_expired=0", out.getvalue())
+
+    def test_prune_command_dry_run_only_reports_table_sizes(self):
+        self._expired_token("expired-dry", blacklisted=True)
+        out = StringIO()
+
+        call_command("prune_jwt_tokens", "--dry-run", stdout=out)
+
+        self.assertTrue(OutstandingToken.objects.filter(jti="expired-dry").exists())
+        self.assertIn("outstanding_expired=1 blacklisted=1 blacklisted_expired=1", out.getvalue())
+
+    def test_prune_respects_max_batches(self):
+        for index in range(3):
+            self._expired_token(f"expired-max-{index}")
+
+        deleted = prune_expired_tokens(batch_size=1, max_batches=2)
+
+        self.assertEqual(deleted, (2, 0))
+        self.assertEqual(OutstandingToken.objects.filter(jti__startswith="expired-max-").count(), 1)
+
+
 @override_settings(
     JWT_USE_HTTPONLY_COOKIES=True,
     JWT_COOKIE_SECURE=False,
@@ -0,0 +1,215 @@
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+logger = logging.getLogger(__name__)
+
+TOKEN_STATE_CACHE_KEY = "jwt-jti:v1:{jti}"
+_OUTSTANDING = "o"
+_BLACKLISTED = "b"
+DEFAULT_OUTSTANDING_CACHE_SECONDS = 30
+DEFAULT_PRUNE_BATCH_SIZE = 1000
+
+
+def token_state_cache_key(jti):
+    return TOKEN_STATE_CACHE_KEY.format(jti=jti)
+
+
+def token_state_cache_enabled():
+    """
+    Blacklist state is only cached when every worker sees the same cache;
+    a per-process LocMem cache would keep answering for its own worker after
+    another one blacklisted the token. ``JWT_TOKEN_STATE_CACHE_SHARED``
+    overrides the backend check.
+    """
+    shared = getattr(settings, "JWT_TOKEN_STATE_CACHE_SHARED", None)
+    if shared is not None:
+        return bool(shared)
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def _remaining_seconds(exp):
+    return math.ceil(exp - time.time())
+
+
+def _remember_outstanding(jti, exp):
+    # Only ever written after a table read, and only briefly: a blacklist
+    # write that fails to reach the cache is then outlived by seconds, not
+    # by the token's lifetime.
+    short = int(getattr(settings, "JWT_TOKEN_STATE_OUTSTANDING_CACHE_SECONDS", DEFAULT_OUTSTANDING_CACHE_SECONDS) or 0)
+    timeout = min(short, _remaining_seconds(exp))
+    if timeout <= 0:
+        return
+    try:
+        cache.set(token_state_cache_key(jti), _OUTSTANDING, timeout)
+    except Exception:
+        logger.warning("Could not cache JWT token state for jti %s.", jti, exc_info=True)
+
+
+def remember_blacklisted(jti, exp):
+    """
+    Cache that a JTI is blacklisted until the token expires. If the write
+    fails the key is deleted, so no earlier "outstanding" entry survives it.
+    """
+    if not token_state_cache_enabled():
+        return
+    key = token_state_cache_key(jti)
+    timeout = _remaining_seconds(exp)
+    try:
+        if timeout > 0:
+            cache.set(key, _BLACKLISTED, timeout)
+            return
+    except Exception:
+        logger.warning("Could not cache blacklisted JWT jti %s; dropping its entry.", jti, exc_info=True)
+    try:
+        cache.delete(key)
+    except Exception:
+        logger.error("Could not drop the cached state of blacklisted JWT jti %s.", jti, exc_info=True)
+
+
+def is_jti_blacklisted(jti, exp):
+    """
+    Answer a blacklist check from the cache, falling back to the
+    ``BlacklistedToken`` lookup on a miss or cache outage.
+    """
+    enabled = token_state_cache_enabled()
+    cached = None
+    if enabled:
+        try:
+            cached = cache.get(token_state_cache_key(jti))
+        except Exception:
+            logger.warning("JWT token state cache unavailable; checking the blacklist table.", exc_info=True)
+    if cached is not None:
+        return cached == _BLACKLISTED
+
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+    blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+    if enabled:
+        if blacklisted:
+            remember_blacklisted(jti, exp)
+        else:
+            _remember_outstanding(jti, exp)
+    return blacklisted
+
+
+class CachedBlacklistMixin:
+    """
+    Refresh-token mixin over simplejwt's ``BlacklistMixin`` that serves
+    blacklist checks from the cache and records outstanding/blacklisted
+    rows without re-loading the user when the token is already recorded.
+    """
+
+    def check_blacklist(self):
+        if is_jti_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload["exp"]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def _outstanding_token(self):
+        from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+        jti = self.payload[api_settings.JTI_CLAIM]
+        token = OutstandingToken.objects.filter(jti=jti).first()
+        if token is not None:
+            return token
+        # Like simplejwt, a token whose user has been deleted is stored
+        # without one; its foreign key check is deferred to commit, so a
+        # stale id would fail there instead.
+        user_id = (
+            get_user_model()
+            .objects.filter(**{api_settings.USER_ID_FIELD: self.payload.get(api_settings.USER_ID_CLAIM)})
+            .values_list("pk", flat=True)
+            .first()
+        )
+        token, _created = OutstandingToken.objects.get_or_create(
+            jti=jti,
+            defaults={
+                "user_id": user_id,
+                "created_at": self.current_time,
+                "token": str(self),
+                "expires_at": datetime_from_epoch(self.payload["exp"]),
+            },
+        )
+        return token
+
+    def blacklist(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        result = BlacklistedToken.objects.get_or_create(token=self._outstanding_token())
+        remember_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload["exp"])
+        return result
+
+    def outstand(self):
+        return self._outstanding_token()
+
+
+def get_token_table_stats(now=None):
+    """Row counts for the outstanding/blacklisted token tables."""
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+    now = now or timezone.now()
+    outstanding = OutstandingToken.objects.aggregate(
+        total=Count("id"),
+        expired=Count("id", filter=Q(expires_at__lte=now)),
+    )
+    blacklisted = BlacklistedToken.objects.aggregate(
+        total=Count("id"),
+        expired=Count("id", filter=Q(token__expires_at__lte=now)),
+    )
+    return {
+        "outstanding": outstanding["total"],
+        "outstanding_expired": outstanding["expired"],
+        "blacklisted": blacklisted["total"],
+        "blacklisted_expired": blacklisted["expired"],
+    }
+
+
+def log_token_table_stats(stats, *, label="JWT token store metrics"):
+    logger.info(
+        "%s outstanding=%s outstanding_expired=%s blacklisted=%s blacklisted_expired=%s",
+        label,
+        stats["outstanding"],
+        stats["outstanding_expired"],
+        stats["blacklisted"],
+        stats["blacklisted_expired"],
+    )
+
+
+def prune_expired_tokens(*, batch_size=DEFAULT_PRUNE_BATCH_SIZE, now=None, max_batches=None):
+    """
+    Delete expired outstanding tokens (and their blacklist rows) in batches
+    of ``batch_size``, each in its own short transaction, so pruning never
+    holds long locks on the tables refreshes write to.
+    Returns ``(outstanding_deleted, blacklisted_deleted)``.
+    """
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+    now = now or timezone.now()
+    batch_size = max(int(batch_size), 1)
+    outstanding_deleted = blacklisted_deleted = batches = 0
+    while max_batches is None or batches < max_batches:
+        # Tokens share one lifetime, so the expired rows are the oldest ids
+        # and this walk over the primary key stops early.
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            blacklisted_deleted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            outstanding_deleted += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+        batches += 1
+    return outstanding_deleted, blacklisted_deleted
@@ -25,10 +25,12 @@ from .serializers import (
     UserProfileSerializer,
     ResendVerificationSerializer,
     MyTokenObtainPairSerializer,
+    MyTokenRefreshSerializer,
     ChangePasswordSerializer,
     ChangeEmailSerializer,
     DeleteAccountSerializer,
 )
+from .authentication import bump_user_token_version
 from .token_utils import (
     EMAIL_VERIFICATION_PURPOSE,
     PASSWORD_RESET_PURPOSE,
@@ -135,6 +137,28 @@ def _clear_jwt_cookies(response):
     )
 
 
+def _claim_guest_orders(user, *, reason):
+    # Claiming runs when an account's email is proven (login, verification),
+    # so the order-history endpoint can stay a plain indexed read.
+    try:
+        claimed_count = claim_guest_orders_for_user(user)
+    except Exception:
+        logger.exception(
+            "Guest order claiming failed during %s. user_id=%s",
+            reason,
+            user.id,
+        )
+        return 0
+    if claimed_count:
+        logger.info(
+            "Claimed %s guest orders for user_id=%s during %s.",
+            claimed_count,
+            user.id,
+            reason,
+        )
+    return claimed_count
+
+
 def _is_cookie_mode_enabled():
     return bool(getattr(settings, "JWT_USE_HTTPONLY_COOKIES", False))
 
@@ -223,6 +247,7 @@ class VerifyEmailView(APIView):
 
             user.is_active = True
             user.save()
+            _claim_guest_orders(user, reason="email verification")
             return Response({'message': 'Email successfully verified!'}, status=status.HTTP_200_OK)
 
         except (TokenError, ValueError):
@@ -307,6 +332,7 @@ class PasswordResetConfirmView(generics.GenericAPIView):
             user = User.objects.get(id=user_id)
             user.set_password(password)
             user.save()
+            bump_user_token_version(user)
             return Response({"message": "Password reset successful."}, status=status.HTTP_200_OK)
         except (TokenError, ValueError, User.DoesNotExist):
             return Response({"error": "Invalid or expired token."}, status=status.HTTP_400_BAD_REQUEST)
@@ -387,20 +413,7 @@ class MyTokenObtainPairView(TokenObtainPairView):
         response = Response(serializer.validated_data, status=status.HTTP_200_OK)
         authenticated_user = getattr(serializer, "user", None)
         if authenticated_user is not None:
-            try:
-                claimed_count = claim_guest_orders_for_user(authenticated_user)
-            except Exception:
-                logger.exception(
-                    "Guest order claiming failed during login. user_id=%s",
-                    authenticated_user.id,
-                )
-            else:
-                if claimed_count:
-                    logger.info(
-                        "Claimed %s guest orders for user_id=%s during login.",
-                        claimed_count,
-                        authenticated_user.id,
-                    )
+            _claim_guest_orders(authenticated_user, reason="login")
 
         access_token = response.data.get("access")
         refresh_token = response.data.get("refresh")
@@ -413,6 +426,8 @@ class MyTokenObtainPairView(TokenObtainPairView):
 
 
 class MyTokenRefreshView(TokenRefreshView):
+    serializer_class = MyTokenRefreshSerializer
+
     def post(self, request, *args, **kwargs):
         payload = request.data.copy()
         if _is_cookie_mode_enabled() and not payload.get("refresh"):
@@ -455,8 +470,24 @@ class ChangePasswordView(generics.UpdateAPIView):
 
         if serializer.is_valid(raise_exception=True):
             # The serializer's .update() method handles password hashing and saving
-            serializer.save()
-            return Response({"message": "Password updated successfully"}, status=status.HTTP_200_OK)
+            user = serializer.save()
+            # Revoke every existing session, then hand this client a fresh pair.
+            bump_user_token_version(user)
+            refresh = MyTokenObtainPairSerializer.get_token(user)
+            response = Response(
+                {
+                    "message": "Password updated successfully",
+                    "refresh": str(refresh),
+                    "access": str(refresh.access_token),
+                },
+                status=status.HTTP_200_OK,
+            )
+            _set_jwt_cookies_if_enabled(
+                response,
+                access_token=response.data["access"],
+                refresh_token=response.data["refresh"],
+            )
+            return response
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -477,7 +508,8 @@ class ChangeEmailView(generics.UpdateAPIView):
         serializer = self.get_serializer(instance=self.object, data=request.data)
 
         if serializer.is_valid(raise_exception=True):
-            # The serializer's .update() method saves the new email and sets user inactive
+            # The serializer's .update() method saves the new email and sets user inactive.
+            # Guest orders for the new address are claimed once it is verified.
             serializer.save() 
             
             # --- Now, send a new verification email ---
@@ -514,6 +546,7 @@ class DeleteAccountView(generics.GenericAPIView):
         serializer = self.get_serializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             user = request.user
+            bump_user_token_version(user)
             user.delete()
             return Response(
                 {"message": "Account deleted successfully."},
@@ -534,6 +567,10 @@ class LogoutView(APIView):
             )
             if has_auth_cookies:
                 _enforce_cookie_csrf(request)
+        if request.user.is_authenticated:
+            # Logging out signs the account out everywhere: every token issued
+            # so far carries the old user version.
+            bump_user_token_version(request.user)
         response = Response({"message": "Logged out."}, status=status.HTTP_200_OK)
         _clear_jwt_cookies(response)
         return response
@@ -583,6 +620,8 @@ class GoogleLogin(SocialLoginView):
             )
         if response.status_code != 200:
             logger.warning("Google login failed with status_code=%s", response.status_code)
+        elif getattr(self, "user", None) is not None:
+            _claim_guest_orders(self.user, reason="Google login")
         return response
 
 class CountryListView(APIView):